@@ -0,0 +1,313 @@
+# Benchmark suite comparing CSVDB against SQLite on generated data (see gen_csv.py).
+#
+# For each data profile, the same table is loaded into CSVDB and into an SQLite database,
+# then each benchmark query is timed in both engines and their results are compared.
+# Queries CSVDB doesn't support yet are reported as "unsupported" rather than failing the run.
+#
+# Usage:
+#   python benchmark.py --rows 100000 --json report.json --csv report.csv
+#   python benchmark.py --baseline old_report.json    # exit status 1 on a regression
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from SqlParser import SqlParser
+from Table import Table
+from Catalog import Catalog
+from Printer import BatchPrinter
+import gen_csv
+
+
+SQLITE_TYPES = {"int": "INTEGER", "float": "REAL", "varchar": "TEXT", "timestamp": "INTEGER"}
+TABLE_NAME = "bench"
+
+
+class Query:
+    """A benchmark query in both dialects.
+    `ordered` -- results are compared in order (otherwise as multisets).
+    `outfile` -- the query writes its result to a csv file rather than returning it.
+    """
+    def __init__(self, name, csvdb_sql, sqlite_sql, ordered=False, outfile=None):
+        self.name = name
+        self.csvdb_sql = csvdb_sql
+        self.sqlite_sql = sqlite_sql
+        self.ordered = ordered
+        self.outfile = outfile
+
+
+def get_queries(schema):
+    """Returns the benchmark queries for a table with schema `schema` (list of (field, type)).
+    """
+    fields = dict(schema)
+    numeric = next((field for field, _type in schema if _type in ("float", "int") and field != "id"), "id")
+    varchar = next((field for field, _type in schema if _type == "varchar"), None)
+    threshold = 500 if fields[numeric] == "float" else 0
+    t = TABLE_NAME
+    queries = [
+        Query("full_scan", f"SELECT * FROM {t};", f"SELECT * FROM {t}"),
+        Query("filter_numeric", f"SELECT * FROM {t} WHERE {numeric} > {threshold};",
+              f"SELECT * FROM {t} WHERE {numeric} > {threshold}"),
+        Query("aggregate", f"SELECT COUNT(id), MIN({numeric}), MAX({numeric}), SUM({numeric}) FROM {t};",
+              f"SELECT COUNT(id), MIN({numeric}), MAX({numeric}), SUM({numeric}) FROM {t}"),
+        Query("order_by", f"SELECT id, {numeric} FROM {t} ORDER BY {numeric} DESC, id ASC;",
+              f"SELECT id, {numeric} FROM {t} ORDER BY {numeric} IS NULL, {numeric} DESC, id ASC", ordered=True),
+        Query("into_outfile", f'SELECT * INTO OUTFILE "out_csvdb.csv" FROM {t};', f"SELECT * FROM {t}",
+              outfile="out_csvdb.csv"),
+    ]
+    if varchar:
+        queries.insert(1, Query("projection", f"SELECT id, {varchar} FROM {t};", f"SELECT id, {varchar} FROM {t}"))
+    if "category" in fields:
+        queries.insert(3, Query("filter_varchar", f'SELECT * FROM {t} WHERE category = "cat3";',
+                                f"SELECT * FROM {t} WHERE category = 'cat3'"))
+        queries.insert(5, Query("group_by", f"SELECT category, COUNT(id), AVG({numeric}) FROM {t} GROUP BY category;",
+                                f"SELECT category, COUNT(id), AVG({numeric}) FROM {t} GROUP BY category"))
+    # A materialized view whose WHERE field is also an aggregate input:
+    group = "category, " if "category" in fields else ""
+    group_by = " GROUP BY category" if group else ""
+    view_query = f"SELECT {group}COUNT(*), SUM({numeric}) FROM {t} WHERE {numeric} > {threshold}{group_by}"
+    queries.append(Query("view_filter", f"DROP TABLE IF EXISTS {t}_view; CREATE MATERIALIZED VIEW {t}_view AS "
+                         f"{view_query}; SELECT * FROM {t}_view;", view_query))
+    # An UPDATE of every row of an analyzed table (a copy), which compacts it back to the same row count:
+    queries.append(Query("update_analyzed", f"DROP TABLE IF EXISTS {t}_copy; CREATE TABLE {t}_copy AS SELECT * FROM {t}; "
+                         f"ANALYZE {t}_copy; UPDATE {t}_copy SET {numeric} = 1000000000000; "
+                         f"SELECT COUNT(*) FROM {t}_copy WHERE {numeric} > 999999999999;", f"SELECT COUNT(*) FROM {t}"))
+    return queries
+
+
+class CsvdbEngine:
+    """Runs CSVDB commands in-process in root directory `root`.
+    """
+    name = "csvdb"
+
+    def __init__(self, root):
+        self.root = root
+        os.chdir(root)
+        Table.table_dict.clear()
+        Catalog.open()
+
+    def execute(self, sql):
+        """Executes `sql`. Returns (status, output rows) - status is "ok", "unsupported" or "error".
+        """
+        rows = []
+        console = io.StringIO()
+        printer = BatchPrinter(lambda fields: None, rows.extend)
+        with contextlib.redirect_stdout(console):
+            for node in SqlParser(sql).parse_multi_commands():
+                Table.execute_command(node, printer)
+        if "not supported" in console.getvalue():
+            return "unsupported", rows
+        if "error" in console.getvalue():
+            return "error: " + console.getvalue().strip().replace("\n", " "), rows
+        return "ok", rows
+
+    def load(self, schema, csv_path):
+        columns = ", ".join(f"{field} {_type}" for field, _type in schema)
+        self.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}; CREATE TABLE {TABLE_NAME} ({columns});")
+        start = time.perf_counter()
+        status, rows = self.execute(f'LOAD DATA INFILE "{csv_path}" INTO TABLE {TABLE_NAME} IGNORE 1 LINES;')
+        return status, time.perf_counter() - start
+
+    def run(self, query):
+        status, rows = self.execute(query.csvdb_sql)
+        if query.outfile and status == "ok":
+            rows = read_csv(os.path.join(self.root, query.outfile))
+        return status, rows
+
+
+class SqliteEngine:
+    """Runs the SQLite dialect queries on an SQLite database file in root directory `root`.
+    """
+    name = "sqlite"
+
+    def __init__(self, root):
+        self.root = root
+        self.connection = sqlite3.connect(os.path.join(root, "bench.db"))
+
+    def load(self, schema, csv_path):
+        columns = ", ".join(f"{field} {SQLITE_TYPES[_type]}" for field, _type in schema)
+        # CSVDB has no NULL VARCHAR values (an empty field is loaded as an empty string):
+        converters = [{"int": int, "timestamp": int, "float": float}.get(_type) for field, _type in schema]
+        self.connection.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+        self.connection.execute(f"CREATE TABLE {TABLE_NAME} ({columns})")
+        start = time.perf_counter()
+        with open(csv_path, newline='') as infile:
+            reader = csv.reader(infile)
+            next(reader)  # header
+            placeholders = ", ".join("?" * len(schema))
+            with self.connection:
+                self.connection.executemany(f"INSERT INTO {TABLE_NAME} VALUES ({placeholders})",
+                    ([value if not convert else convert(value) if value else None
+                      for convert, value in zip(converters, row)] for row in reader))
+        return "ok", time.perf_counter() - start
+
+    def run(self, query):
+        cursor = self.connection.execute(query.sqlite_sql)
+        if not query.outfile:
+            return "ok", cursor.fetchall()
+        path = os.path.join(self.root, "out_sqlite.csv")
+        with open(path, 'w', newline='') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow([description[0] for description in cursor.description])
+            writer.writerows(cursor)
+        return "ok", read_csv(path)
+
+
+def read_csv(path):
+    with open(path, newline='') as infile:
+        return list(csv.reader(infile))
+
+
+def normalize(rows, ordered):
+    """Returns `rows` in a comparable form: floats rounded, lists as tuples, sorted if not `ordered`.
+    """
+    rows = [tuple(round(value, 6) if isinstance(value, float) else value for value in row) for row in rows]
+    return rows if ordered else sorted(rows, key=repr)
+
+
+def time_query(engine, query, repeat):
+    """Runs `query` `repeat` times. Returns (status, list of times, result of the last run).
+    """
+    times = []
+    status, rows = "ok", []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        status, rows = engine.run(query)
+        times.append(time.perf_counter() - start)
+        if status != "ok":
+            break
+    return status, times, rows
+
+
+def run_profile(profile, rows, seed, repeat, workdir):
+    """Benchmarks one data profile. Returns the list of report records.
+    """
+    records = []
+    root = os.path.join(workdir, profile)
+    os.makedirs(root)
+    csv_path = os.path.join(root, "data.csv")
+    schema = gen_csv.generate(csv_path, profile, rows, seed)
+    engines = [CsvdbEngine(root), SqliteEngine(root)]
+
+    def record(query_name, engine, status, times, returned=None, match=None):
+        records.append({
+            "profile": profile, "rows": rows, "query": query_name, "engine": engine.name, "status": status,
+            "min_s": min(times) if times else None, "median_s": statistics.median(times) if times else None,
+            "rows_returned": returned, "match": match,
+        })
+
+    for engine in engines:
+        status, seconds = engine.load(schema, csv_path)
+        record("load", engine, status, [seconds])
+
+    for query in get_queries(schema):
+        results = {}
+        for engine in engines:
+            if engine.name == "csvdb":
+                os.chdir(engine.root)
+            status, times, result = time_query(engine, query, repeat)
+            results[engine.name] = (status, times, result)
+        csvdb_status, csvdb_rows = results["csvdb"][0], results["csvdb"][2]
+        match = None
+        if csvdb_status == "ok":
+            match = normalize(csvdb_rows, query.ordered) == normalize(results["sqlite"][2], query.ordered)
+        for engine in engines:
+            status, times, result = results[engine.name]
+            record(query.name, engine, status, times if status == "ok" else [],
+                   len(result) if status == "ok" else None, match)
+    engines[1].connection.close()
+    return records
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def find_regressions(records, baseline_path, threshold):
+    """Returns the csvdb records whose median time is more than `threshold` times the baseline's.
+    """
+    with open(baseline_path) as infile:
+        baseline = json.load(infile)["results"]
+    key = lambda r: (r["profile"], r["rows"], r["query"], r["engine"])
+    baseline_times = {key(r): r["median_s"] for r in baseline if r["median_s"]}
+    return [(r, baseline_times[key(r)]) for r in records
+            if r["engine"] == "csvdb" and r["median_s"] and key(r) in baseline_times
+            and r["median_s"] > threshold * baseline_times[key(r)]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSVDB against SQLite on generated data")
+    parser.add_argument("--profiles", default="mixed,varchar,numeric,nulls",
+                        help="comma separated data profiles (see gen_csv.py)")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs of each query")
+    parser.add_argument("--json", help="write the report to this JSON file")
+    parser.add_argument("--csv", help="write the report to this CSV file")
+    parser.add_argument("--baseline", help="a previous JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.2, help="regression threshold (ratio to the baseline)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated data and tables")
+    args = parser.parse_args()
+
+    # Resolve output paths before the engines change the working directory:
+    outputs = [os.path.abspath(path) if path else None for path in (args.json, args.csv, args.baseline)]
+    json_path, csv_path, baseline_path = outputs
+    workdir = tempfile.mkdtemp(prefix="csvdb-bench-")
+    cwd = os.getcwd()
+    try:
+        records = []
+        for profile in args.profiles.split(","):
+            records += run_profile(profile, args.rows, args.seed, args.repeat, workdir)
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Data kept in {workdir}")
+        else:
+            shutil.rmtree(workdir)
+
+    print(f"{'profile':10}{'query':16}{'engine':8}{'median ms':>12}{'rows':>10}  status / match")
+    for r in records:
+        median = f"{r['median_s'] * 1000:.1f}" if r["median_s"] is not None else "-"
+        match = "" if r["match"] is None else ("  match" if r["match"] else "  MISMATCH")
+        print(f"{r['profile']:10}{r['query']:16}{r['engine']:8}{median:>12}{str(r['rows_returned'] or ''):>10}  {r['status']}{match}")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "git_revision": git_revision(),
+        "python": platform.python_version(), "platform": platform.platform(), "sqlite": sqlite3.sqlite_version,
+        "rows": args.rows, "seed": args.seed, "repeat": args.repeat, "results": records,
+    }
+    if json_path:
+        with open(json_path, 'w') as outfile:
+            json.dump(report, outfile, indent=2)
+    if csv_path:
+        with open(csv_path, 'w', newline='') as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+
+    failed = [r for r in records if r["match"] is False]
+    if baseline_path:
+        regressions = find_regressions(records, baseline_path, args.threshold)
+        for r, baseline_time in regressions:
+            print(f"REGRESSION: {r['profile']} {r['query']}: {r['median_s'] * 1000:.1f} ms "
+                  f"(baseline {baseline_time * 1000:.1f} ms)")
+        failed += regressions
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
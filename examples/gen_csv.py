@@ -1,9 +1,76 @@
+# Deterministic CSV data generator for the CSVDB benchmarks (see benchmark.py).
+# The same (profile, rows, seed, null ratio) always generates the same file.
+#
+# Usage:
+#   python gen_csv.py --profile mixed --rows 100000 --out mixed.csv
+import argparse
 import csv
+import random
+import string
 
 
+# Column mixes - each profile is a list of (field, type, generator) where generator(rand, i)
+# returns the value of row i as a string:
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
 
-# test "\""
-# test "--"
-# test ";"
+def gen_id(rand, i): return str(i + 1)
+def gen_int(rand, i): return str(rand.randint(-10**6, 10**6))
+def gen_float(rand, i): return repr(round(rand.uniform(0, 1000), 3))
+def gen_timestamp(rand, i): return str(1500000000 + rand.randint(1, 10**8))  # 0 is NULL in CSVDB
+def gen_category(rand, i): return "cat" + str(rand.randint(0, 19))
+def gen_name(rand, i): return " ".join(rand.choice(WORDS) for _ in range(rand.randint(1, 4)))
+def gen_text(rand, i):  # long text, sometimes with characters that must be quoted
+    text = "".join(rand.choice(string.ascii_letters + "     ") for _ in range(rand.randint(10, 120)))
+    return text + (', "quoted"' if rand.random() < 0.1 else "")
 
+PROFILES = {
+    "mixed": [("id", "int", gen_id), ("category", "varchar", gen_category), ("price", "float", gen_float),
+              ("qty", "int", gen_int), ("ts", "timestamp", gen_timestamp), ("name", "varchar", gen_name)],
+    "varchar": [("id", "int", gen_id), ("category", "varchar", gen_category), ("name", "varchar", gen_name),
+                ("title", "varchar", gen_text), ("body", "varchar", gen_text), ("tag", "varchar", gen_name)],
+    "numeric": [("id", "int", gen_id), ("qty", "int", gen_int), ("price", "float", gen_float),
+                ("cost", "float", gen_float), ("ts", "timestamp", gen_timestamp), ("ts2", "timestamp", gen_timestamp)],
+}
+NULL_RATIO = {"mixed": 0.0, "varchar": 0.0, "numeric": 0.0}  # default null ratio of each profile
+NULLS_PROFILE = "nulls"  # the "mixed" columns with half of the non-id values NULL
 
+
+def get_schema(profile):
+    """Returns the list of (field, type) of the table generated by `profile`.
+    """
+    columns = PROFILES["mixed" if profile == NULLS_PROFILE else profile]
+    return [(field, _type) for field, _type, gen in columns]
+
+
+def generate(path, profile="mixed", rows=10000, seed=0, null_ratio=None, header=True):
+    """Writes `rows` generated rows of profile `profile` to csv file `path`.
+    Non-key values are NULL (empty) with probability `null_ratio` (defaults to the profile's ratio).
+    Returns the schema of the table (see get_schema).
+    """
+    if null_ratio is None:
+        null_ratio = 0.5 if profile == NULLS_PROFILE else NULL_RATIO[profile]
+    columns = PROFILES["mixed" if profile == NULLS_PROFILE else profile]
+    rand = random.Random(seed)
+    with open(path, 'w', newline='') as outfile:
+        writer = csv.writer(outfile)
+        if header:
+            writer.writerow([field for field, _type, gen in columns])
+        for i in range(rows):
+            writer.writerow([gen(rand, i) if field == "id" or rand.random() >= null_ratio else ""
+                             for field, _type, gen in columns])
+    return get_schema(profile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate deterministic CSV data for the CSVDB benchmarks")
+    parser.add_argument("--profile", choices=sorted(PROFILES) + [NULLS_PROFILE], default="mixed")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--null-ratio", type=float, default=None, help="probability of a NULL value (default: by profile)")
+    parser.add_argument("--out", default=None, help="output file (default: PROFILE.csv)")
+    args = parser.parse_args()
+    schema = generate(args.out or args.profile + ".csv", args.profile, args.rows, args.seed, args.null_ratio)
+    print(", ".join(f"{field} {_type}" for field, _type in schema))
+
+if __name__ == "__main__":
+    main()
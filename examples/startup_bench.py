@@ -0,0 +1,104 @@
+# Startup benchmark of the csvdb command line tool.
+#
+# Runs `python -X importtime csvdb.py -r SCRIPT` on a trivial script many times and reports the
+# median wall time of a run and the modules that take the longest to import.
+# Bytecode is compiled before the runs, so the numbers are those of an installed tool.
+#
+# Usage:
+#   python startup_bench.py --runs 20 --json startup.json
+#   python startup_bench.py --baseline old_startup.json    # exit status 1 on a regression
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CSVDB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "csvdb.py")
+SCRIPT = "SHOW STATS;"  # executed without touching any table
+
+
+def parse_importtime(stderr):
+    """Parses the output of `python -X importtime`.
+    Returns a dict mapping a top-level module (imported by csvdb itself, not by another module)
+    to its cumulative import time in microseconds, and a dict mapping every module to its self time.
+    """
+    cumulative, self_times = {}, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        self_times[name.strip()] = int(self_us)
+        if not name.startswith("  "):  # nested imports are indented
+            cumulative[name.strip()] = int(cumulative_us)
+    return cumulative, self_times
+
+
+def run_once(workdir, script_path):
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", CSVDB_PATH, "-d", workdir, "-r", script_path],
+                            capture_output=True, text=True, env=env)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.exit(f"csvdb failed:\n{result.stderr}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of csvdb")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to print")
+    parser.add_argument("--json", help="write the report to this JSON file")
+    parser.add_argument("--baseline", help="a previous JSON report to check for a regression")
+    parser.add_argument("--threshold", type=float, default=1.2, help="regression threshold (ratio to the baseline)")
+    args = parser.parse_args()
+
+    subprocess.run([sys.executable, "-m", "compileall", "-q", os.path.dirname(CSVDB_PATH)], check=True)
+    with tempfile.TemporaryDirectory(prefix="csvdb-startup-") as workdir:
+        script_path = os.path.join(workdir, "startup.sql")
+        with open(script_path, 'w') as outfile:
+            outfile.write(SCRIPT)
+        run_once(workdir, script_path)  # warm up the file system cache
+        runs = [run_once(workdir, script_path) for _ in range(args.runs)]
+
+    times = [elapsed for elapsed, imports in runs]
+    import_totals = [sum(cumulative.values()) for elapsed, (cumulative, self_times) in runs]
+    # Median cumulative time of every top-level import:
+    modules = {}
+    for elapsed, (cumulative, self_times) in runs:
+        for name, us in cumulative.items():
+            modules.setdefault(name, []).append(us)
+    modules = {name: statistics.median(us) for name, us in modules.items()}
+
+    median_s = statistics.median(times)
+    print(f"startup: median {median_s * 1000:.1f} ms, min {min(times) * 1000:.1f} ms over {args.runs} runs")
+    print(f"imports: median {statistics.median(import_totals) / 1000:.1f} ms, {len(runs[0][1][1])} modules")
+    print(f"{'top-level import':30}{'cumulative ms':>14}")
+    for name, us in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:30}{us / 1000:>14.2f}")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0], "runs": args.runs,
+        "median_s": median_s, "min_s": min(times), "imports_median_us": statistics.median(import_totals),
+        "modules": sorted(runs[0][1][1]), "top_level_imports_us": modules,
+    }
+    if args.json:
+        with open(args.json, 'w') as outfile:
+            json.dump(report, outfile, indent=2)
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+        new_modules = sorted(set(report["modules"]) - set(baseline["modules"]))
+        if new_modules:
+            print(f"new imports at startup: {', '.join(new_modules)}")
+        if median_s > args.threshold * baseline["median_s"]:
+            print(f"REGRESSION: startup {median_s * 1000:.1f} ms (baseline {baseline['median_s'] * 1000:.1f} ms)")
+            sys.exit(1)
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
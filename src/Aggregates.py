@@ -0,0 +1,198 @@
+from Column import Column
+from Errors import FieldNotGroupedError, InvalidAggregateError
+from Sketches import HyperLogLog, KLLSketch
+from Spill import DistinctSet
+
+
+class Aggregate:
+    """Base class of the state of an aggregate function over the values of a group.
+    `add` adds a non-NULL value, `merge` merges the state of the same aggregate over other values
+    (e.g. another partition of the rows), and `result` returns the aggregate (None for NULL).
+    """
+
+    def __init__(self, parameter=None):
+        self.parameter = parameter
+
+class Count(Aggregate):
+    def __init__(self, parameter=None):
+        super().__init__(parameter)
+        self.count = 0
+    def add(self, value): self.count += 1
+    def merge(self, other): self.count += other.count
+    def result(self): return self.count
+
+class Sum(Aggregate):
+    def __init__(self, parameter=None):
+        super().__init__(parameter)
+        self.total = None
+    def add(self, value): self.total = value if self.total is None else self.total + value
+    def merge(self, other):
+        if other.total is not None: self.add(other.total)
+    def result(self): return self.total
+
+class Avg(Aggregate):
+    def __init__(self, parameter=None):
+        super().__init__(parameter)
+        self.total = self.count = 0
+    def add(self, value):
+        self.total += value
+        self.count += 1
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+    def result(self): return self.total / self.count if self.count else None
+
+class Min(Aggregate):
+    def __init__(self, parameter=None):
+        super().__init__(parameter)
+        self.value = None
+    def add(self, value):
+        if self.value is None or value < self.value: self.value = value
+    def merge(self, other):
+        if other.value is not None: self.add(other.value)
+    def result(self): return self.value
+
+class Max(Min):
+    def add(self, value):
+        if self.value is None or value > self.value: self.value = value
+
+class ApproxCountDistinct(Aggregate):
+    """Distinct count estimated by a HyperLogLog sketch (constant memory, about 1.6% error).
+    """
+    def __init__(self, parameter=None):
+        super().__init__(parameter)
+        self.sketch = HyperLogLog()
+    def add(self, value): self.sketch.add(value)
+    def merge(self, other): self.sketch.merge(other.sketch)
+    def result(self): return self.sketch.estimate()
+
+class ApproxPercentile(Aggregate):
+    """The `parameter`-quantile estimated by a KLL sketch (constant memory, under 1% rank error).
+    """
+    def __init__(self, parameter=None):
+        super().__init__(parameter)
+        self.sketch = KLLSketch()
+    def add(self, value): self.sketch.add(value)
+    def merge(self, other): self.sketch.merge(other.sketch)
+    def result(self): return self.sketch.quantile(self.parameter)
+
+
+NUMERIC_TYPES = ["int", "float", "timestamp"]
+# Maps an aggregate function to (its Aggregate class, the field types it applies to (None - all), its output type):
+AGGREGATES = {
+    "count": (Count, None, lambda _type: "int"),
+    "sum": (Sum, ["int", "float"], lambda _type: _type),
+    "avg": (Avg, NUMERIC_TYPES, lambda _type: "float"),
+    "min": (Min, None, lambda _type: _type),
+    "max": (Max, None, lambda _type: _type),
+    "approx_count_distinct": (ApproxCountDistinct, None, lambda _type: "int"),
+    "approx_percentile": (ApproxPercentile, NUMERIC_TYPES, lambda _type: _type),
+}
+
+
+class Aggregation:
+    """Hash aggregation operator of a SELECT command with aggregate functions and/or a GROUP BY clause.
+    The input rows are grouped by the values of the GROUP BY fields (all the rows are a single group
+    without GROUP BY), and the aggregate functions of the output fields are computed over each group.
+    NULL values are ignored by the aggregate functions (COUNT(*) counts all the rows of a group);
+    an aggregate over no values is NULL (0 for COUNT).
+
+    COUNT(DISTINCT field) adds the (group, value) pairs to a `DistinctSet`, which spills to disk
+    when they don't fit in memory, and counts the distinct pairs of each group after the input was read.
+    """
+
+    def __init__(self, group_fields, select_fields):
+        """`group_fields` -- list of (table, column) of the GROUP BY fields.
+        `select_fields` -- list of (SelectField, table, column) of the output fields
+                           (column is None for COUNT(*)).
+        """
+        self.input = []  # (identifier, table, column) of the fields of an input row
+        self.group_positions = [self.input_position(table, column) for table, column in group_fields]
+        group_columns = [column for table, column in group_fields]
+        self.outputs = []  # ("group", index in the group key) or ("aggregate", index in `aggregates`) of each output field
+        self.aggregates = []  # (Aggregate class, parameter, input position (None for COUNT(*)), NULL value, distinct)
+        self.fields = []  # output field identifiers
+        self.types = []  # output field types
+        for field, table, column in select_fields:
+            self.fields.append(field.identifier)
+            if not field.agg_func:
+                if column not in group_columns:
+                    raise FieldNotGroupedError(field.field_name)
+                self.outputs.append(("group", group_columns.index(column)))
+                self.types.append(column.type)
+                continue
+            aggregate_class, types, output_type = AGGREGATES[field.agg_func]
+            if column is not None and types is not None and column.type not in types:
+                raise InvalidAggregateError(field.agg_func, field.field_name, column.type)
+            position = None if column is None else self.input_position(table, column)
+            null = None if column is None else Column.TYPE_TO_NULL.get(column.type)
+            self.outputs.append(("aggregate", len(self.aggregates)))
+            self.aggregates.append((aggregate_class, field.parameter, position, null, field.distinct))
+            self.types.append(output_type(column.type if column is not None else None))
+        self.nulls = [Column.TYPE_TO_NULL.get(_type) for _type in self.types]  # NULL value of each output field
+        self.having = None  # predicate of an output row (HAVING clause), set by the planner
+        self.spilled_partitions = 0  # number of partitions of distinct values spilled to disk
+
+    def input_position(self, table, column):
+        for i, (identifier, input_table, input_column) in enumerate(self.input):
+            if input_column is column:
+                return i
+        self.input.append((f"{table.name}.{column.field}", table, column))
+        return len(self.input) - 1
+
+    def new_states(self):
+        return [aggregate_class(parameter) for aggregate_class, parameter, position, null, distinct in self.aggregates]
+
+    def aggregate(self, rows):
+        """Yields the output rows (tuples) of the groups of the input rows `rows`.
+        """
+        yield from self.output(self.accumulate(rows))
+
+    def accumulate(self, rows, groups=None):
+        """Adds the input rows `rows` to the states of the aggregates of their groups, and returns the groups:
+        a dict mapping a group key to the list of the states of its aggregates. If `groups` is supplied
+        (e.g. the groups of the rows of a materialized view, see `Table.refresh_view`), the rows are added to it.
+        """
+        groups = {} if groups is None else groups
+        distinct_sets = {i: DistinctSet() for i, aggregate in enumerate(self.aggregates) if aggregate[4]}
+        inputs = [(position, null, distinct_sets.get(i))
+                  for i, (aggregate_class, parameter, position, null, distinct) in enumerate(self.aggregates)]
+        group_positions = self.group_positions
+        try:
+            for row in rows:
+                key = tuple([row[i] for i in group_positions])
+                states = groups.get(key)
+                if states is None:
+                    states = groups[key] = self.new_states()
+                for state, (position, null, distinct_set) in zip(states, inputs):
+                    if position is None:  # COUNT(*)
+                        state.add(None)
+                        continue
+                    value = row[position]
+                    if value == null:
+                        continue
+                    if distinct_set is not None:
+                        distinct_set.add((key, value))
+                    else:
+                        state.add(value)
+            if not group_positions and not groups:  # aggregates of no rows
+                groups[()] = self.new_states()
+            for i, distinct_set in distinct_sets.items():
+                for key, value in distinct_set:
+                    groups[key][i].add(value)
+                self.spilled_partitions += distinct_set.spilled_partitions
+        finally:
+            for distinct_set in distinct_sets.values():
+                distinct_set.close()
+        return groups
+
+    def output(self, groups):
+        """Yields the output rows (tuples) of the groups `groups` (see `accumulate`).
+        """
+        for key, states in groups.items():
+            row = []
+            for (kind, i), null in zip(self.outputs, self.nulls):
+                value = key[i] if kind == "group" else states[i].result()
+                row.append(null if value is None else value)
+            if self.having is None or self.having(row):
+                yield tuple(row)
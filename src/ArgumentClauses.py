@@ -24,6 +24,97 @@ class Condition(object):
 
 
 
+class JoinClause(object):
+    """A JoinClause object represents the JOIN clause of the SELECT command:
+    Syntax:
+        JOIN _table_name_ ON _left_field_ = _right_field_
+
+        {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+        _left_field_, _right_field_: _field_name_ of either of the joined tables
+            _field_name_: [_table_name_.]_field_
+
+    e.g:
+        JOIN ratings ON movies.id = ratings.movie_id  =>  _table_name_ = "ratings"
+                                                         _left_field_ = "movies.id"
+                                                         _right_field_ = "ratings.movie_id"
+    """
+
+    def __init__(self, table_name, left_field, right_field):
+        self.table_name = table_name
+        self.left_field = left_field
+        self.right_field = right_field
+
+    def __str__(self):
+        return f"JOIN {self.table_name} ON {self.left_field} = {self.right_field}"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+
+class SampleClause(object):
+    """A SampleClause object represents the TABLESAMPLE clause of the SELECT command:
+    Syntax:
+        TABLESAMPLE _method_ (_percentage_) [REPEATABLE (_seed_)]
+
+        {KEYWORD} _method_: [SYSTEM | BERNOULLI]
+            SYSTEM - each block of rows is read with probability _percentage_ / 100
+            BERNOULLI - each row is returned with probability _percentage_ / 100
+        {LIT_NUM} _percentage_: Number between 0 and 100
+        {LIT_NUM} _seed_: Integer - the same seed samples the same rows (of the same table)
+
+    e.g:
+        TABLESAMPLE SYSTEM (10) REPEATABLE (42)  =>  _method_ = "system"
+                                                     _percentage_ = 10
+                                                     _seed_ = 42
+    """
+
+    def __init__(self, method, percentage, seed=None):
+        self.method = method
+        self.percentage = percentage
+        self.seed = seed
+
+    def __str__(self):
+        repeatable = f" REPEATABLE ({self.seed})" if self.seed is not None else ""
+        return f"TABLESAMPLE {self.method.upper()} ({self.percentage}){repeatable}"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+
+class PartitionClause(object):
+    """A PartitionClause object represents the PARTITION BY clause of the CREATE command:
+    Syntax:
+        PARTITION BY RANGE (_field_name_) INTERVAL _interval_
+        PARTITION BY LIST (_field_name_)
+
+        {IDENTIFIER} _field_name_: [a-zA-Z_]\w*
+        {LIT_NUM} _interval_: Positive number - the width of the range of values of a partition
+            RANGE - a numeric field's values in [k*_interval_, (k+1)*_interval_) are in the same partition
+            LIST - each value of the field has its own partition
+        NULL values are in a partition of their own.
+
+    e.g:
+        PARTITION BY RANGE (ts) INTERVAL 86400  =>  _method_ = "range"
+                                                    _field_name_ = "ts"
+                                                    _interval_ = 86400
+    """
+
+    def __init__(self, method, field_name, interval=None):
+        self.method = method
+        self.field_name = field_name
+        self.interval = interval
+
+    def __str__(self):
+        interval = f" INTERVAL {self.interval}" if self.method == "range" else ""
+        return f"PARTITION BY {self.method.upper()} ({self.field_name}){interval}"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+
 class Field(object):
     """Base class for representing field objects: SelectField, GroupField, OrderField.
     """
@@ -48,9 +139,13 @@ class SelectField(Field):
 
     2. Aggregated expression:
         Syntax:
-            _agg_func_(_field_name_)
-            {KEYWORD} _agg_func_: [MIN|MAX|AVG|SUM|COUNT]
+            _agg_func_([DISTINCT] _field_name_)
+            {KEYWORD} _agg_func_: [MIN|MAX|AVG|SUM|COUNT|APPROX_COUNT_DISTINCT]
             {IDENTIFIER} _field_name_: [a-zA-Z_]\w*
+            DISTINCT is only allowed in COUNT, and _field_name_ may be * in COUNT(*).
+        or:
+            APPROX_PERCENTILE(_field_name_, _parameter_)
+            {LIT_NUM} _parameter_: the percentile, between 0 and 1
 
     Both expressions can be assigned a non-default identifier:
     Syntax:
@@ -62,28 +157,37 @@ class SelectField(Field):
     1. For simple expression: _field_name_ - the default identifier is _field_name_
     2. For aggregated expression: _agg_func_(_field_name) - the default identifier is _agg_func_(_field_name_)
        e.g: COUNT(col0) - default identifier is 'count(col0)'
+            COUNT(DISTINCT col0) - default identifier is 'count(distinct col0)'
+            APPROX_PERCENTILE(col0, 0.5) - default identifier is 'approx_percentile(col0, 0.5)'
     """
 
-    def __init__(self, field_name, identifier=None, agg_func=None):
+    def __init__(self, field_name, identifier=None, agg_func=None, distinct=False, parameter=None):
+        self.field_name = field_name
+        self.agg_func = agg_func
+        self.distinct = distinct
+        self.parameter = parameter
         if identifier:
             # an identifier was supplied
             super().__init__(identifier)
         elif agg_func:
             # default identifier for aggregate expression
-            super().__init__(f"{agg_func}({field_name})")
+            super().__init__(self.agg_expression())
         else:
             # default identifier for simple expression
             super().__init__(field_name)
 
-        self.field_name = field_name
-        self.agg_func = agg_func
+    def agg_expression(self):
+        argument = ("distinct " if self.distinct else "") + self.field_name
+        if self.parameter is not None:
+            argument += f", {self.parameter}"
+        return f"{self.agg_func}({argument})"
 
     def __str__(self):
         # Aggregate expression:
         if self.agg_func:
-            if self.identifier != f"{self.agg_func}({self.field_name})":
-                return f"{self.agg_func}({self.field_name}) AS {self.identifier}"
-            return f"{self.agg_func}({self.field_name})"
+            if self.identifier != self.agg_expression():
+                return f"{self.agg_expression()} AS {self.identifier}"
+            return self.agg_expression()
 
         # Simple expression:
         if self.identifier != self.field_name:
@@ -0,0 +1,60 @@
+import os
+
+
+class DeletionBitmap:
+    """The deletion bitmap of a segment of a table (the table, or a partition - see `Table.segments`):
+    bit i (bit i%8 of byte i//8) is set iff row i of the segment was deleted (by DELETE or UPDATE).
+    Rows after the end of the bitmap (e.g. loaded after the last deletion) aren't deleted.
+
+    The bitmap is stored in the file 'deleted.<version>.bitmap' of the segment directory. A new version is
+    written to a new file, which is committed by recording its version and the number of deleted rows in
+    'table.json' (the `deleted` and `bitmap` fields of the segment), so a crash never leaves a partially
+    written bitmap, and readers read the version of their snapshot. Segments without deleted rows have no bitmap.
+    """
+
+    # Maps a byte of the bitmap to the 8 bytes of the live mask of its rows (1 - live, 0 - deleted):
+    LIVE_BYTES = [bytes(0 if byte >> bit & 1 else 1 for bit in range(8)) for byte in range(256)]
+
+    def __init__(self, data=b""):
+        self.bits = bytearray(data)
+
+    @staticmethod
+    def path(segment, version):
+        return os.path.join(segment.name, f"deleted.{version}.bitmap")
+
+    @staticmethod
+    def load(segment):
+        """Returns the deletion bitmap of `segment` (empty if it has no deleted rows).
+        """
+        if not segment.bitmap:
+            return DeletionBitmap()
+        with open(DeletionBitmap.path(segment, segment.bitmap), 'rb') as bitmap_file:
+            return DeletionBitmap(bitmap_file.read())
+
+    def save(self, segment):
+        """Writes the bitmap to a new version file of `segment` (synced to the disk) and returns its version.
+        The caller commits it by setting the segment's `bitmap` to the version and updating 'table.json'.
+        """
+        version = segment.bitmap + 1
+        with open(DeletionBitmap.path(segment, version), 'wb') as bitmap_file:
+            bitmap_file.write(self.bits)
+            bitmap_file.flush()
+            os.fsync(bitmap_file.fileno())
+        return version
+
+    def is_deleted(self, row_id):
+        byte = row_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (row_id & 7) & 1)
+
+    def delete(self, row_id):
+        byte = row_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (row_id & 7)
+
+    def live_mask(self, num_rows):
+        """Returns a bytes object of `num_rows` bytes, 1 for every live row and 0 for every deleted row
+        (for filtering the rows of a scan with `itertools.compress`).
+        """
+        mask = b"".join([DeletionBitmap.LIVE_BYTES[byte] for byte in self.bits])
+        return mask[:num_rows] + b"\x01" * (num_rows - len(mask))
@@ -0,0 +1,177 @@
+import os
+from collections import OrderedDict
+
+
+class BlockCache:
+    """Process-wide cache of the blocks (BLOCK_SIZE bytes at offset block*BLOCK_SIZE) of the column files,
+    shared by all the columns and queries of the session, so that tables read repeatedly (e.g. the
+    dimension table of a join) are served from memory. The least recently used blocks are evicted
+    when the cached blocks exceed `budget` bytes.
+
+    A block is keyed by (file path, file generation, block number). The generation identifies the file:
+    its device and inode, and the creation time of its table (so a table dropped and recreated under
+    the same name doesn't hit the blocks of the old table, even if the inode is reused).
+    Only blocks that are entirely within the committed records of a file are cached - committed records
+    are never modified, while records after them may be truncated by the next LOAD (see `Column.truncate`).
+
+    Files read sequentially (scans) are read ahead: the blocks after the block a reader moves on to are
+    read in the background - by the kernel (`os.posix_fadvise`) where it's available, otherwise by a pool of
+    threads (`os.pread` doesn't hold the GIL) - so the reads of all the columns of a scan overlap with the
+    filtering and output of the rows already read (see `CachedFile.read_ahead`).
+    """
+
+    BLOCK_SIZE = 64 * 1024  # a multiple of the record size of numeric columns and of .pointers files (8)
+    budget = 64 * 1024 * 1024  # maximum number of bytes of the cached blocks
+    blocks = OrderedDict()  # maps (path, generation, block number) to the block's bytes, least recently used first
+    size = 0  # number of bytes of the cached blocks
+    hits = misses = evictions = 0
+    read_ahead = 8  # number of blocks read ahead of a file read sequentially (0 - disabled)
+    read_ahead_workers = 4  # number of threads reading ahead
+    executor = None  # the thread pool reading ahead (started on first use)
+    prefetched = 0  # number of blocks read by the read-ahead threads that were then read
+
+    @staticmethod
+    def set_read_ahead(blocks):
+        BlockCache.read_ahead = blocks
+
+    @staticmethod
+    def get_executor():
+        if BlockCache.executor is None:
+            from concurrent.futures import ThreadPoolExecutor  # imported on use to keep startup fast
+            BlockCache.executor = ThreadPoolExecutor(BlockCache.read_ahead_workers, thread_name_prefix="csvdb-read-ahead")
+        return BlockCache.executor
+
+    @staticmethod
+    def set_budget(budget):
+        BlockCache.budget = budget
+        BlockCache.evict()
+
+    @staticmethod
+    def evict():
+        while BlockCache.size > BlockCache.budget:
+            _, block = BlockCache.blocks.popitem(last=False)
+            BlockCache.size -= len(block)
+            BlockCache.evictions += 1
+
+    @staticmethod
+    def get(cached_file, block_number):
+        """Returns block `block_number` of the file of `cached_file` (a `CachedFile`), from the cache
+        if it's there, otherwise reads it and caches it if it's within the committed records.
+        """
+        key = (cached_file.path, cached_file.generation, block_number)
+        block = BlockCache.blocks.get(key)
+        if block is not None:
+            BlockCache.hits += 1
+            BlockCache.blocks.move_to_end(key)
+            return block
+        BlockCache.misses += 1
+        offset = block_number * BlockCache.BLOCK_SIZE
+        future = cached_file.pending.pop(block_number, None)
+        if future is not None:  # read ahead (or being read) by a read-ahead thread
+            block = future.result()
+            BlockCache.prefetched += 1
+        else:
+            block = os.pread(cached_file.fd, BlockCache.BLOCK_SIZE, offset)
+        if offset + BlockCache.BLOCK_SIZE <= cached_file.limit and len(block) == BlockCache.BLOCK_SIZE \
+           and BlockCache.budget > 0:
+            BlockCache.blocks[key] = block
+            BlockCache.size += len(block)
+            BlockCache.evict()
+        return block
+
+    @staticmethod
+    def invalidate(paths):
+        """Removes the cached blocks of the files `paths` (e.g. of a dropped table).
+        """
+        paths = set(paths)
+        for key in [key for key in BlockCache.blocks if key[0] in paths]:
+            BlockCache.size -= len(BlockCache.blocks.pop(key))
+
+    @staticmethod
+    def clear():
+        BlockCache.blocks.clear()
+        BlockCache.size = 0
+
+
+class CachedFile:
+    """A binary file opened for reading whose blocks are read through the `BlockCache`.
+    Supports the `read`, `seek` and `tell` methods of a file object.
+    `limit` -- the size of the committed records of the file (blocks after it aren't cached).
+    `created` -- the creation time of the table of the file (part of the file generation).
+    """
+
+    def __init__(self, path, limit=0, created=0):
+        self.path = path
+        self.limit = limit
+        self.fd = os.open(path, os.O_RDONLY)
+        stat = os.fstat(self.fd)
+        self.generation = (stat.st_dev, stat.st_ino, created)
+        self.position = 0
+        self.block_number = -1  # number of the block in `block` (the last block read)
+        self.block = b""
+        self.pending = {}  # maps a block number to the future of its read by a read-ahead thread
+        self.ahead = -1  # number of the last block read ahead
+
+    def seek(self, position):
+        self.position = position
+
+    def tell(self):
+        return self.position
+
+    def read(self, size):
+        block_number, offset = divmod(self.position, BlockCache.BLOCK_SIZE)
+        if block_number != self.block_number:
+            self.read_ahead(block_number)
+            self.block = BlockCache.get(self, block_number)
+            self.block_number = block_number
+        data = self.block[offset:offset+size]
+        if len(data) < size and len(self.block) == BlockCache.BLOCK_SIZE:  # continues in the next blocks
+            parts = [data]
+            remaining = size - len(data)
+            while remaining > 0:
+                block_number += 1
+                self.read_ahead(block_number)
+                block = BlockCache.get(self, block_number)
+                parts.append(block[:remaining])
+                remaining -= len(parts[-1])
+                self.block, self.block_number = block, block_number
+                if len(block) < BlockCache.BLOCK_SIZE:  # end of the file
+                    break
+            data = b"".join(parts)
+        self.position += len(data)
+        return data
+
+    def read_ahead(self, block_number):
+        """Reads ahead the `BlockCache.read_ahead` blocks after block `block_number` if the file is read
+        sequentially - `block_number` is the block after the last block read. The blocks are read ahead in
+        batches: once the reader is half way through the blocks read ahead, the next ones are read ahead.
+        Only committed blocks (see `limit`) are read ahead, each once: where `os.posix_fadvise` is available,
+        the kernel is advised to read them (it reads them into the page cache asynchronously, without a thread
+        of the process, so the reader and the disk work in parallel even on a single CPU), otherwise the
+        blocks that aren't cached are read by the read-ahead threads.
+        """
+        if block_number != self.block_number + 1 or not BlockCache.read_ahead \
+           or block_number + BlockCache.read_ahead // 2 < self.ahead:
+            return
+        first = max(block_number + 1, self.ahead + 1)
+        last = min(block_number + BlockCache.read_ahead, (self.limit - 1) // BlockCache.BLOCK_SIZE)
+        if first > last:
+            return
+        self.ahead = last
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(self.fd, first * BlockCache.BLOCK_SIZE, (last - first + 1) * BlockCache.BLOCK_SIZE,
+                             os.POSIX_FADV_WILLNEED)
+            return
+        executor = BlockCache.get_executor()
+        for number in range(first, last + 1):
+            if (self.path, self.generation, number) not in BlockCache.blocks and number not in self.pending:
+                self.pending[number] = executor.submit(os.pread, self.fd, BlockCache.BLOCK_SIZE, number * BlockCache.BLOCK_SIZE)
+
+    def close(self):
+        for future in self.pending.values():  # (no read of the file may outlive its file descriptor)
+            if not future.cancel():
+                future.exception()  # (waits for the read to finish)
+        self.pending = {}
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,140 @@
+import os
+import json
+
+
+class Catalog:
+    """The `Catalog` caches the metadata of tables (the contents of their 'table.json' file).
+    This class contains:
+        - static methods to look up, update and remove the metadata of a table.
+        - class variable 'entries':
+            `entries` maps a table name to a cache entry - the parsed 'table.json' of the table
+            together with the modification times of the table directory and of 'table.json'
+            at the time they were read.
+            An entry is revalidated on every lookup with two `os.stat` calls:
+                * If the directory mtime changed - files were added to or removed from the
+                  table directory, so the directory is rescanned to assure it's still a table.
+                * If only the 'table.json' mtime (or size) changed - 'table.json' is parsed again.
+            Otherwise the cached metadata is returned as is.
+        - class variable 'persistent':
+            If set (see `Catalog.open`), the entries are saved to the root-level catalog file
+            CATALOG_FILENAME whenever they change, and are read from it at startup.
+            This way a new session starts with a warm cache and doesn't rescan the table directories.
+    """
+    # Static variables:
+
+    CATALOG_FILENAME = "catalog.json"
+    TABLE_FILE_EXTENSIONS = [".col", ".pointers", ".lock", ".tmp", ".stats", ".bitmap", ".state"]  # files (other than 'table.json') allowed in a table directory
+
+    entries = {}
+    persistent = False
+    dirty = False  # True iff `entries` changed since the catalog file was last saved
+    hits = misses = 0  # number of lookups answered from the cache / by reading the table directory
+
+    @staticmethod
+    def open(persistent=False):
+        """Starts a catalog session in the current working directory (the root directory).
+        If `persistent` is True, the entries are loaded from the catalog file (if it exists).
+        """
+        Catalog.entries = {}
+        Catalog.persistent = persistent
+        Catalog.dirty = False
+        if persistent and os.path.isfile(Catalog.CATALOG_FILENAME):
+            try:
+                catalog_file = open(Catalog.CATALOG_FILENAME, 'r')
+                Catalog.entries = json.load(catalog_file)["tables"]
+                catalog_file.close()
+            except (ValueError, KeyError):  # corrupted catalog file - start with an empty catalog
+                Catalog.entries = {}
+
+    @staticmethod
+    def save():
+        """Saves the entries to the catalog file if the catalog is persistent and was changed.
+        """
+        if not Catalog.persistent or not Catalog.dirty:
+            return
+        temp_path = Catalog.CATALOG_FILENAME + ".tmp"
+        catalog_file = open(temp_path, 'w')
+        json.dump({"tables": Catalog.entries}, catalog_file)
+        catalog_file.close()
+        os.replace(temp_path, Catalog.CATALOG_FILENAME)  # atomic - a crash never leaves a half-written catalog
+        Catalog.dirty = False
+
+    @staticmethod
+    def get_signature(table_name):
+        """Returns the (directory mtime, 'table.json' mtime, 'table.json' size, 'table.json' inode)
+        of table `table_name`. ('table.json' is replaced atomically, so a new version has a new inode).
+        Returns None if either the directory or 'table.json' doesn't exist.
+        """
+        try:
+            dir_stat = os.stat(table_name)
+            json_stat = os.stat(os.path.join(table_name, "table.json"))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return [dir_stat.st_mtime_ns, json_stat.st_mtime_ns, json_stat.st_size, json_stat.st_ino]
+
+    @staticmethod
+    def is_table_directory(table_name):
+        """Checks if the contents of directory `table_name` match the schema of a table directory
+        (mandatory 'table.json', all other files have one of the extensions TABLE_FILE_EXTENSIONS,
+        and sub-directories - the partitions of a partitioned table - have only such files).
+        """
+        json_file_exists = False
+        for f in os.listdir(table_name):
+            name, ext = os.path.splitext(f)
+            if f == "table.json": json_file_exists = True
+            elif os.path.isdir(os.path.join(table_name, f)):
+                if any(os.path.splitext(g)[1] not in Catalog.TABLE_FILE_EXTENSIONS
+                       for g in os.listdir(os.path.join(table_name, f))):
+                    return False
+            elif ext not in Catalog.TABLE_FILE_EXTENSIONS:
+                return False
+        return json_file_exists
+
+    @staticmethod
+    def read_metadata(table_name):
+        jsonfile = open(os.path.join(table_name, "table.json"), 'r')
+        jsondata = json.load(jsonfile)
+        jsonfile.close()
+        return jsondata
+
+    @staticmethod
+    def lookup(table_name):
+        """Returns the metadata (parsed 'table.json') of table `table_name`,
+        or None if `table_name` isn't a table in the current working directory.
+        """
+        signature = Catalog.get_signature(table_name)
+        entry = Catalog.entries.get(table_name)
+        if signature is None:  # not a table (anymore)
+            if entry is not None:
+                Catalog.remove(table_name)
+            return None
+        if entry is not None and entry["signature"] == signature:  # cache hit
+            Catalog.hits += 1
+            return entry["metadata"]
+        Catalog.misses += 1
+
+        # Cache miss or stale entry - revalidate:
+        if entry is None or entry["signature"][0] != signature[0]:  # directory contents changed
+            if not Catalog.is_table_directory(table_name):
+                if entry is not None:
+                    Catalog.remove(table_name)
+                return None
+        Catalog.entries[table_name] = {"signature": signature, "metadata": Catalog.read_metadata(table_name)}
+        Catalog.dirty = True
+        return Catalog.entries[table_name]["metadata"]
+
+    @staticmethod
+    def table_exists(table_name):
+        return Catalog.lookup(table_name) is not None
+
+    @staticmethod
+    def update(table_name, metadata):
+        """Updates the entry of table `table_name` after its 'table.json' was written with `metadata`.
+        """
+        Catalog.entries[table_name] = {"signature": Catalog.get_signature(table_name), "metadata": metadata}
+        Catalog.dirty = True
+
+    @staticmethod
+    def remove(table_name):
+        if Catalog.entries.pop(table_name, None) is not None:
+            Catalog.dirty = True
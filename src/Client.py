@@ -0,0 +1,94 @@
+"""Client library for the CSVDB query server (see Server.py for the wire protocol).
+This module doesn't import the CSVDB engine, so clients start quickly.
+
+Usage:
+    with Client("unix:/tmp/csvdb.sock") as client:
+        fields, rows = client.select("SELECT * FROM movies;")
+        for row in rows:
+            ...
+"""
+import json
+import socket
+import struct
+
+
+HEADER = struct.Struct(">I")  # frame header - payload length
+
+
+def encode_frame(obj):
+    payload = json.dumps(obj).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def parse_address(address):
+    """Returns ("unix", PATH) or ("tcp", (HOST, PORT)) for the address string `address`.
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+class Client:
+    """A connection to a CSVDB query server listening on `address`.
+    """
+
+    def __init__(self, address):
+        kind, address = parse_address(address)
+        if kind == "unix":
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.connect(address)
+        self.sockfile = self.sock.makefile('rb')
+
+    def close(self):
+        self.sockfile.close()
+        self.sock.close()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc_info): self.close()
+
+    def read_frame(self):
+        header = self.sockfile.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ConnectionError("CSVDB server closed the connection")
+        return json.loads(self.sockfile.read(HEADER.unpack(header)[0]).decode("utf-8"))
+
+    def execute(self, sql):
+        """Sends `sql` (one or more commands) to the server and yields its output as it arrives:
+            ("fields", [FIELD, ...]) -- start of the output of a SELECT command
+            ("rows", [ROW, ...]) -- a batch of output rows
+            ("message", TEXT) -- console output of a command (errors, verbose messages)
+        The generator must be exhausted before the next request is sent.
+        """
+        self.sock.sendall(encode_frame({"sql": sql}))
+        while True:
+            frame = self.read_frame()
+            if frame.get("done"):
+                return
+            for kind in ("fields", "rows", "message"):
+                if kind in frame:
+                    yield kind, frame[kind]
+
+    def select(self, sql):
+        """Executes the single SELECT command `sql`.
+        Returns its output fields and a generator of its output rows.
+        Console output (e.g. an error message) is printed.
+        """
+        output = self.execute(sql)
+        for kind, value in output:
+            if kind == "fields":
+                return value, Client.rows(output)
+            elif kind == "message":
+                print(value, end="")
+        return [], iter(())
+
+    @staticmethod
+    def rows(output):
+        for kind, value in output:
+            if kind == "rows":
+                yield from value
+            elif kind == "message":
+                print(value, end="")
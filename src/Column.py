@@ -1,5 +1,8 @@
 import os
 import struct
+from collections import Counter
+
+from BlockCache import BlockCache, CachedFile
 
 
 class Column:
@@ -18,51 +21,254 @@ class Column:
         "float": float("-inf"),
         "timestamp": 0
     }
+    bytes_read = Counter()  # maps a column file path to the number of bytes read from it in this session
+    COALESCE_GAP = 64  # records fetched by `fetch` that are at most this many records apart are read by a single read
 
     def __init__(self, table, field, _type, index):
         self.table = table
         self.field = field
         self.type = _type
         self.index = index
+        self.rows_left = None  # number of records left to read (None - read until the end of the file)
+        self.reading = False  # True iff the column file(s) are open for reading
+        self.start_offsets = (0, 0)  # offsets in the column file and pointers file reading started at
+        self.records = ()  # the batch of records (pointers of a VARCHAR column) read by `__next__`
+        self.next_index = 0  # index of the next record in `records`
         self.col_path = os.path.join(self.table.name, self.field) + ".col"
-        self.colfile = open(self.col_path, 'a'); self.colfile.close()
+        self.colfile = open(self.col_path, 'a') if not table.partitioning else open(os.devnull)
+        self.colfile.close()  # (the files of a partitioned table are in its partitions - see `Partition`)
         if self.type == "varchar":
             self.pointers_path = os.path.join(self.table.name, self.field) + ".pointers"
-            self.pointersfile = open(self.pointers_path, 'a'); self.pointersfile.close()
+            self.pointersfile = open(self.pointers_path, 'a') if not table.partitioning else open(os.devnull)
+            self.pointersfile.close()
             self.cur_pointer = 0  # value of the current pointer
 
     def close(self):
+        if self.reading:
+            self.count_bytes_read()
+            self.reading = False
         self.colfile.close()
         if self.type == "varchar":  # VARCHAR column
             self.pointersfile.close()
 
-    def open(self, mode=""):
+    def count_bytes_read(self):
+        """Adds the bytes read since the last seek (the files are read sequentially from `start_offsets`)
+        to `bytes_read`.
+        """
+        Column.bytes_read[self.col_path] += self.colfile.tell() - self.start_offsets[0]
+        if self.type == "varchar":
+            Column.bytes_read[self.pointers_path] += self.pointersfile.tell() - self.start_offsets[1]
+
+    def open(self, mode="", rows=None, start=0):
         """Opens the column file(s) for:
-        reading - by default
+        reading - by default. If `rows` is supplied, only the first `rows` records are read
+                  (the row count committed when the read started - see `TableLock`).
+                  If `start` is supplied, reading starts at record `start` (records before it are skipped).
+                  The files are read through the `BlockCache` (see `open_cached`).
         writing - if `mode` == "load"
         """
         self.close()
+        self.reading = mode != "load"
+        if self.reading:
+            self.colfile, self.pointersfile = self.open_cached(rows)
+        elif self.type == "varchar":  # VARCHAR column
+            self.colfile = open(self.col_path, 'ab')
+            self.pointersfile = open(self.pointers_path, 'ab')
+        else:  # (INT | FLOAT | TIMESTAMP) column
+            self.colfile = open(self.col_path, 'ab')
+        self.start_offsets = (0, 0)
+        self.cur_pointer = 0
+        self.records, self.next_index = (), 0
+        self.rows_left = rows
+        if start and self.reading:
+            self.seek_row(start, rows)
+
+    def open_cached(self, rows=None):
+        """Returns the column file and the .pointers file (None for a numeric column) opened for reading
+        through the `BlockCache`. Only the blocks of the first `rows` (committed) records are cached.
+        """
+        created = self.table.created
+        if self.type != "varchar":
+            return CachedFile(self.col_path, (rows or 0) * 8, created), None
+        pointersfile = CachedFile(self.pointers_path, (rows or 0) * 8, created)
+        col_size = 0
+        if rows:  # the committed records end where record `rows`-1 ends
+            pointersfile.seek((rows-1) * 8)
+            col_size = struct.unpack('Q', pointersfile.read(8))[0]
+            pointersfile.seek(0)
+        return CachedFile(self.col_path, col_size, created), pointersfile
+
+    def seek_row(self, start, end=None):
+        """Moves a column opened for reading to record `start`, so that the next records read are
+        records `start`..`end`-1 (or until the end of the file if `end` is None).
+        Uses the fixed width of numeric records, and the .pointers file of a VARCHAR column.
+        """
+        self.count_bytes_read()
+        if self.type == "varchar":  # record `start` begins where record `start`-1 ends
+            self.cur_pointer = 0
+            self.pointersfile.seek(max(start-1, 0) * 8)
+            if start > 0:  # (reading the pointer leaves the .pointers file at record `start`)
+                self.cur_pointer = struct.unpack('Q', self.pointersfile.read(8))[0]
+            self.colfile.seek(self.cur_pointer)
+            self.start_offsets = (self.cur_pointer, start * 8)
+        else:  # (INT | FLOAT | TIMESTAMP) column
+            self.colfile.seek(start * 8)
+            self.start_offsets = (start * 8, 0)
+        self.records, self.next_index = (), 0
+        self.rows_left = end - start if end is not None else None
+
+    def read_range(self, start, end, files):
+        """Returns the list of the values of records `start`..`end`-1, reading the range by a single read
+        of each of the column files `files` (returned by `open_cached`) - see `read_range_data`.
+        """
+        data, pointers, begin = self.read_range_data(start, end, files)
+        if self.type != "varchar":
+            return list(struct.unpack(f"{len(data) // 8}{Column.TYPE_TO_FORMAT[self.type]}", data))
+        values = []
+        offset = begin
+        for pointer in struct.unpack(f"{len(pointers) // 8}Q", pointers):
+            values.append(data[offset-begin:pointer-begin].decode("utf-8"))
+            offset = pointer
+        return values
+
+    def read_range_data(self, start, end, files):
+        """Reads the records `start`..`end`-1 from the column files `files` (returned by `open_cached`)
+        by a single read of each file, without reading any record before them:
+        numeric records are at offset i*8 of the column file, and VARCHAR record i begins where record i-1
+        ends - at the pointer at offset (i-1)*8 of the .pointers file (record 0 begins at offset 0).
+        Returns (the records, the pointers of the records of a VARCHAR column (None for a numeric column),
+        the offset of the records in the column file).
+        """
+        colfile, pointersfile = files
+        if self.type != "varchar":
+            colfile.seek(start * 8)
+            data = colfile.read((end - start) * 8)
+            Column.bytes_read[self.col_path] += len(data)
+            return data, None, start * 8
+        base = max(start - 1, 0)  # (the pointer before the range is read along with the pointers of the range)
+        pointersfile.seek(base * 8)
+        pointers = pointersfile.read((end - base) * 8)
+        Column.bytes_read[self.pointers_path] += len(pointers)
+        begin = 0
+        if start > 0:
+            begin = struct.unpack_from('Q', pointers)[0]
+            pointers = pointers[8:]
+        colfile.seek(begin)
+        data = colfile.read(struct.unpack_from('Q', pointers, len(pointers) - 8)[0] - begin if pointers else 0)
+        Column.bytes_read[self.col_path] += len(data)
+        return data, pointers, begin
+
+    def sync(self):
+        """Flushes the column file(s) opened for writing to the disk.
+        """
+        for f in ([self.colfile, self.pointersfile] if self.type == "varchar" else [self.colfile]):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def truncate(self, rows):
+        """Truncates the column file(s) to their first `rows` records, removing any records
+        written by a LOAD that didn't commit (e.g. crashed).
+        """
         if self.type == "varchar":  # VARCHAR column
-            self.colfile = open(self.col_path, 'a' if mode=="load" else 'rb')
-            self.pointersfile = open(self.pointers_path, 'ab' if mode=="load" else 'rb')
-            self.cur_pointer = 0;
+            col_size = 0
+            if rows > 0:
+                with open(self.pointers_path, 'rb') as pointersfile:
+                    pointersfile.seek((rows-1) * 8)
+                    col_size = struct.unpack('Q', pointersfile.read(8))[0]
+            os.truncate(self.pointers_path, rows * 8)
         else:  # (INT | FLOAT | TIMESTAMP) column
-            self.colfile = open(self.col_path, 'ab'if mode=="load" else 'rb')
+            col_size = rows * 8
+        os.truncate(self.col_path, col_size)
+
+    def fetch(self, row_ids, rows=None):
+        """Returns the list of the values of records `row_ids` (in the same order, duplicates allowed),
+        reading only around them: the ids are sorted, ids at most COALESCE_GAP records apart are
+        coalesced into a run, and each run is read by a single read of each column file
+        (numeric records are at offset i*8, VARCHAR records are found by the .pointers file).
+        The files are opened separately, so the column can be fetched from while it's being iterated over.
+        `rows` -- the number of committed records (the blocks of which are cached, see `open_cached`).
+        """
+        order = sorted(range(len(row_ids)), key=row_ids.__getitem__)
+        values = [None] * len(row_ids)
+        colfile, pointersfile = self.open_cached(rows)
+        try:
+            for run in Column.coalesce_runs(row_ids, order):
+                first, last = row_ids[run[0]], row_ids[run[-1]]
+                if self.type == "varchar":
+                    self.fetch_varchar_run(colfile, pointersfile, row_ids, run, first, last, values)
+                else:
+                    colfile.seek(first * 8)
+                    data = colfile.read((last - first + 1) * 8)
+                    Column.bytes_read[self.col_path] += len(data)
+                    fmt = Column.TYPE_TO_FORMAT[self.type]
+                    for i in run:
+                        values[i] = struct.unpack_from(fmt, data, (row_ids[i] - first) * 8)[0]
+        finally:
+            colfile.close()
+            if pointersfile: pointersfile.close()
+        return values
+
+    @staticmethod
+    def coalesce_runs(row_ids, order):
+        """Yields runs of positions in `row_ids` (in the sorted `order`) whose ids are at most COALESCE_GAP apart.
+        """
+        run = []
+        for i in order:
+            if run and row_ids[i] - row_ids[run[-1]] > Column.COALESCE_GAP:
+                yield run
+                run = []
+            run.append(i)
+        if run:
+            yield run
+
+    def fetch_varchar_run(self, colfile, pointersfile, row_ids, run, first, last, values):
+        base = max(first - 1, 0)  # the pointer of record i-1 is where record i begins
+        pointersfile.seek(base * 8)
+        data = pointersfile.read((last - base + 1) * 8)
+        Column.bytes_read[self.pointers_path] += len(data)
+        pointers = struct.unpack(f"{len(data) // 8}Q", data)
+        begin = lambda row_id: pointers[row_id - 1 - base] if row_id > 0 else 0
+        run_begin = begin(first)
+        colfile.seek(run_begin)
+        data = colfile.read(pointers[last - base] - run_begin)
+        Column.bytes_read[self.col_path] += len(data)
+        for i in run:
+            row_id = row_ids[i]
+            values[i] = data[begin(row_id) - run_begin:pointers[row_id - base] - run_begin].decode("utf-8")
 
     def __iter__(self): return self
 
+    def read_records(self, f, fmt):
+        """Reads the next records of `f` up to the end of the current block (at most `rows_left` of them),
+        so each record is unpacked and sliced out of the cached block with one call per block.
+        Returns the tuple of the records (empty at the end).
+        """
+        count = (BlockCache.BLOCK_SIZE - f.tell() % BlockCache.BLOCK_SIZE) // 8
+        if self.rows_left is not None:
+            count = min(count, self.rows_left)
+        data = f.read(count * 8)
+        count = len(data) // 8
+        if self.rows_left is not None:
+            self.rows_left -= count
+        return struct.unpack(f"{count}{fmt}", data)
+
     def __next__(self):
+        i = self.next_index
+        if i == len(self.records):  # read the next batch of records
+            if self.type == "varchar":  # the pointers, and the VARCHAR records they point to
+                self.records = self.read_records(self.pointersfile, 'Q')
+                self.data_offset = self.cur_pointer
+                self.data = self.colfile.read(self.records[-1] - self.cur_pointer) if self.records else b""
+            else:  # Numeric column (INT | FLOAT | TIMESTAMP)
+                self.records = self.read_records(self.colfile, Column.TYPE_TO_FORMAT[self.type])
+            if not self.records:
+                self.next_index = 0  # (so iterating again after the end stops again)
+                raise StopIteration
+            i = 0
+        self.next_index = i + 1
         if self.type == "varchar":
-            next_bytes = self.pointersfile.read(8)
-            if next_bytes:
-                next_pointer = struct.unpack('Q', next_bytes)[0]
-                record = self.colfile.read(next_pointer-self.cur_pointer).decode("utf-8")
-                self.cur_pointer = next_pointer
-                return record
-        else:  # Numeric column (INT | FLOAT | TIMESTAMP)
-            next_bytes = self.colfile.read(8)
-            if next_bytes:                   
-                record = struct.unpack(Column.TYPE_TO_FORMAT[self.type], next_bytes)[0]
-                # if record in Column.TYPE_TO_NULL.values(): return "NULL"
-                return record
-            raise StopIteration
\ No newline at end of file
+            next_pointer = self.records[i]
+            record = self.data[self.cur_pointer-self.data_offset:next_pointer-self.data_offset].decode("utf-8")
+            self.cur_pointer = next_pointer
+            return record
+        return self.records[i]
@@ -0,0 +1,116 @@
+class RowCompiler:
+    """Compiles the per-row work of a query into Python functions specialized for it: the source of a
+    generator expression (or a function) is generated with the field indexes, the comparison operator
+    and the output format of the query written into it, and compiled by `compile`. The constants of
+    the query (e.g. the WHERE constant, the NULL values) are names bound in the namespace of the code,
+    never written into its source.
+    So a row costs one generator step per operator, without calls to generic helpers, dict lookups
+    or comparisons of the operator string (compare `Table.row_meets_condition`).
+    The compiled code is cached by its source, so repeating a query doesn't compile it again.
+    """
+
+    OPERATORS = {"=": "==", "<>": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+    cache = {}  # maps generated source to its compiled code object
+
+    @staticmethod
+    def build(source, name, namespace):
+        """Returns the object `name` defined by executing the source `source` in `namespace`.
+        """
+        code = RowCompiler.cache.get(source)
+        if code is None:
+            code = RowCompiler.cache[source] = compile(source, f"<csvdb compiled {name}>", "exec")
+        namespace = dict(namespace)
+        exec(code, namespace)
+        return namespace[name]
+
+    @staticmethod
+    def condition_source(condition, value, null):
+        """Returns the source of the boolean expression of `condition` (see `Table.row_meets_condition`)
+        on the value of the expression `value` (the NULL value of the condition field is `null`).
+        The expression refers to the names `constant` and `null`.
+        """
+        if condition.operator == "is":
+            return f"{value} == null"
+        if condition.operator == "is not":
+            return f"{value} != null"
+        comparison = f"{value} {RowCompiler.OPERATORS[condition.operator]} constant"
+        if null is None:  # (VARCHAR values are never NULL)
+            return comparison
+        return f"{value} != null and {comparison}"
+
+    @staticmethod
+    def filter(condition, index, null):
+        """Returns a function that returns a generator of the rows of an iterator of rows that meet `condition`
+        on field `index` (whose NULL value is `null`).
+        """
+        source = ("def filter_rows(rows):\n"
+                  f"    return (row for row in rows if {RowCompiler.condition_source(condition, f'row[{index}]', null)})\n")
+        return RowCompiler.build(source, "filter_rows", {"constant": condition.constant, "null": null})
+
+    @staticmethod
+    def project(positions):
+        """Returns a function that returns a generator of the rows of an iterator of rows projected to
+        the fields `positions`: a list of indexes, or of (i, j) - field j of item i of a row of pairs of rows
+        (the output of a join).
+        """
+        fields = "".join(f"row[{position[0]}][{position[1]}], " if isinstance(position, tuple) else f"row[{position}], "
+                         for position in positions)
+        source = ("def project_rows(rows):\n"
+                  f"    return (({fields}) for row in rows)\n")
+        return RowCompiler.build(source, "project_rows", {})
+
+    @staticmethod
+    def sort_key(keys):
+        """Returns a function that returns the sort key of a row of an ORDER BY. `keys` -- list of (index, descending,
+        varchar) of the ORDER BY fields: a descending numeric value is negated, and a descending VARCHAR value
+        is wrapped by `Descending`. The NULL values of the numeric types are their smallest values, so NULLs come
+        first in ascending order and last in descending order.
+        """
+        fields = "".join((f"Descending(row[{index}]), " if varchar else f"-row[{index}], ") if descending else f"row[{index}], "
+                         for index, descending, varchar in keys)
+        source = ("def sort_key(row):\n"
+                  f"    return ({fields})\n")
+        return RowCompiler.build(source, "sort_key", {"Descending": Descending})
+
+    @staticmethod
+    def replace_nulls(nulls, width):
+        """Returns a function that returns a generator of the rows (of `width` fields) of an iterator of rows
+        with the NULL values replaced by None. `nulls` -- list of (index, NULL value) of the fields with NULLs.
+        """
+        null_values = dict(nulls)
+        values = [f"v{i}" for i in range(width)]
+        fields = "".join(f"None if v{i} == null{i} else v{i}, " if i in null_values else f"v{i}, " for i in range(width))
+        source = ("def replace_nulls(rows):\n"
+                  f"    return (({fields}) for {', '.join(values)}, in rows)\n")
+        return RowCompiler.build(source, "replace_nulls", {f"null{i}": null for i, null in nulls})
+
+    @staticmethod
+    def formatter(lengths):
+        """Returns a function that returns the line of a row printed to the console by `Printer`: each value
+        (None - "NULL") centered in its column, of length `lengths`[i] (cut with ".." if it's longer),
+        and the columns separated by '|'.
+        """
+        width = len(lengths)
+        values = "".join(f"v{i}, " for i in range(width))
+        fields = "|".join(f"{{fit('NULL' if v{i} is None else str(v{i}), {length}):^{length}}}"
+                          for i, length in enumerate(lengths))
+        source = ("def format_row(row):\n"
+                  f"    {values}= row\n"
+                  f"    return f\"{fields}\"\n")
+        fit = lambda record, length: record if len(record) <= length else record[:length-2] + ".."
+        return RowCompiler.build(source, "format_row", {"fit": fit})
+
+
+class Descending:
+    """A value that compares in reverse order - the sort key of a descending VARCHAR field (see `RowCompiler.sort_key`).
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
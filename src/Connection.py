@@ -0,0 +1,399 @@
+"""In-process query API returning SELECT results as column batches (no console output or CSV text).
+
+Usage:
+    import csvdb
+    connection = csvdb.connect("path/to/rootdir")
+    connection.execute('LOAD DATA INFILE "events.csv" INTO TABLE events;')
+    for batch in connection.execute("SELECT region, v FROM events WHERE v > 10.5;"):
+        batch["v"]  # numpy array (array.array if numpy isn't installed)
+        batch["region"]  # VarcharArray - utf-8 data and offsets
+    columns = connection.execute("SELECT * FROM events;").fetch_all().to_pydict()
+
+Numeric columns hold the values of the column files as they are stored (int64, float64 and uint64 for
+TIMESTAMP), with NULL values as the NULL value of their type (see `Column.TYPE_TO_NULL` and `Batch.is_null`).
+"""
+from Column import Column
+from Table import Table
+from Catalog import Catalog
+from Metrics import Metrics
+from SqlParser import SqlParser, NodeSelect
+
+import os
+import sys
+import array
+import itertools
+import operator
+import threading
+import contextlib
+
+try:
+    import numpy
+except ModuleNotFoundError:  # the columns are array.array objects
+    numpy = None
+
+
+TYPE_TO_DTYPE = {"int": "int64", "float": "float64", "timestamp": "uint64"}
+COMPARISONS = {"=": operator.eq, "<>": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def new_array(_type, data=b""):
+    """Returns the array of the values of a numeric column of type `_type` packed in `data`
+    (a read-only numpy array sharing `data` if numpy is installed).
+    """
+    if numpy is not None:
+        return numpy.frombuffer(data, dtype=TYPE_TO_DTYPE[_type])
+    values = array.array(Column.TYPE_TO_FORMAT[_type])
+    values.frombytes(data)
+    return values
+
+
+def array_from_values(_type, values):
+    if numpy is not None:
+        return numpy.array(values, dtype=TYPE_TO_DTYPE[_type])
+    return array.array(Column.TYPE_TO_FORMAT[_type], values)
+
+
+def select(values, mask):
+    """Returns the values of the column `values` whose flag in `mask` is true.
+    """
+    if isinstance(values, VarcharArray):
+        return values.select(mask)
+    if numpy is not None:
+        return values[numpy.asarray(mask, dtype=bool)]
+    return array.array(values.typecode, itertools.compress(values, mask))
+
+
+def concatenate(columns):
+    if isinstance(columns[0], VarcharArray):
+        return VarcharArray.concatenate(columns)
+    if numpy is not None:
+        return numpy.concatenate(columns)
+    values = array.array(columns[0].typecode)
+    for column in columns:
+        values.extend(column)
+    return values
+
+
+class VarcharArray:
+    """The values of a VARCHAR column: their utf-8 encoded records `data`, and `offsets` - the offset in `data`
+    of the start of each value and of the end of the last one (len(values) + 1 offsets, uint64), like the
+    records and pointers of a VARCHAR column file (and the layout of an Arrow string array).
+    """
+
+    def __init__(self, data=b"", offsets=None):
+        self.data = data
+        self.offsets = offsets if offsets is not None else array_from_values("timestamp", [0])
+
+    @staticmethod
+    def from_values(values):
+        encoded = [(value or "").encode("utf-8") for value in values]
+        return VarcharArray(b"".join(encoded), array_from_values("timestamp", list(itertools.accumulate(map(len, encoded), initial=0))))
+
+    @staticmethod
+    def concatenate(arrays):
+        return VarcharArray.from_values([value for values in arrays for value in values])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return self.data[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+
+    def __iter__(self):
+        data, offsets = self.data, [int(offset) for offset in self.offsets]
+        return (data[begin:end].decode("utf-8") for begin, end in zip(offsets, offsets[1:]))
+
+    def select(self, mask):
+        offsets = [int(offset) for offset in self.offsets]
+        return VarcharArray.from_bytes([self.data[begin:end] for begin, end, keep in zip(offsets, offsets[1:], mask) if keep])
+
+    @staticmethod
+    def from_bytes(records):
+        return VarcharArray(b"".join(records), array_from_values("timestamp", list(itertools.accumulate(map(len, records), initial=0))))
+
+    def to_pylist(self):
+        return list(self)
+
+
+class Batch:
+    """A batch of rows of the result of a SELECT command, by column: `columns`[i] holds the values of output
+    field `fields`[i] (of type `types`[i]) - an array of a numeric field, a `VarcharArray` of a VARCHAR field.
+    """
+
+    def __init__(self, fields, types, columns):
+        self.fields = fields
+        self.types = types
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, field):
+        return self.columns[self.fields.index(field)]
+
+    def is_null(self, field):
+        """Returns the list of the flags of the values of `field` that are NULL (a numpy bool array with numpy).
+        """
+        i = self.fields.index(field)
+        null = Column.TYPE_TO_NULL.get(self.types[i])
+        if null is None:  # VARCHAR values aren't NULL
+            return [False] * len(self)
+        if numpy is not None:
+            return self.columns[i] == null
+        return [value == null for value in self.columns[i]]
+
+    def to_pydict(self):
+        """Returns a dict mapping each field to the list of its values (NULL values are None).
+        """
+        output = {}
+        for field, _type, values in zip(self.fields, self.types, self.columns):
+            values = values.to_pylist() if isinstance(values, VarcharArray) else values.tolist()
+            null = Column.TYPE_TO_NULL.get(_type)
+            output[field] = values if null is None else [None if value == null else value for value in values]
+        return output
+
+
+class Result:
+    """The result of a SELECT command: iterating over it executes the command and yields its rows in `Batch`es
+    (of at most `Connection.BATCH_ROWS` rows), holding the read locks of its tables until the last batch
+    (or `close`). It can be iterated over once.
+    While it is open, DROP, VACUUM and ALTER TABLE ... DROP PARTITION of its tables (and the refresh of a materialized
+    view it reads) raise TableInUseError rather than wait for its read locks for ever (see `TableLock`).
+    """
+
+    def __init__(self, connection, fields, types, batches):
+        self.connection = connection
+        self.fields = fields
+        self.types = types
+        self.batches = batches
+
+    def __iter__(self):
+        while True:
+            with self.connection.session():  # (each batch is read in the root directory)
+                batch = next(self.batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    def fetch_all(self):
+        """Returns all the (remaining) rows in a single `Batch`.
+        """
+        batches = list(self)
+        if not batches:
+            return Batch(self.fields, self.types, [VarcharArray() if _type == "varchar" else new_array(_type)
+                                                   for _type in self.types])
+        return Batch(self.fields, self.types, [concatenate([batch.columns[i] for batch in batches])
+                                               for i in range(len(self.fields))])
+
+    def close(self):
+        with self.connection.session():
+            self.batches.close()
+
+
+class Connection:
+    """An in-process connection to the database in root directory `rootdir`.
+    The engine works in the current working directory (like the command line tool), so the connection changes
+    to `rootdir` while it executes a command or reads a batch, and changes back after. One connection works at a
+    time in a process (`lock`), and switching to a connection to another root directory clears the caches.
+    Errors are raised (CSVDBException, CSVDBSyntaxError) rather than printed.
+    The modules the engine imports on use (e.g. Statistics) are imported in `rootdir`, so the directory of the
+    modules is added to sys.path as an absolute path (it may be on it as a path relative to the caller's directory).
+    """
+
+    BATCH_ROWS = 65536
+    MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+    lock = threading.RLock()
+    current_rootdir = None  # root directory of the caches (`Table.table_dict`, `Catalog`)
+
+    def __init__(self, rootdir, catalog=False):
+        if not os.path.isdir(rootdir):
+            raise FileNotFoundError(f"No such directory: '{rootdir}'")
+        self.rootdir = os.path.abspath(rootdir)
+        self.catalog = catalog
+        if Connection.MODULE_DIR not in sys.path:
+            sys.path.append(Connection.MODULE_DIR)
+
+    @contextlib.contextmanager
+    def session(self):
+        with Connection.lock:
+            cwd = os.getcwd()
+            os.chdir(self.rootdir)
+            try:
+                if Connection.current_rootdir != self.rootdir:
+                    Table.table_dict = {}
+                    Catalog.open(persistent=self.catalog)
+                    Connection.current_rootdir = self.rootdir
+                yield
+            finally:
+                os.chdir(cwd)
+
+    def execute(self, sql):
+        """Executes the commands in `sql`. Returns the `Result` of the last command if it is a SELECT command
+        (without INTO OUTFILE), otherwise None. The results of other SELECT commands are read and discarded.
+        """
+        if sql.strip() and sql.strip()[-1] != ";": sql += ';'
+        with self.session():
+            nodes = SqlParser(sql).parse_multi_commands(show_error=False)
+            result = None
+            for node in nodes:
+                if result is not None:
+                    result.fetch_all()
+                    result = None
+                if isinstance(node, NodeSelect) and not node.outfile_name:
+                    result = self.select(node)
+                else:
+                    Table.execute_command(node, raise_errors=True)
+            return result
+
+    def select(self, node):
+        table = Table.get_table(node.table_name)
+        table.assert_select(node)
+        types = [field.type for field in table.output_fields(node)]
+        if node.row_condition:  # (raise an invalid condition field now rather than when iterating)
+            Table.resolve_field(node.row_condition.field_name, table.select_tables(node))
+        if Table.is_aggregation(node):
+            fields = table.select_aggregation(node).fields
+        else:
+            fields = [identifier for identifier, output_table, column in table.select_output(node)]
+        return Result(self, fields, types, self.batches(table, node, fields, types))
+
+    def batches(self, table, node, fields, types):
+        """Yields the `Batch`es of the output of SELECT command `node` on `table`.
+        The metrics of the command are recorded only while a batch is produced (see `Metrics.pause`),
+        so the commands executed while the result is open aren't counted in it.
+        """
+        statement = Metrics.start(node)
+        try:
+            with table.select_locks(node):
+                table.refresh()
+                if node.join or node.sample or node.distinct or node.order_fields or node.limit is not None \
+                   or node.offset or Table.is_aggregation(node):
+                    batches = self.row_batches(table, node, fields, types)
+                else:
+                    batches = self.column_batches(table, node, fields, types)
+                for batch in batches:
+                    Metrics.add("rows_returned", len(batch))
+                    Metrics.pause(statement)
+                    yield batch
+                    Metrics.resume(statement)
+        finally:
+            Catalog.save()
+            Metrics.finish(statement)
+
+    def row_batches(self, table, node, fields, types):
+        """Yields the output of `node` in batches built from its output rows (see `Table.select_plan`).
+        """
+        rows = table.select_plan(node)[1]
+        for batch in iter(lambda: list(itertools.islice(rows, Connection.BATCH_ROWS)), []):
+            columns = []
+            for i, _type in enumerate(types):
+                values = [row[i] for row in batch]
+                if _type == "varchar":
+                    columns.append(VarcharArray.from_values(values))
+                else:
+                    null = Column.TYPE_TO_NULL[_type]
+                    columns.append(array_from_values(_type, [null if value is None else value for value in values]))
+            yield Batch(fields, types, columns)
+
+    def column_batches(self, table, node, fields, types):
+        """Yields the output of `node` (a SELECT command of a single table, without aggregation) in batches read
+        from the column files, a range of rows at a time (see `Column.read_range_data`): the records of numeric
+        columns are used as they are stored, and the records and pointers of VARCHAR columns as the data and
+        offsets of a `VarcharArray`. The WHERE condition is evaluated on a whole column of a batch at a time
+        (by numpy if it's installed).
+        """
+        output = [column for identifier, output_table, column in table.select_output(node)]
+        columns = list(dict.fromkeys(output))  # the columns read (each once)
+        condition = node.row_condition
+        if condition:
+            condition_column = Table.resolve_field(condition.field_name, [table])[1]
+            if condition_column not in columns: columns.append(condition_column)
+            condition_index = columns.index(condition_column)
+        positions = [columns.index(column) for column in output]
+        for segment in table.scan_segments(condition):
+            segment_columns = [segment.columns[column.index] for column in columns]
+            files = [column.open_cached(segment.num_rows) for column in segment_columns]
+            live = Table.live_mask(segment) if segment.deleted else None
+            try:
+                for start in range(0, segment.num_rows, Connection.BATCH_ROWS):
+                    count = min(Connection.BATCH_ROWS, segment.num_rows - start)
+                    values = []
+                    for column, column_files in zip(segment_columns, files):
+                        data, pointers, begin = column.read_range_data(start, start + count, column_files)
+                        if column.type != "varchar":
+                            values.append(new_array(column.type, data))
+                            continue
+                        offsets = new_array("timestamp", pointers)
+                        if numpy is not None:  # (the offsets stay uint64)
+                            first = numpy.array([begin], dtype=offsets.dtype)
+                            offsets = numpy.concatenate((first, offsets)) - first
+                        else:
+                            offsets = array.array('Q', [0] + [offset - begin for offset in offsets])
+                        values.append(VarcharArray(data, offsets))
+                    Metrics.add("rows_scanned", count)
+                    mask = live[start:start + count] if live is not None else None
+                    if mask is not None and numpy is not None:  # (a numpy bool array, not an index)
+                        mask = numpy.frombuffer(mask, dtype=bool)
+                    if condition:
+                        meets = self.evaluate(table, condition, condition_column.type, values[condition_index])
+                        mask = meets if mask is None else ([keep and meet for keep, meet in zip(mask, meets)]
+                                                           if numpy is None else mask & meets)
+                    yield Batch(fields, types, [values[i] if mask is None else select(values[i], mask) for i in positions])
+            finally:
+                for colfile, pointersfile in files:
+                    colfile.close()
+                    if pointersfile is not None: pointersfile.close()
+
+    @staticmethod
+    def evaluate(table, condition, _type, values):
+        """Returns the flags of the values `values` of the condition field that meet `condition` (see
+        `Table.row_meets_condition`) - a numpy bool array computed by numpy for a numeric field, if installed.
+        """
+        null = Column.TYPE_TO_NULL.get(_type)
+        constant = condition.constant
+        if numpy is None or _type == "varchar" or (condition.operator in COMPARISONS and isinstance(constant, str)):
+            return [table.row_meets_condition(condition, value, null) for value in values]
+        if condition.operator == "is":
+            return values == null
+        if condition.operator == "is not":
+            return values != null
+        return COMPARISONS[condition.operator](values, constant) & (values != null)
+
+
+def _test():
+    """Checks that a table read by an open result can't be dropped (instead of waiting for its read lock for ever),
+    and that the commands executed while a result is open aren't counted in the metrics of its SELECT command.
+    """
+    import tempfile
+    from Errors import TableInUseError
+    with tempfile.TemporaryDirectory() as rootdir:
+        with open(os.path.join(rootdir, "t.csv"), 'w') as csv_file:
+            csv_file.write("".join(f"{i},{i * 0.5}\n" for i in range(3 * Connection.BATCH_ROWS)))
+        Metrics.enable()
+        connection = Connection(rootdir)
+        connection.execute('CREATE TABLE t (id INT, v FLOAT); CREATE TABLE u (id INT, v FLOAT);'
+                           'LOAD DATA INFILE "t.csv" INTO TABLE t;')
+        result = connection.execute("SELECT id FROM t;")
+        batches = iter(result)
+        assert len(next(batches)) == Connection.BATCH_ROWS
+        for command in ["DROP TABLE t;", "VACUUM t;"]:
+            try:
+                connection.execute(command)
+                assert False, f"{command} of a table read by an open result"
+            except TableInUseError:
+                pass
+        connection.execute('LOAD DATA INFILE "t.csv" INTO TABLE u;')  # (counted in the LOAD, not in the SELECT)
+        assert sum(map(len, batches)) == 2 * Connection.BATCH_ROWS
+        select = Metrics.totals["SELECT"]
+        assert select["rows_returned"] == 3 * Connection.BATCH_ROWS and "rows_loaded" not in select, select
+        result = connection.execute("SELECT id FROM t;")
+        next(iter(result))
+        result.close()
+        connection.execute("DROP TABLE t;")
+        assert connection.execute("SELECT COUNT(*) FROM u;").fetch_all().to_pydict() == {"count(*)": [3 * Connection.BATCH_ROWS]}
+    print("ok")
+
+if __name__ == "__main__":
+    _test()
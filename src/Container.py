@@ -0,0 +1,137 @@
+from Errors import InvalidContainerError
+
+import os
+import json
+import struct
+
+
+class TableContainer:
+    """A table container is a single binary file holding a table for EXPORT TABLE / IMPORT TABLE:
+    the raw contents of its files (the committed records of its column files, and its deletion bitmaps)
+    followed by a JSON footer describing them:
+        [MAGIC][file 0][file 1]...[file N-1][footer][footer length (8 bytes)][MAGIC]
+    footer = {"version", "compression" (None | "zlib"), "table" (the 'table.json' of the table),
+              "files": [{"path" (relative to the table directory), "offset", "size" (stored), "raw_size"}, ...]}
+    Uncompressed files are copied from file to file by the kernel (`os.sendfile`) where it is available,
+    so exporting and importing a table doesn't convert any value. Compressed files are zlib streams.
+    The footer is written last, so the container is written in one pass.
+    """
+
+    MAGIC = b"CSVDBTBL"
+    VERSION = 1
+    CHUNK_SIZE = 2**20  # bytes copied / compressed at a time
+    COMPRESSION_LEVEL = 1  # zlib level (fast - the column files compress well even so)
+
+    @staticmethod
+    def write(path, table, files, compressed=False):
+        """Writes a container with the metadata `table` and the files `files` (list of (path in the container,
+        path of the file, number of bytes of the file to write)) to `path`. Returns the size of the container.
+        """
+        entries = []
+        with open(path, 'wb', buffering=0) as container:  # (unbuffered - `tell` is the offset sendfile writes at)
+            container.write(TableContainer.MAGIC)
+            for name, file_path, size in files:
+                offset = container.tell()
+                with open(file_path, 'rb') as infile:
+                    if compressed:
+                        TableContainer.compress(infile, container, size)
+                    else:
+                        TableContainer.copy(infile, 0, container, size)
+                entries.append({"path": name, "offset": offset, "size": container.tell() - offset, "raw_size": size})
+            footer = json.dumps({"version": TableContainer.VERSION, "compression": "zlib" if compressed else None,
+                                 "table": table, "files": entries}).encode("utf-8")
+            container.write(footer + struct.pack("Q", len(footer)) + TableContainer.MAGIC)
+            os.fsync(container.fileno())
+            return container.tell()
+
+    @staticmethod
+    def read_footer(path):
+        """Returns the footer of the container `path` (see `TableContainer`).
+        Raises InvalidContainerError if `path` isn't a container.
+        """
+        magic = TableContainer.MAGIC
+        with open(path, 'rb') as container:
+            size = container.seek(0, os.SEEK_END)
+            if size < 2 * len(magic) + 8:
+                raise InvalidContainerError(path, "file too short")
+            container.seek(size - len(magic) - 8)
+            footer_size, end_magic = struct.unpack("Q", container.read(8))[0], container.read(len(magic))
+            container.seek(0)
+            if container.read(len(magic)) != magic or end_magic != magic or footer_size > size - 2 * len(magic) - 8:
+                raise InvalidContainerError(path, "not a table container")
+            container.seek(size - len(magic) - 8 - footer_size)
+            footer = json.loads(container.read(footer_size))
+        if footer.get("version") != TableContainer.VERSION:
+            raise InvalidContainerError(path, f"unsupported version {footer.get('version')}")
+        for entry in footer["files"]:
+            name = os.path.normpath(entry["path"])
+            if os.path.isabs(name) or name.startswith(os.pardir):  # only files inside the table directory
+                raise InvalidContainerError(path, f"invalid file path {entry['path']}")
+        return footer
+
+    @staticmethod
+    def extract(path, footer, directory):
+        """Writes the files of the container `path` (with footer `footer`) into `directory`, creating
+        sub-directories (partitions) as needed. The files are synced to the disk.
+        """
+        with open(path, 'rb') as container:
+            for entry in footer["files"]:
+                file_path = os.path.join(directory, entry["path"])
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, 'wb', buffering=0) as outfile:
+                    if footer["compression"] == "zlib":
+                        TableContainer.decompress(container, entry["offset"], entry["size"], outfile)
+                    else:
+                        TableContainer.copy(container, entry["offset"], outfile, entry["size"])
+                    if outfile.tell() != entry["raw_size"]:
+                        raise InvalidContainerError(path, f"truncated file {entry['path']}")
+                    os.fsync(outfile.fileno())
+
+    @staticmethod
+    def copy(infile, offset, outfile, size):
+        """Copies `size` bytes at `offset` of `infile` to the current offset of the unbuffered `outfile`.
+        """
+        if hasattr(os, "sendfile"):
+            try:
+                copied = 0
+                while copied < size:
+                    sent = os.sendfile(outfile.fileno(), infile.fileno(), offset + copied, size - copied)
+                    if sent == 0:  # end of `infile`
+                        return
+                    copied += sent
+                return
+            except OSError:  # (e.g. sendfile to a regular file isn't supported) - copy through user space
+                if copied:
+                    raise
+        infile.seek(offset)
+        while size > 0:
+            chunk = infile.read(min(size, TableContainer.CHUNK_SIZE))
+            if not chunk:
+                return
+            outfile.write(chunk)
+            size -= len(chunk)
+
+    @staticmethod
+    def compress(infile, outfile, size):
+        import zlib  # imported on use to keep startup fast
+        compressor = zlib.compressobj(TableContainer.COMPRESSION_LEVEL)
+        while size > 0:
+            chunk = infile.read(min(size, TableContainer.CHUNK_SIZE))
+            if not chunk:
+                break
+            outfile.write(compressor.compress(chunk))
+            size -= len(chunk)
+        outfile.write(compressor.flush())
+
+    @staticmethod
+    def decompress(infile, offset, size, outfile):
+        import zlib  # imported on use to keep startup fast
+        decompressor = zlib.decompressobj()
+        infile.seek(offset)
+        while size > 0:
+            chunk = infile.read(min(size, TableContainer.CHUNK_SIZE))
+            if not chunk:
+                break
+            outfile.write(decompressor.decompress(chunk))
+            size -= len(chunk)
+        outfile.write(decompressor.flush())
@@ -62,8 +62,129 @@ class DirectoryAlreadyExistsError(CSVDBException):
     def __str__(self):
         return self.message
 
+class TableInUseError(CSVDBException):
+    """Raised by Drop | Vacuum | Alter when the table is being read in the same process (by a result of the
+    in-process API that wasn't read to the end or closed), which would wait for itself for ever.
+    """
+    def __init__(self, table_name):
+        super().__init__()
+        self.message += f"table {table_name} is being read by an open result in this process (read it to the end or close it first)\n"
+    def __str__(self):
+        return self.message
+
 class SoftError(CSVDBException):
     """Raised when the function cannot continue, but no due to an error
     """
     def __str__(self):
-        return ""
\ No newline at end of file
+        return ""
+
+class FieldNotExistsError(CSVDBException):
+    """Raised by Select when a field is referenced that doesn't exist in the selected table(s).
+    """
+    def __init__(self, field_name):
+        super().__init__()
+        self.message += f"field {field_name} doesn't exist\n"
+    def __str__(self):
+        return self.message
+
+
+class AmbiguousFieldError(CSVDBException):
+    """Raised by Select when an unqualified field name is referenced that exists in both joined tables.
+    """
+    def __init__(self, field_name):
+        super().__init__()
+        self.message += f"field {field_name} is ambiguous (qualify it with its table name)\n"
+    def __str__(self):
+        return self.message
+
+
+class UnsupportedCommandError(CSVDBException):
+    """Raised when a command uses a feature that isn't supported.
+    """
+    def __init__(self, feature):
+        super().__init__()
+        self.message += f"{feature} is not supported\n"
+    def __str__(self):
+        return self.message
+
+
+class FieldNotGroupedError(CSVDBException):
+    """Raised by Select when a field that isn't aggregated is selected without appearing in the GROUP BY clause.
+    """
+    def __init__(self, field_name):
+        super().__init__()
+        self.message += f"field {field_name} must appear in the GROUP BY clause or be aggregated\n"
+    def __str__(self):
+        return self.message
+
+
+class InvalidAggregateError(CSVDBException):
+    """Raised by Select when an aggregate function is applied to a field of a type it doesn't support.
+    """
+    def __init__(self, agg_func, field_name, _type):
+        super().__init__()
+        self.message += f"{agg_func.upper()} can't be applied to field {field_name} of type {_type.upper()}\n"
+    def __str__(self):
+        return self.message
+
+
+class InvalidPartitioningError(CSVDBException):
+    """Raised by Create when a table is partitioned by a field that doesn't exist or can't be partitioned by the method.
+    """
+    def __init__(self, method, field_name, _type=None):
+        super().__init__()
+        if _type is None:
+            self.message += f"partition field {field_name} doesn't exist\n"
+        else:
+            self.message += f"{method.upper()} partitioning can't be applied to field {field_name} of type {_type.upper()}\n"
+    def __str__(self):
+        return self.message
+
+
+class PartitionNotExistsError(CSVDBException):
+    """Raised by Alter when a partition is referenced that doesn't exist in the table.
+    """
+    def __init__(self, table_name, partition_name):
+        super().__init__()
+        self.message += f"partition {partition_name} of table {table_name} doesn't exist\n"
+    def __str__(self):
+        return self.message
+
+
+class InvalidValueError(CSVDBException):
+    """Raised by Update when a field is set to a value of another type.
+    """
+    def __init__(self, field_name, _type, value):
+        super().__init__()
+        self.message += f"field {field_name} of type {_type.upper()} can't be set to {value!r}\n"
+    def __str__(self):
+        return self.message
+
+
+class InvalidInfileError(CSVDBException):
+    """Raised by Load when the infile can't be read (e.g. a truncated or corrupt compressed infile).
+    """
+    def __init__(self, filename, reason):
+        super().__init__()
+        self.message += f"csv infile {filename} can't be read: {reason}\n"
+    def __str__(self):
+        return self.message
+
+class TooManyRejectsError(CSVDBException):
+    """Raised by Load when more rows of the infile are rejected than its MAX ERRORS clause allows
+    (no row of the infile is committed).
+    """
+    def __init__(self, filename, max_errors, rejects_path):
+        super().__init__()
+        self.message += f"csv infile {filename} has more than {max_errors} invalid rows (see {rejects_path}), no rows were loaded\n"
+    def __str__(self):
+        return self.message
+
+class InvalidContainerError(CSVDBException):
+    """Raised by Import when the file to import isn't a valid table container (see `TableContainer`).
+    """
+    def __init__(self, filename, reason):
+        super().__init__()
+        self.message += f"{filename} can't be imported: {reason}\n"
+    def __str__(self):
+        return self.message
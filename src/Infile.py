@@ -0,0 +1,188 @@
+from Errors import InvalidInfileError, TooManyRejectsError
+
+import os
+import io
+import sys
+import itertools
+import contextlib
+
+
+class Infile:
+    """The infile of a LOAD command, read in a single streaming pass (so it may be a stream that can't be
+    read twice): a regular file, a named pipe, or the standard input (infile name "-").
+    An infile compressed by gzip, bzip2 or xz is decompressed on the fly - the compression is recognized
+    by the magic bytes at its start (not by its name, so compressed standard input works too).
+    Only a buffer of the infile is held in memory, whatever its size.
+    """
+
+    STDIN = "-"
+    BUFFER_SIZE = 2**20  # bytes read from the infile at a time
+    MAGIC = {  # maps the magic bytes at the start of a compressed stream to the module decompressing it
+        b"\x1f\x8b": "gzip",
+        b"BZh": "bz2",
+        b"\xfd7zXZ\x00": "lzma",
+    }
+
+    @staticmethod
+    def exists(infile_name):
+        """Returns True iff `infile_name` is the standard input or a file that isn't a directory (e.g. a named pipe).
+        """
+        return infile_name == Infile.STDIN or (os.path.exists(infile_name) and not os.path.isdir(infile_name))
+
+    @staticmethod
+    @contextlib.contextmanager
+    def open(infile_name):
+        """Opens the infile `infile_name` for reading text (decompressed if it's compressed),
+        and closes it on exit (but not the standard input).
+        """
+        if infile_name == Infile.STDIN:
+            raw = io.BufferedReader(io.FileIO(sys.stdin.fileno(), closefd=False), Infile.BUFFER_SIZE)
+        else:
+            raw = open(infile_name, 'rb', buffering=Infile.BUFFER_SIZE)
+        try:
+            # A single read of a pipe may return fewer bytes, but a buffered read reads until it has them (or EOF):
+            head = raw.read(max(map(len, Infile.MAGIC)))
+            if raw.seekable():
+                raw.seek(-len(head), io.SEEK_CUR)
+                stream = raw
+            else:  # (a pipe or a terminal can't seek back over the bytes read)
+                stream = io.BufferedReader(Unread(head, raw), Infile.BUFFER_SIZE)
+            for magic, module in Infile.MAGIC.items():
+                if head.startswith(magic):
+                    import importlib  # the decompression modules are imported on use to keep startup fast
+                    stream = importlib.import_module(module).open(stream, 'rb')  # (doesn't close `stream`)
+                    break
+            with io.TextIOWrapper(stream) as infile:
+                yield infile
+        finally:
+            raw.close()
+
+    @staticmethod
+    def batches(infile, ignore_lines=0, batch_rows=4096):
+        """Yields the rows (lists of records) of the CSV text file `infile` after its first `ignore_lines` rows,
+        in batches of at most `batch_rows` rows: pairs of (the line numbers the rows start at in the infile,
+        the list of the rows).
+        The lines are read in batches, and batches of lines without a quote (the common case) are split at the
+        commas (the fast path). Once a batch has a quote, the rest of the file is parsed by `csv.reader`
+        (quoted records may hold commas, quotes and line breaks). Empty lines aren't rows.
+        """
+        import csv  # imported on use to keep startup fast
+        reader = csv.reader(infile)  # (reads a line at a time, so it reads just the skipped rows)
+        for _ in range(ignore_lines):
+            next(reader, None)
+        line_number = reader.line_num  # number of lines read
+        while True:
+            lines = list(itertools.islice(infile, batch_rows))
+            if not lines:
+                return
+            if '"' in "".join(lines):
+                rows = Infile.numbered_rows(csv.reader(itertools.chain(lines, infile)), line_number)
+                for numbered in iter(lambda: list(itertools.islice(rows, batch_rows)), []):
+                    line_numbers, batch = zip(*numbered)
+                    yield line_numbers, list(batch)
+                return
+            lines = [line.rstrip("\r\n") for line in lines]  # (an empty line may end with "\r\n")
+            if "" in lines:  # (empty lines)
+                line_numbers = [line_number + i + 1 for i, line in enumerate(lines) if line]
+            else:
+                line_numbers = range(line_number + 1, line_number + len(lines) + 1)
+            batch = [line.split(",") for line in lines if line]
+            line_number += len(lines)
+            if batch:
+                yield line_numbers, batch
+
+    @staticmethod
+    def numbered_rows(reader, line_number):
+        """Yields (the line number a row starts at, the row) for the rows of the csv reader `reader`,
+        which reads the infile after its first `line_number` lines. Empty lines aren't rows.
+        """
+        lines_read = 0
+        for row in reader:
+            if row:
+                yield line_number + lines_read + 1, row
+            lines_read = reader.line_num
+
+    @staticmethod
+    def read_errors():
+        """Returns the tuple of the exception types raised by reading a corrupt or truncated compressed infile.
+        """
+        errors = (OSError, EOFError)
+        if "lzma" in sys.modules:
+            errors += (sys.modules["lzma"].LZMAError,)
+        return errors
+
+    @staticmethod
+    def checked(rows, infile_name):
+        """Yields `rows` (read from infile `infile_name`), raising InvalidInfileError if reading it fails.
+        """
+        try:
+            yield from rows
+        except UnicodeDecodeError as e:
+            raise InvalidInfileError(infile_name, f"not a text file ({e.reason})")
+        except Infile.read_errors() as e:
+            raise InvalidInfileError(infile_name, str(e) or type(e).__name__)
+
+
+class Unread(io.RawIOBase):
+    """A raw stream reading the bytes `head` read from the start of the stream `stream`, then the rest of `stream`
+    (puts back the bytes read to recognize the compression of an infile that can't seek, see `Infile.open`).
+    Closing it doesn't close `stream`.
+    """
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.head:
+            return self.stream.readinto(buffer)
+        size = min(len(buffer), len(self.head))
+        buffer[:size] = self.head[:size]
+        self.head = self.head[size:]
+        return size
+
+
+class Rejects:
+    """The rows of a LOAD infile rejected by the load (see `Table.load_batch`): rows with a record that isn't
+    a value of the type of its field.
+    They are written to the reject file "<infile name>.rejects.csv" ("<table name>.rejects.csv" for the standard
+    input), created (or rewritten) on the first rejected row: a header, then a line per rejected row with its
+    line number in the infile, the reason it was rejected and its records.
+    More rejected rows than `max_errors` (if it isn't None) fail the load.
+    """
+
+    def __init__(self, infile_name, table_name, fields, max_errors=None):
+        self.infile_name = infile_name
+        self.path = f"{table_name if infile_name == Infile.STDIN else infile_name}.rejects.csv"
+        self.fields = fields
+        self.max_errors = max_errors
+        self.count = 0  # number of rows rejected
+        self.file = None
+        self.writer = None
+
+    def add(self, line_number, reason, row):
+        """Writes the rejected row `row` (starting at line `line_number` of the infile) to the reject file.
+        Raises TooManyRejectsError once more than `max_errors` rows are rejected.
+        """
+        if self.file is None:
+            import csv  # imported on use to keep startup fast
+            self.file = open(self.path, 'w', newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(["line", "reason"] + self.fields)
+        self.writer.writerow([line_number, reason] + list(row))
+        self.count += 1
+        if self.max_errors is not None and self.count > self.max_errors:
+            raise TooManyRejectsError(self.infile_name, self.max_errors, self.path)
+
+    def rejecter(self, line_numbers, rows):
+        """Returns the function rejecting row i of `rows` (starting at line `line_numbers`[i]) for a reason
+        (see `Table.load_batch`).
+        """
+        return lambda i, reason: self.add(line_numbers[i], reason, rows[i])
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
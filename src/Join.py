@@ -0,0 +1,74 @@
+from Spill import Partitioner, estimate_size
+
+import itertools
+
+
+class HashJoin:
+    """Hash join operator - joins the rows of two inputs on the equality of a key field.
+    Iterating over a `HashJoin` yields a (build_row, probe_row) pair for each match.
+
+    Build phase: the rows of the build input (the smaller table) are inserted to a hash table
+    mapping a key to the list of build rows with that key.
+    Probe phase: the probe input is read in batches of rows, and each row is looked up in the hash table.
+
+    If the build rows exceed the memory budget, the join becomes a grace hash join:
+    both inputs are split by the hash of their key into NUM_PARTITIONS partitions spilled to disk,
+    and each pair of matching partitions is joined separately (recursively, with a different hash,
+    if a build partition is still too big - up to MAX_LEVEL times).
+
+    Rows whose key is NULL must be filtered out by the caller (NULL never equals anything).
+    """
+
+    MEMORY_BUDGET = 64 * 2**20  # bytes
+    NUM_PARTITIONS = 16
+    MAX_LEVEL = 3
+    BATCH_SIZE = 1024  # number of probe rows in a batch
+
+    def __init__(self, build_rows, build_key, probe_batches, probe_key, memory_budget=None):
+        self.build_rows = build_rows  # iterable of rows (tuples)
+        self.build_key = build_key  # index of the key in a build row
+        self.probe_batches = probe_batches  # iterable of lists of rows
+        self.probe_key = probe_key  # index of the key in a probe row
+        self.memory_budget = memory_budget or HashJoin.MEMORY_BUDGET
+        self.spilled_partitions = 0  # number of partition pairs spilled to disk
+
+    def __iter__(self):
+        return self.join(iter(self.build_rows), self.probe_batches, 0)
+
+    def join(self, build_rows, probe_batches, level):
+        # Build phase:
+        hash_table = {}
+        size = 0
+        for row in build_rows:
+            hash_table.setdefault(row[self.build_key], []).append(row)
+            size += estimate_size(row)
+            if size > self.memory_budget and level < HashJoin.MAX_LEVEL:  # build rows don't fit in memory
+                built_rows = itertools.chain.from_iterable(hash_table.values())
+                hash_table = None
+                yield from self.grace_join(itertools.chain(built_rows, build_rows), probe_batches, level)
+                return
+
+        # Probe phase:
+        probe_key = self.probe_key
+        for batch in probe_batches:
+            for row in batch:
+                matches = hash_table.get(row[probe_key])
+                if matches:
+                    for build_row in matches:
+                        yield build_row, row
+
+    def grace_join(self, build_rows, probe_batches, level):
+        build_partitioner = Partitioner(HashJoin.NUM_PARTITIONS, lambda row: row[self.build_key], level)
+        for row in build_rows:
+            build_partitioner.add(row)
+        probe_partitioner = Partitioner(HashJoin.NUM_PARTITIONS, lambda row: row[self.probe_key], level)
+        for batch in probe_batches:
+            for row in batch:
+                probe_partitioner.add(row)
+        self.spilled_partitions += HashJoin.NUM_PARTITIONS
+
+        for build_partition, probe_partition in zip(build_partitioner.finish(), probe_partitioner.finish()):
+            if build_partition.rows and probe_partition.rows:
+                yield from self.join(build_partition.rows_iter(), probe_partition, level + 1)
+            build_partition.close()
+            probe_partition.close()
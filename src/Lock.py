@@ -0,0 +1,98 @@
+from Errors import TableNotExistsError, TableInUseError
+
+import os
+from collections import Counter
+
+try:
+    import fcntl
+    has_flock = True
+except ModuleNotFoundError:  # not Unix - locking is disabled
+    has_flock = False
+
+
+class TableLock:
+    """A `TableLock` coordinates csvdb processes working on the same table directory.
+    It is a context manager that holds file locks on two lock files inside the table directory:
+        - WRITE_LOCK_FILENAME: held exclusively by a writer (LOAD | DELETE | UPDATE | DROP), so there is at most
+          one writer per table at a time.
+        - READ_LOCK_FILENAME: held shared by readers (SELECT) and exclusively by DROP,
+          so a table isn't removed while it is being read.
+    Readers and a LOAD don't block each other: a LOAD only appends to the column files and
+    commits the new row count to 'table.json' (atomically) after all the rows were written,
+    while a reader only reads the row count committed when it started. Likewise DELETE and UPDATE
+    write a new version of the deletion bitmap and readers read the version committed when they started.
+
+    Possible `mode` values:
+        "read" -- SELECT
+        "write" -- LOAD, DELETE, UPDATE
+        "drop" -- DROP, VACUUM
+
+    File locks of different open files conflict even in one process, so a "drop" lock of a table that the process
+    itself is reading (e.g. by an open result of the in-process API, see `Connection`) would wait for ever:
+    the read locks held in the process are counted in `readers`, and such a lock raises TableInUseError instead.
+    """
+
+    WRITE_LOCK_FILENAME = "write.lock"
+    READ_LOCK_FILENAME = "read.lock"
+    readers = Counter()  # maps the path of a table directory to the number of read locks held on it in this process
+
+    def __init__(self, table_name, mode):
+        self.table_name = table_name
+        self.mode = mode
+        self.lockfiles = []
+        self.reading = False  # True iff the lock is counted in `readers`
+
+    def acquire(self, filename, operation):
+        if not has_flock:
+            return
+        try:
+            lockfile = open(os.path.join(self.table_name, filename), 'a')
+        except FileNotFoundError:  # table directory doesn't exist
+            raise TableNotExistsError(self.table_name)
+        self.lockfiles.append(lockfile)
+        fcntl.flock(lockfile, operation)
+
+    def try_exclude_readers(self):
+        """Tries to lock READ_LOCK_FILENAME exclusively (by a writer holding the write lock) without waiting,
+        so that no reader reads the table until the lock is released. Returns True iff it was locked
+        (no reader was reading the table). Used to remove files that readers of older snapshots may read.
+        """
+        if not has_flock:
+            return True
+        lockfile = open(os.path.join(self.table_name, TableLock.READ_LOCK_FILENAME), 'a')
+        try:
+            fcntl.flock(lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lockfile.close()
+            return False
+        self.lockfiles.append(lockfile)
+        return True
+
+    def release(self):
+        for lockfile in reversed(self.lockfiles):
+            fcntl.flock(lockfile, fcntl.LOCK_UN)
+            lockfile.close()
+        self.lockfiles = []
+        if self.reading:
+            TableLock.readers[os.path.abspath(self.table_name)] -= 1
+            self.reading = False
+
+    def __enter__(self):
+        if self.mode == "drop" and TableLock.readers[os.path.abspath(self.table_name)] > 0:
+            raise TableInUseError(self.table_name)
+        if self.mode == "read":
+            self.acquire(TableLock.READ_LOCK_FILENAME, fcntl.LOCK_SH if has_flock else None)
+            TableLock.readers[os.path.abspath(self.table_name)] += 1
+            self.reading = True
+        else:  # "write" | "drop"
+            self.acquire(TableLock.WRITE_LOCK_FILENAME, fcntl.LOCK_EX if has_flock else None)
+            if self.mode == "drop":
+                self.acquire(TableLock.READ_LOCK_FILENAME, fcntl.LOCK_EX if has_flock else None)
+        # The table could have been dropped while waiting for the lock:
+        if not os.path.isfile(os.path.join(self.table_name, "table.json")):
+            self.release()
+            raise TableNotExistsError(self.table_name)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,157 @@
+from Column import Column
+from Catalog import Catalog
+from BlockCache import BlockCache
+
+import os
+import time
+from collections import Counter
+
+
+class Metrics:
+    """The `Metrics` class records statistics of the executed statements.
+    This class contains:
+        - static methods `start` and `finish`, called by `Table.execute_command` around every statement,
+          and `add` / `count_rows`, called by the executor to count rows and bytes.
+        - class variable 'current':
+            The counters of the statement being executed, or None if metrics are disabled.
+            Every hook checks it first, so disabled metrics cost one attribute lookup per hook call
+            (hooks are called per statement or per scan, never per row).
+        - class variable 'totals':
+            Counters accumulated over the session, per statement kind (printed by SHOW STATS).
+
+    Recorded counters: time, rows scanned, rows returned, rows loaded, bytes read (from column files),
+    bytes written (to column files and outfiles), catalog cache hits and misses, block cache hits and misses.
+    If `profile_dir` is set, every statement is also profiled by cProfile and its profile is
+    dumped to a file in `profile_dir` (can be read with the `pstats` module).
+    """
+    # Static variables:
+
+    enabled = False
+    print_stats = False  # print the statistics of every statement after it is executed
+    profile_dir = None
+    current = None
+    totals = {}  # maps a statement kind to its accumulated Counter
+    num_statements = 0
+
+    @staticmethod
+    def enable(print_stats=False, profile_dir=None):
+        Metrics.enabled = True
+        Metrics.print_stats = print_stats
+        Metrics.profile_dir = profile_dir
+
+    @staticmethod
+    def start(node):
+        """Starts recording the statement of syntax-tree-node `node`.
+        Returns the statement record, or None if metrics are disabled or a statement is already
+        being recorded (statements executed by another statement are counted in it).
+        """
+        if not Metrics.enabled or Metrics.current is not None:
+            return None
+        Metrics.num_statements += 1
+        kind = type(node).__name__[len("Node"):].upper()
+        statement = {"kind": kind, "table": node.table_name, "number": Metrics.num_statements, "counters": Counter(),
+                     "profiler": None, "recording": False}
+        if Metrics.profile_dir:
+            import cProfile
+            statement["profiler"] = cProfile.Profile()
+        Metrics.resume(statement)
+        return statement
+
+    @staticmethod
+    def resume(statement):
+        """Resumes recording `statement` (returned by `start`) after `pause`: the work done from now on
+        (until `pause` or `finish`) is counted in it. A statement whose work is done in parts - e.g. the batches of
+        a result of the in-process API (see `Connection`) - is paused between them, so other statements executed
+        meanwhile aren't counted in it.
+        """
+        if statement is None or statement["recording"] or Metrics.current is not None:
+            return
+        statement.update({"recording": True, "bytes_read": sum(Column.bytes_read.values()),
+                          "catalog": (Catalog.hits, Catalog.misses),
+                          "blocks": (BlockCache.hits, BlockCache.misses, BlockCache.prefetched),
+                          "start": time.perf_counter()})
+        Metrics.current = statement["counters"]
+        if statement["profiler"]:
+            statement["profiler"].enable()
+
+    @staticmethod
+    def pause(statement):
+        """Pauses recording `statement`, adding the time, bytes read and cache hits since it was resumed to it.
+        """
+        if statement is None or not statement["recording"]:
+            return
+        counters = statement["counters"]
+        counters["time_ms"] += (time.perf_counter() - statement["start"]) * 1000
+        if statement["profiler"]:
+            statement["profiler"].disable()
+        counters["bytes_read"] += sum(Column.bytes_read.values()) - statement["bytes_read"]
+        counters["catalog_hits"] += Catalog.hits - statement["catalog"][0]
+        counters["catalog_misses"] += Catalog.misses - statement["catalog"][1]
+        counters["block_cache_hits"] += BlockCache.hits - statement["blocks"][0]
+        counters["block_cache_misses"] += BlockCache.misses - statement["blocks"][1]
+        counters["blocks_read_ahead"] += BlockCache.prefetched - statement["blocks"][2]
+        statement["recording"] = False
+        Metrics.current = None
+
+    @staticmethod
+    def finish(statement):
+        """Finishes recording `statement` (returned by `start`), adding its counters to the totals.
+        """
+        if statement is None:
+            return
+        Metrics.pause(statement)
+        counters = statement["counters"]
+        if statement["profiler"]:
+            filename = f"{statement['number']:05d}-{statement['kind'].lower()}-{statement['table']}.prof"
+            statement["profiler"].dump_stats(os.path.join(Metrics.profile_dir, filename))
+        counters["statements"] += 1
+        Metrics.totals.setdefault(statement["kind"], Counter()).update(counters)
+        if Metrics.print_stats:
+            print(f"Stats: {statement['kind']} {statement['table']}: {Metrics.format(counters)}\n")
+
+    @staticmethod
+    def add(counter, value):
+        """Adds `value` to counter `counter` of the current statement (if metrics are enabled).
+        """
+        if Metrics.current is not None:
+            Metrics.current[counter] += value
+
+    @staticmethod
+    def count_rows(rows, counter):
+        """Returns `rows`, counting them in counter `counter` of the current statement if metrics are enabled.
+        """
+        if Metrics.current is None:
+            return rows
+        return Metrics.counted(rows, Metrics.current, counter)
+
+    @staticmethod
+    def counted(rows, counters, counter):
+        count = 0
+        try:
+            for row in rows:
+                count += 1
+                yield row
+        finally:
+            counters[counter] += count
+
+    @staticmethod
+    def format(counters):
+        return ", ".join(f"{name.replace('_', ' ')} {value:.3f}" if isinstance(value, float) else f"{name.replace('_', ' ')} {value}"
+                         for name, value in sorted(counters.items()))
+
+    @staticmethod
+    def show():
+        """Prints the statistics accumulated in this session (SHOW STATS command).
+        """
+        if not Metrics.enabled:
+            print("Statistics are not collected (run csvdb with --stats or --profile to collect them)\n")
+            return
+        for kind, counters in sorted(Metrics.totals.items()):
+            print(f"{kind}: {Metrics.format(counters)}")
+        print(f"Block cache: {len(BlockCache.blocks)} blocks ({BlockCache.size} of {BlockCache.budget} bytes), "
+              f"{BlockCache.hits} hits, {BlockCache.misses} misses ({BlockCache.prefetched} read ahead), "
+              f"{BlockCache.evictions} evictions")
+        print("Bytes read per column file:")
+        for path, count in sorted(Column.bytes_read.items()):
+            print(f"  {path}: {count}")
+        print()
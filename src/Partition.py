@@ -0,0 +1,96 @@
+from Column import Column
+
+import os
+
+
+class Partition:
+    """A `Partition` instance is a partition of a partitioned table (see PartitionClause):
+    a sub-directory of the table directory with its own column files (of all the columns of the table),
+    holding the rows whose value of the partition field is:
+        RANGE -- in [`low`, `high`)
+        LIST -- `value`
+    NULL values of the partition field are in a partition of their own (`null`).
+    Like the rows of a table, the committed row count of a partition (and its deletion bitmap version)
+    is recorded in the table's 'table.json' (in the list `partitions`), and records after it in its
+    column files are uncommitted.
+    `name` is the partition directory ('table_name/partition_id'), so its columns are found like a table's.
+    """
+
+    def __init__(self, table, data):
+        self.table = table
+        self.id = data["name"]
+        self.name = os.path.join(table.name, self.id)
+        self.created = table.created  # (identifies its files in the BlockCache, like the table's)
+        self.partitioning = None  # (a partition isn't partitioned itself)
+        self.num_rows = data["rows"]
+        self.low = data.get("low")
+        self.high = data.get("high")
+        self.value = data.get("value")
+        self.null = data.get("null", False)
+        self.deleted = data.get("deleted", 0)  # (see `DeletionBitmap`)
+        self.bitmap = data.get("bitmap", 0)
+        self.rewrites = data.get("rewrites", 0)  # (see `Table.finish_compaction`)
+        self.columns = [Column(self, column.field, column.type, column.index) for column in table.columns]
+
+    @staticmethod
+    def new(table, partition_id, key):
+        """Creates the directory of a new partition `partition_id` of `table` for the rows with partition key `key`
+        (see `Table.partition_key`), and returns its `Partition` instance.
+        The directory may exist, left by a LOAD that didn't commit - its files are truncated when loaded into.
+        """
+        os.makedirs(os.path.join(table.name, partition_id), exist_ok=True)
+        data = {"name": partition_id, "rows": 0}
+        if key is None:
+            data["null"] = True
+        elif table.partitioning["method"] == "range":
+            data["low"], data["high"] = key, key + table.partitioning["interval"]
+        else:  # "list"
+            data["value"] = key
+        return Partition(table, data)
+
+    def key(self):
+        """Returns the partition key of the rows of the partition (see `Table.partition_key`).
+        """
+        if self.null:
+            return None
+        return self.low if self.low is not None else self.value
+
+    def to_json(self):
+        data = {"name": self.id, "rows": self.num_rows}
+        if self.null:
+            data["null"] = True
+        elif self.low is not None:
+            data["low"], data["high"] = self.low, self.high
+        else:
+            data["value"] = self.value
+        if self.bitmap:
+            data["deleted"], data["bitmap"] = self.deleted, self.bitmap
+        if self.rewrites:
+            data["rewrites"] = self.rewrites
+        return data
+
+    def describe(self):
+        field = self.table.partitioning["field"]
+        if self.null:
+            return f"{field} IS NULL"
+        if self.low is not None:
+            return f"{self.low} <= {field} < {self.high}"
+        return f"{field} = {self.value!r}"
+
+    def excludes(self, operator, constant):
+        """Returns True iff no row of the partition can meet the condition `operator` `constant`
+        on the partition field (partition pruning).
+        """
+        if operator in ("is", "is not"):
+            return self.null != (operator == "is")
+        if self.null:  # NULL values don't meet comparisons
+            return True
+        low, high = (self.low, self.high) if self.low is not None else (self.value, None)
+        try:
+            if high is None:  # LIST - a single value
+                return {"=": low != constant, "<>": low == constant, "<": low >= constant, "<=": low > constant,
+                        ">": low <= constant, ">=": low < constant}.get(operator, False)
+            return {"=": constant < low or constant >= high, "<": low >= constant, "<=": low > constant,
+                    ">": high <= constant, ">=": high <= constant}.get(operator, False)
+        except TypeError:  # constant can't be compared with the values
+            return False
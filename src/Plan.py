@@ -0,0 +1,58 @@
+import time
+
+
+class PlanNode:
+    """A `PlanNode` is an operator in the plan of a SELECT command (e.g. Scan, Filter, HashJoin).
+    The plan is a tree of PlanNodes, printed by the EXPLAIN command.
+    When the plan is executed by EXPLAIN ANALYZE, the rows of every operator pass through
+    `instrument`, which counts them and measures the time spent producing them
+    (inclusive of the time spent in the operators below it).
+    """
+
+    def __init__(self, name, details=(), children=()):
+        self.name = name
+        self.details = list(details)  # lines describing the operator
+        self.children = list(children)
+        # EXPLAIN ANALYZE counters:
+        self.rows = 0
+        self.time = 0.0  # seconds
+
+    def instrument(self, rows, analyze):
+        """Returns `rows` as is, or an instrumented generator of `rows` if `analyze` is True.
+        """
+        if not analyze:
+            return rows
+        return self.instrumented(rows)
+
+    def instrumented(self, rows):
+        rows = iter(rows)
+        perf_counter = time.perf_counter
+        while True:
+            start = perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                self.time += perf_counter() - start
+                return
+            self.time += perf_counter() - start
+            self.rows += 1
+            yield row
+
+    def nodes(self):
+        """Yields the nodes of the plan tree rooted at this node (preorder).
+        """
+        yield self
+        for child in self.children:
+            yield from child.nodes()
+
+    def format(self, analyze=False, depth=0):
+        """Returns the lines describing the plan tree rooted at this node.
+        """
+        indent = "  " * depth
+        header = f"{indent}-> {self.name}"
+        if analyze:
+            header += f"  (rows={self.rows}, time={self.time * 1000:.3f} ms)"
+        lines = [header] + [f"{indent}     {detail}" for detail in self.details]
+        for child in self.children:
+            lines += child.format(analyze, depth + 1)
+        return lines
@@ -1,10 +1,15 @@
-import os
-from Column import Column
+from Compiler import RowCompiler
+
+import sys
+import itertools
+
 
 class Printer:
     """This class handles the printing of a SELECT command output to the console in the correct format. 
     """
 
+    BATCH_ROWS = 1000  # rows printed by a single write
+
     def __init__(self, columns):
         self.width = Printer.try_get_width()  # width of the console
         self.columns = columns  # get info of table columns for printing
@@ -16,12 +21,11 @@ class Printer:
 
     @staticmethod
     def try_get_width():
-        """Tries getting exact number of columns in terminal for correct output formatting (linux only).
-        Returns number of columns (defaults to 150 if not successful)
+        """Tries getting exact number of columns in terminal for correct output formatting.
+        Returns number of columns (defaults to 100 if not successful)
         """
-        try: width = int(os.popen('stty size', 'r').read().split()[1])
-        except: width = 100
-        return width
+        import shutil  # imported on use to keep startup fast
+        return shutil.get_terminal_size((100, 0)).columns
 
 
     def set_column_lengths(self):
@@ -37,36 +41,44 @@ class Printer:
 
 
     def print_rows(self, rows):
+        """Prints the fields (the first row of `rows`) and the rows, each line formatted by a function
+        compiled for the column lengths of the output (see `RowCompiler.formatter`).
+        """
         self.set_column_lengths()
+        format_row = RowCompiler.formatter(self.column_lengths)
         # Print fields:
         fields = next(rows)
-        self.print_row(fields)
+        print(format_row(fields))
         # Print separator line:
         separator = ""
         for length in self.column_lengths:
             separator += '-' * length + '+'
         separator = separator[:-1]
         print(separator)
-        # Print records:
-        for row in rows:
-            self.print_row(row)
+        # Print records (a batch of lines at a time):
+        write = sys.stdout.write
+        for batch in iter(lambda: list(itertools.islice(rows, Printer.BATCH_ROWS)), []):
+            write("".join([format_row(row) + "\n" for row in batch]))
 
-    def print_row(self, row):
-        is_last = False
-        for i, record in enumerate(row):
-            if record in Column.TYPE_TO_NULL.values(): record = "NULL"            
-            if i == len(row) - 1:
-                is_last = True
-            length = self.column_lengths[i]
-            self.print_record(record, length, is_last)
-        print()
 
-    def print_record(self, record, length, is_last=False):
-        # if isinstance(record, str): print(f"length: {length}")
-        record = str(record)
-        if len(record) > length:
-            record = record[:length-2] + ".."
-        length -= len(record)
-        print(' ' * (length // 2), end="")
-        print(record, end=" " if length & 1 else "")
-        print(' ' * (length // 2), end="" if is_last else '|')
\ No newline at end of file
+class BatchPrinter:
+    """Drop-in replacement for `Printer` that hands the output of a SELECT command to callbacks
+    in batches of rows (lists, NULL values are None) instead of printing it to the console
+    (used by the query server).
+    """
+
+    def __init__(self, on_fields, on_batch, batch_size=1000):
+        self.on_fields = on_fields  # called with the list of output fields
+        self.on_batch = on_batch  # called with each list of (at most `batch_size`) rows
+        self.batch_size = batch_size
+
+    def print_rows(self, rows):
+        self.on_fields(list(next(rows)))
+        batch = []
+        for row in rows:
+            batch.append(list(row))
+            if len(batch) == self.batch_size:
+                self.on_batch(batch)
+                batch = []
+        if batch:
+            self.on_batch(batch)
\ No newline at end of file
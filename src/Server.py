@@ -0,0 +1,121 @@
+"""Query server for CSVDB (csvdb.py --serve ADDRESS).
+
+The server keeps a single CSVDB session alive across requests, so the `Table.table_dict` cache,
+the `Catalog` and any other per-process state stay warm between clients.
+
+Wire protocol:
+    Every message (in both directions) is a frame:
+        [length][payload]
+        length = 4 byte big endian unsigned int - the length of payload in bytes
+        payload = UTF-8 encoded JSON object
+
+    Client -> Server:
+        {"sql": TEXT}  -- one or more CSVDB-SQL commands to execute.
+    Server -> Client (for each request, in order):
+        {"fields": [FIELD, ...]}  -- start of the output of a SELECT command
+        {"rows": [[VALUE, ...], ...]}  -- a batch of output rows (NULL values are null)
+        {"message": TEXT}  -- console output of a command (errors, verbose messages)
+        {"done": true}  -- the request finished executing
+
+Addresses:
+    unix:PATH  -- a Unix domain socket at PATH
+    [HOST:]PORT  -- a TCP socket (HOST defaults to 127.0.0.1)
+"""
+from SqlParser import SqlParser
+from Table import Table
+from Printer import BatchPrinter
+from Client import HEADER, encode_frame, parse_address
+
+import asyncio
+import contextlib
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Server:
+    """Serves CSVDB-SQL requests on `address` (see module documentation).
+    Commands are executed one at a time on a single worker thread, since `Table` isn't thread-safe,
+    while the event loop streams the output batches of the current command to its client.
+    """
+
+    QUEUE_SIZE = 16  # maximum number of output frames waiting to be sent (back-pressure on the worker)
+
+    def __init__(self, address, verbose=False):
+        self.address = address
+        self.verbose = verbose
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def serve_forever(self):
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            pass
+
+    async def main(self):
+        kind, address = parse_address(self.address)
+        if kind == "unix":
+            server = await asyncio.start_unix_server(self.handle_client, path=address)
+        else:
+            server = await asyncio.start_server(self.handle_client, *address)
+        if self.verbose:
+            print(f"Verbose: CSVDB server listening on {self.address}\n")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                    payload = await reader.readexactly(HEADER.unpack(header)[0])
+                except asyncio.IncompleteReadError:  # client disconnected
+                    break
+                request = json.loads(payload.decode("utf-8"))
+                await self.handle_request(request.get("sql", ""), writer)
+        finally:
+            writer.close()
+
+    async def handle_request(self, sql, writer):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(Server.QUEUE_SIZE)
+
+        def send(obj):  # called from the worker thread
+            asyncio.run_coroutine_threadsafe(queue.put(obj), loop).result()
+
+        job = loop.run_in_executor(self.executor, self.execute, sql, send)
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(queue.put_nowait, None))
+        while True:
+            obj = await queue.get()
+            if obj is None:  # worker finished
+                break
+            writer.write(encode_frame(obj))
+            await writer.drain()
+        try:
+            await job
+        except Exception as e:  # unexpected error - report it and keep serving
+            writer.write(encode_frame({"message": f"CSVDB server error:\n{e!r}\n"}))
+        writer.write(encode_frame({"done": True}))
+        await writer.drain()
+
+    def execute(self, sql, send):
+        """Executes the commands in `sql`, passing output frames to `send` (runs on the worker thread).
+        """
+        printer = BatchPrinter(lambda fields: send({"fields": fields}),
+                               lambda batch: send({"rows": batch}))
+        if sql.strip() and sql.strip()[-1] != ";": sql += ';'
+        for node in Server.parse(sql, send):
+            console = io.StringIO()
+            with contextlib.redirect_stdout(console):
+                Table.execute_command(node, printer)
+            if console.getvalue():
+                send({"message": console.getvalue()})
+
+    @staticmethod
+    def parse(sql, send):
+        console = io.StringIO()
+        with contextlib.redirect_stdout(console):
+            nodes = SqlParser(sql).parse_multi_commands()
+        if console.getvalue():
+            send({"message": console.getvalue()})
+        return nodes
@@ -0,0 +1,132 @@
+import base64
+import hashlib
+import math
+import random
+
+
+def hash64(value):
+    """Returns a 64 bit hash of `value` (str, int or float) that is the same in every process
+    (unlike the builtin `hash` of strings, which is randomized per process).
+    """
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+    elif isinstance(value, float):
+        data = value.hex().encode()
+    else:
+        data = (value & 0xFFFFFFFFFFFFFFFF).to_bytes(8, "little")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """HyperLogLog sketch - estimates the number of distinct values added to it
+    in a fixed amount of memory (2**PRECISION one byte registers, about 1.6% standard error).
+    Sketches of disjoint or overlapping sets of values can be merged (their union's estimate).
+    """
+
+    PRECISION = 12
+
+    def __init__(self, registers=None):
+        self.num_registers = 2 ** HyperLogLog.PRECISION
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.num_registers)
+
+    def add(self, value):
+        h = hash64(value)
+        index = h >> (64 - HyperLogLog.PRECISION)  # first PRECISION bits select the register
+        rest = h & ((1 << (64 - HyperLogLog.PRECISION)) - 1)
+        rank = (64 - HyperLogLog.PRECISION) - rest.bit_length() + 1  # position of the first 1 bit
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Merges the sketch `other` into this one.
+        """
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self):
+        """Returns the estimated number of distinct values added to the sketch.
+        """
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:  # small cardinality - linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_json(self):
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    @staticmethod
+    def from_json(data):
+        return HyperLogLog(base64.b64decode(data))
+
+
+class KLLSketch:
+    """KLL quantiles sketch - estimates the quantiles of the values added to it in constant memory
+    (about 3*K values; the rank error is about 1.7/K, i.e. under 1% for K=200).
+    Values are kept in compactors: a value in compactor h stands for 2**h added values. When the
+    sketch is full, a compactor is sorted and every other value in it is promoted to the next one.
+    Sketches can be merged (the quantiles of the union of their values).
+    """
+
+    K = 200
+    C = 2 / 3  # ratio between the capacities of consecutive compactors
+
+    def __init__(self, seed=0):
+        self.compactors = []
+        self.size = 0  # number of values held in the compactors
+        self.max_size = 0
+        self.rand = random.Random(seed)  # chooses which half of a compactor is promoted
+        self.grow()
+
+    def grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self.capacity(h) for h in range(len(self.compactors)))
+
+    def capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(KLLSketch.C ** depth * KLLSketch.K)) + 1
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.size += 1
+        if self.size >= self.max_size:
+            self.compress()
+
+    def compress(self):
+        for h, compactor in enumerate(self.compactors):
+            if len(compactor) >= self.capacity(h):
+                if h + 1 == len(self.compactors):
+                    self.grow()
+                compactor.sort()
+                leftover = [compactor.pop()] if len(compactor) % 2 else []
+                self.compactors[h+1].extend(compactor[self.rand.random() < 0.5::2])
+                self.compactors[h] = leftover
+                self.size = sum(len(compactor) for compactor in self.compactors)
+                break  # the size was reduced by at least one value
+
+    def merge(self, other):
+        """Merges the sketch `other` into this one.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.grow()
+        for h, compactor in enumerate(other.compactors):
+            self.compactors[h].extend(compactor)
+        self.size = sum(len(compactor) for compactor in self.compactors)
+        while self.size >= self.max_size:
+            self.compress()
+
+    def quantile(self, p):
+        """Returns the estimated `p`-quantile (0 <= p <= 1) of the values added to the sketch,
+        or None if none were added.
+        """
+        weighted = sorted((value, 2 ** h) for h, compactor in enumerate(self.compactors) for value in compactor)
+        if not weighted:
+            return None
+        total = sum(weight for value, weight in weighted)
+        rank = 0
+        for value, weight in weighted:
+            rank += weight
+            if rank >= p * total:
+                return value
+        return weighted[-1][0]
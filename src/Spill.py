@@ -0,0 +1,208 @@
+import heapq
+import pickle
+import sys
+import tempfile
+
+
+def estimate_size(row):
+    """Returns an estimate of the memory (in bytes) used by the tuple `row` and its values.
+    """
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+
+class SpillFile:
+    """A temporary file holding batches of rows that don't fit in memory.
+    Batches are appended by `write` and read back (in the same order) by iterating over the file.
+    The file is deleted when it is closed.
+    """
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.rows = 0  # number of rows written to the file
+
+    def write(self, batch):
+        pickle.dump(batch, self.file, pickle.HIGHEST_PROTOCOL)
+        self.rows += len(batch)
+
+    def __iter__(self):
+        """Yields the batches written to the file.
+        """
+        self.file.seek(0)
+        while True:
+            try:
+                yield pickle.load(self.file)
+            except EOFError:
+                return
+
+    def rows_iter(self):
+        """Yields the rows written to the file.
+        """
+        for batch in self:
+            yield from batch
+
+    def close(self):
+        self.file.close()
+
+
+class Partitioner:
+    """Splits rows into `num_partitions` SpillFiles by the hash of their key (`key` is a function of a row).
+    Rows with equal keys always end up in the same partition. `level` salts the hash function,
+    so that a partition that is still too big can be split again by a different hash.
+    Rows are buffered per partition and written in batches of `batch_size` rows.
+    """
+
+    def __init__(self, num_partitions, key, level=0, batch_size=1024):
+        self.num_partitions = num_partitions
+        self.key = key
+        self.level = level
+        self.batch_size = batch_size
+        self.partitions = [SpillFile() for _ in range(num_partitions)]
+        self.buffers = [[] for _ in range(num_partitions)]
+
+    def add(self, row):
+        i = hash((self.level, self.key(row))) % self.num_partitions
+        buffer = self.buffers[i]
+        buffer.append(row)
+        if len(buffer) == self.batch_size:
+            self.partitions[i].write(buffer)
+            self.buffers[i] = []
+
+    def finish(self):
+        """Flushes the buffers and returns the list of partitions (SpillFiles).
+        """
+        for partition, buffer in zip(self.partitions, self.buffers):
+            if buffer:
+                partition.write(buffer)
+        self.buffers = [[] for _ in range(self.num_partitions)]
+        return self.partitions
+
+
+class DistinctSet:
+    """A set of values (hashable, picklable) that spills to disk when it exceeds its memory budget.
+    Iterating over it yields every distinct value added to it once, in no particular order.
+
+    Values are kept in an in-memory set until its estimated size exceeds `memory_budget`; then all
+    values (those in memory and those added later) are split into NUM_PARTITIONS partitions by hash,
+    so equal values end up in the same partition, and each partition is deduplicated separately
+    (spilling again, with a different hash, if it still doesn't fit - up to MAX_LEVEL times).
+    """
+
+    MEMORY_BUDGET = 64 * 2**20  # bytes
+    NUM_PARTITIONS = 16
+    MAX_LEVEL = 3
+    BATCH_SIZE = 1024  # number of values added by each `update` of SELECT DISTINCT
+
+    def __init__(self, memory_budget=None, level=0):
+        self.memory_budget = memory_budget or DistinctSet.MEMORY_BUDGET
+        self.level = level
+        self.values = set()
+        self.size = 0  # estimated memory used by `values`
+        self.partitioner = None  # Partitioner of the values, once they were spilled
+        self.spilled_partitions = 0  # number of partitions spilled to disk (including by nested sets)
+
+    def add(self, value):
+        if self.partitioner is not None:
+            self.partitioner.add(value)
+            return
+        if value not in self.values:
+            self.values.add(value)
+            self.size += DistinctSet.value_size(value)
+            if self.size > self.memory_budget and self.level < DistinctSet.MAX_LEVEL:
+                self.spill()
+
+    def update(self, values):
+        """Adds a batch of values - the new ones are found by set operations instead of one lookup per value.
+        """
+        if self.partitioner is not None:
+            for value in values:
+                self.partitioner.add(value)
+            return
+        new_values = set(values)
+        new_values -= self.values
+        self.values |= new_values
+        self.size += sum(map(DistinctSet.value_size, new_values))
+        if self.size > self.memory_budget and self.level < DistinctSet.MAX_LEVEL:
+            self.spill()
+
+    @staticmethod
+    def value_size(value):
+        """Returns the approximate memory used by `value` in the set (a tuple, e.g. a row, with its fields).
+        """
+        return (estimate_size(value) if isinstance(value, tuple) else sys.getsizeof(value)) + 32  # (+ a set entry)
+
+    def spill(self):
+        self.partitioner = Partitioner(DistinctSet.NUM_PARTITIONS, lambda value: value, self.level)
+        for value in self.values:
+            self.partitioner.add(value)
+        self.values = None
+        self.spilled_partitions += DistinctSet.NUM_PARTITIONS
+
+    def __iter__(self):
+        if self.partitioner is None:
+            yield from self.values
+            return
+        for partition in self.partitioner.finish():
+            partition_set = DistinctSet(self.memory_budget, self.level + 1)
+            for value in partition.rows_iter():
+                partition_set.add(value)
+            partition.close()
+            yield from partition_set
+            self.spilled_partitions += partition_set.spilled_partitions
+
+    def close(self):
+        """Deletes the spilled partitions (if the set wasn't iterated over).
+        """
+        if self.partitioner is not None:
+            for partition in self.partitioner.partitions:
+                partition.close()
+
+
+class ExternalSort:
+    """Sorts rows (tuples, picklable) by `key` (a function of a row), spilling sorted runs to disk when they
+    exceed its memory budget. Iterating over it yields the rows added to it in order (the sort is stable).
+
+    Rows are added in batches to an in-memory list until its estimated size exceeds `memory_budget`; then the list
+    is sorted and written to a SpillFile as a sorted run, and a new list is started. When it is iterated over,
+    the rows left in memory are sorted and merged with the runs (`heapq.merge` reads a batch of each run at a time).
+    """
+
+    MEMORY_BUDGET = 64 * 2**20  # bytes
+    BATCH_SIZE = 1024  # number of rows added by each `update`, and written to a run by each write
+
+    def __init__(self, key, memory_budget=None):
+        self.key = key
+        self.memory_budget = memory_budget or ExternalSort.MEMORY_BUDGET
+        self.rows = []
+        self.size = 0  # estimated memory used by `rows`
+        self.runs = []  # SpillFiles of the sorted runs, in the order they were spilled
+
+    def update(self, rows):
+        """Adds a batch of rows.
+        """
+        self.rows += rows
+        self.size += sum(map(estimate_size, rows))
+        if self.size > self.memory_budget:
+            self.spill()
+
+    def spill(self):
+        self.rows.sort(key=self.key)
+        run = SpillFile()
+        for i in range(0, len(self.rows), ExternalSort.BATCH_SIZE):
+            run.write(self.rows[i:i + ExternalSort.BATCH_SIZE])
+        self.runs.append(run)
+        self.rows = []
+        self.size = 0
+
+    def __iter__(self):
+        self.rows.sort(key=self.key)
+        if not self.runs:
+            yield from self.rows
+            return
+        # (merge takes equal rows from the earlier of its inputs first, so the merged order is stable too)
+        yield from heapq.merge(*[run.rows_iter() for run in self.runs], self.rows, key=self.key)
+
+    def close(self):
+        """Deletes the spilled runs.
+        """
+        for run in self.runs:
+            run.close()
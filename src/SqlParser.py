@@ -28,30 +28,92 @@ class NodeDrop(BaseSyntaxNode):
         self.if_exists =  if_exists
 
 class NodeLoad(BaseSyntaxNode):
-    def __init__(self, infile_name, table_name, ignore_lines):
+    def __init__(self, infile_name, table_name, ignore_lines, max_errors=None):
         super().__init__(table_name)
         self.infile_name = infile_name
         self.ignore_lines = ignore_lines
+        self.max_errors = max_errors  # number of rejected rows the LOAD tolerates (None - any number)
 
 class NodeCreate(BaseSyntaxNode):
-    def __init__(self, if_not_exists, table_name, schema, select_command):
+    def __init__(self, if_not_exists, table_name, schema, select_command, partitioning=None, view_query=None):
         super().__init__(table_name)
         self.if_not_exists = if_not_exists
         self.schema = schema
         self.select_command = select_command
+        self.partitioning = partitioning
+        self.view_query = view_query  # text of the SELECT command of a materialized view (None for a table)
 
 class NodeSelect(BaseSyntaxNode):
     def __init__(self, expression_list, outfile_name, table_name, row_condition,
-                 group_fields, group_condition, order_fields):
+                 group_fields, group_condition, order_fields, join=None, sample=None, distinct=False,
+                 limit=None, offset=0):
         super().__init__(table_name)
+        self.distinct = distinct
+        self.join = join
+        self.sample = sample
         self.expression_list = expression_list
         self.outfile_name = outfile_name
         self.row_condition = row_condition
         self.group_fields = group_fields
         self.group_condition = group_condition
         self.order_fields = order_fields
+        self.limit = limit  # maximal number of output rows (None - all)
+        self.offset = offset  # number of output rows skipped
+
+class NodeExplain(BaseSyntaxNode):
+    def __init__(self, select_command, analyze):
+        super().__init__(select_command.table_name)
+        self.select_command = select_command
+        self.analyze = analyze
+
+class NodeAnalyze(BaseSyntaxNode):
+    def __init__(self, table_name):
+        super().__init__(table_name)
+
+class NodeShowStats(BaseSyntaxNode):
+    def __init__(self):
+        super().__init__(None)
+
+class NodeShowPartitions(BaseSyntaxNode):
+    def __init__(self, table_name):
+        super().__init__(table_name)
+
+class NodeDelete(BaseSyntaxNode):
+    def __init__(self, table_name, row_condition):
+        super().__init__(table_name)
+        self.row_condition = row_condition
+
+class NodeUpdate(BaseSyntaxNode):
+    def __init__(self, table_name, assignments, row_condition):
+        super().__init__(table_name)
+        self.assignments = assignments
+        self.row_condition = row_condition
+
+class NodeVacuum(BaseSyntaxNode):
+    def __init__(self, table_name):
+        super().__init__(table_name)
+
+class NodeExport(BaseSyntaxNode):
+    def __init__(self, table_name, outfile_name, compressed=False):
+        super().__init__(table_name)
+        self.outfile_name = outfile_name
+        self.compressed = compressed
+
+class NodeImport(BaseSyntaxNode):
+    def __init__(self, table_name, infile_name):
+        super().__init__(table_name)
+        self.infile_name = infile_name
+
+class NodeDropPartition(BaseSyntaxNode):
+    def __init__(self, table_name, partition_name):
+        super().__init__(table_name)
+        self.partition_name = partition_name
 
 class SqlParser(object):
+    AGG_FUNCS = ["min", "max", "avg", "sum", "count", "approx_count_distinct", "approx_percentile"]
+    # Words that only start a command, so they aren't reserved and are still valid field names:
+    COMMAND_WORDS = ["explain", "analyze", "show", "alter", "delete", "update", "vacuum", "export", "import"]
+
     def __init__(self, text):
         self._text = text
         self._tokenizer = SqlTokenizer.SqlTokenizer(text)
@@ -89,7 +151,8 @@ class SqlParser(object):
         val = self._val
         if tok == SqlTokenizer.SqlTokenKind.EOF:
             return None
-        self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD)
+        if tok != SqlTokenizer.SqlTokenKind.IDENTIFIER or val not in SqlParser.COMMAND_WORDS:
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD)
         if val == "create":
             return self._parse_create()
         elif val == "drop":
@@ -98,6 +161,24 @@ class SqlParser(object):
             return self._parse_load()
         elif val == "select":
             return self._parse_select()
+        elif val == "explain":
+            return self._parse_explain()
+        elif val == "show":
+            return self._parse_show()
+        elif val == "analyze":
+            return self._parse_analyze()
+        elif val == "alter":
+            return self._parse_alter()
+        elif val == "delete":
+            return self._parse_delete()
+        elif val == "update":
+            return self._parse_update()
+        elif val == "vacuum":
+            return self._parse_vacuum()
+        elif val == "export":
+            return self._parse_export()
+        elif val == "import":
+            return self._parse_import()
         else:
             self._raise_error("Unexpected command: " + str(self._val))
 
@@ -117,6 +198,26 @@ class SqlParser(object):
     def _raise_error(self, message):
         raise CSVDBSyntaxError(message, self._line, self._col, self._text)
 
+    def _parse_field_name(self):
+        """Parse a field name, which may be qualified by the name of its table.
+        Syntax:
+            [_table_name_.]_field_
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+            {IDENTIFIER} _field_: [a-zA-Z_]\w*
+
+        Returns:
+            str -- the field name, e.g: "movies.year" or "year".
+        """
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _field_name_ = self._val
+        self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.OPERATOR and self._val == ".":
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+            _field_name_ += "." + self._val
+            self._next_token()
+        return _field_name_
+
     def _parse_drop(self):
         """Parse a DROP command.
         Syntax:
@@ -153,11 +254,16 @@ class SqlParser(object):
         Syntax:
             LOAD DATA INFILE _infile_name_
             INTO TABLE _table_name_
-            [IGNORE _ignore_lines_ LINES];
+            [IGNORE _ignore_lines_ LINES]
+            [MAX ERRORS _max_errors_];
 
             {LIT_STR} _infile_name_: FILENAME
             {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
             {LIT_NUM} _ignore_lines_: \d+
+            {LIT_NUM} _max_errors_: \d+
+
+            The records of an infile row are matched to the fields of the table in order: missing records are NULL,
+            and extra records are ignored. A row with a record that isn't a value of its field's type is rejected.
    
         Returns:
             NodeLoad -- node with the LOAD command arguments.
@@ -167,6 +273,7 @@ class SqlParser(object):
         _infile_name_ = ""
         _table_name_ = ""
         _ignore_lines_ = 0
+        _max_errors_ = None
 
         # Parse "LOAD DATA INFILE" clause:
         self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "load")
@@ -190,9 +297,14 @@ class SqlParser(object):
             self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "lines")
             self._next_token()
 
+        # Attempt parse optional MAX ERRORS clause (ERRORS isn't reserved, so it's still a valid field name):
+        if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "max":
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "errors")
+            _max_errors_ = self._parse_row_count()
+
         # No more possible optional clauses to parse, reached end of command:
         self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
-        return NodeLoad(_infile_name_, _table_name_, _ignore_lines_)
+        return NodeLoad(_infile_name_, _table_name_, _ignore_lines_, _max_errors_)
 
     def _parse_create(self):
         """Parse a CREATE command.
@@ -200,18 +312,25 @@ class SqlParser(object):
             1.
                 CREATE TABLE [IF NOT EXISTS] _table_name_ (
                     _schema_
-                );
+                ) [_partitioning_];
 
                 {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
                 _schema_: [_name_ _type_,]*
                            _name_ _type_
                     {IDENTIFIER} _name_: [a-zA-Z_]\w*
                     {KEYWORD} _type_: [INT|FLOAT|VARCHAR|TIMESTAMP]
+                _partitioning_: PARTITION BY [RANGE (_name_) INTERVAL _interval_ | LIST (_name_)]
+                    (see PartitionClause documentation)
             2.
                 CREATE TABLE [IF NOT EXISTS] _table_name_ AS _select_command_
 
                 {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
                 _select_command_: SELECT command syntax (see _parse_select documentation)
+            3.
+                CREATE MATERIALIZED VIEW [IF NOT EXISTS] _table_name_ AS _select_command_
+
+                {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+                _select_command_: SELECT command with aggregate functions and/or GROUP BY over a single table
     
         Returns:
             NodeCreate -- node with the CREATE command arguments.
@@ -222,9 +341,17 @@ class SqlParser(object):
         _table_name_ = ""
         _schema_ = []
         _select_command_ = None
+        _partitioning_ = None
+        _view_query_ = None
+        _materialized_ = False
 
         self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "create")
-        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "table")
+        self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "materialized":
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "view")
+            _materialized_ = True
+        else:
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "table")
         self._next_token()
 
         # Parse "IF NOT EXISTS" clause:
@@ -240,7 +367,13 @@ class SqlParser(object):
         self._next_token()
         self._expect_cur_token([SqlTokenizer.SqlTokenKind.KEYWORD,SqlTokenizer.SqlTokenKind.OPERATOR])
 
-        if self._val == "(" and self._token == SqlTokenizer.SqlTokenKind.OPERATOR:
+        if _materialized_:
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "as")
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "select")
+            start = self._tokenizer.cur_index() - len(self._val)
+            _select_command_ = self._parse_select()
+            _view_query_ = self._text[start:self._tokenizer.cur_index() - 1].strip()  # (without the ';')
+        elif self._val == "(" and self._token == SqlTokenizer.SqlTokenKind.OPERATOR:
             # Parse table schema:
             self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, "(")
             while True:
@@ -255,6 +388,9 @@ class SqlParser(object):
                 if self._val == ")":
                     self._next_token()
                     break
+            # PARTITION isn't reserved (it's only a word after the schema), so it's still a valid field name:
+            if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "partition":
+                _partitioning_ = self._parse_partition_clause()
         else:
             self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "as")
             self._next_token()
@@ -263,41 +399,293 @@ class SqlParser(object):
 
         
         self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
-        return NodeCreate(_if_not_exists_, _table_name_, _schema_, _select_command_)
+        return NodeCreate(_if_not_exists_, _table_name_, _schema_, _select_command_, _partitioning_, _view_query_)
+
+    def _parse_partition_clause(self):
+        """Parses a PARTITION BY clause (see PartitionClause documentation) and returns it as a PartitionClause object.
+        """
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "partition")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "by")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, ["range", "list"])
+        _method_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, "(")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _field_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ")")
+        self._next_token()
+        _interval_ = None
+        if _method_ == "range":
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "interval")
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.LIT_NUM)
+            if self._val <= 0:
+                self._raise_error("Partition interval must be positive: " + str(self._val))
+            _interval_ = self._val
+            self._next_token()
+        return PartitionClause(_method_, _field_name_, _interval_)
+
+    def _parse_alter(self):
+        """Parse an ALTER command.
+        Syntax:
+            ALTER TABLE _table_name_ DROP PARTITION _partition_name_;
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+            {IDENTIFIER} _partition_name_: name of a partition of the table (see SHOW PARTITIONS)
+
+        Returns:
+            NodeDropPartition -- node with the ALTER TABLE ... DROP PARTITION command arguments.
+        """
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "alter")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "table")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _table_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "drop")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "partition")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _partition_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeDropPartition(_table_name_, _partition_name_)
+
+
+    def _parse_delete(self):
+        """Parse a DELETE command.
+        Syntax:
+            DELETE FROM _table_name_ [WHERE _row_condition_];
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+            _row_condition_: see _parse_select documentation (all the rows if omitted)
+
+        Returns:
+            NodeDelete -- node with the DELETE command arguments.
+        """
+        _row_condition_ = None
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "delete")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "from")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _table_name_ = self._val
+        self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "where":
+            _row_condition_ = self.parse_condition_clause()
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeDelete(_table_name_, _row_condition_)
+
+    def _parse_update(self):
+        """Parse an UPDATE command.
+        Syntax:
+            UPDATE _table_name_ SET _assignments_ [WHERE _row_condition_];
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+            _assignments_: [_field_ = _constant_,]* _field_ = _constant_
+                {IDENTIFIER} _field_: [a-zA-Z_]\w*
+                {LIT_NUM | LIT_STR | KEYWORD} _constant_: Number, string enclosed in double quotes, or NULL
+            _row_condition_: see _parse_select documentation (all the rows if omitted)
 
+        Returns:
+            NodeUpdate -- node with the UPDATE command arguments (NULL constants are None).
+        """
+        _assignments_ = []
+        _row_condition_ = None
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "update")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _table_name_ = self._val
+        # SET isn't reserved (it's only a word after the table name), so it's still a valid field name:
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "set")
+        while True:
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+            _field_ = self._val
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, "=")
+            self._expect_next_token([SqlTokenizer.SqlTokenKind.LIT_NUM, SqlTokenizer.SqlTokenKind.LIT_STR,
+                                     SqlTokenizer.SqlTokenKind.KEYWORD])
+            if self._token == SqlTokenizer.SqlTokenKind.KEYWORD:
+                self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "null")
+                _constant_ = None
+            else:
+                _constant_ = self._val
+            _assignments_.append((_field_, _constant_))
+            self._next_token()
+            if self._token != SqlTokenizer.SqlTokenKind.OPERATOR or self._val != ",":
+                break
+        if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "where":
+            _row_condition_ = self.parse_condition_clause()
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeUpdate(_table_name_, _assignments_, _row_condition_)
+
+    def _parse_vacuum(self):
+        """Parse a VACUUM command.
+        Syntax:
+            VACUUM [TABLE] _table_name_;
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+
+        Returns:
+            NodeVacuum -- node with the VACUUM command arguments.
+        """
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "vacuum")
+        self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "table":
+            self._next_token()
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _table_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeVacuum(_table_name_)
+
+    def _parse_export(self):
+        """Parse an EXPORT command.
+        Syntax:
+            EXPORT TABLE _table_name_ TO _outfile_name_ [COMPRESSED];
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+            {LIT_STR} _outfile_name_: string enclosed in double quotes (the table container file - see `TableContainer`)
+
+        Returns:
+            NodeExport -- node with the EXPORT command arguments.
+        """
+        _compressed_ = False
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "export")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "table")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _table_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "to")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.LIT_STR)
+        _outfile_name_ = self._val
+        self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "compressed":
+            _compressed_ = True
+            self._next_token()
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeExport(_table_name_, _outfile_name_, _compressed_)
+
+    def _parse_import(self):
+        """Parse an IMPORT command.
+        Syntax:
+            IMPORT TABLE _table_name_ FROM _infile_name_;
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w* (a new table)
+            {LIT_STR} _infile_name_: string enclosed in double quotes (a file written by EXPORT TABLE)
+
+        Returns:
+            NodeImport -- node with the IMPORT command arguments.
+        """
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "import")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "table")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _table_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "from")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.LIT_STR)
+        _infile_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeImport(_table_name_, _infile_name_)
+
+    def _parse_explain(self):
+        """Parse an EXPLAIN command.
+        Syntax:
+            EXPLAIN [ANALYZE] _select_command_
+
+            _select_command_: SELECT command syntax (see _parse_select documentation)
+
+        Returns:
+            NodeExplain -- node with the EXPLAIN command arguments.
+        """
+
+        # Node arguments:
+        _analyze_ = False
+
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "explain")
+        self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "analyze":
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "analyze")
+            self._next_token()
+            _analyze_ = True
+        _select_command_ = self._parse_select()
+        return NodeExplain(_select_command_, _analyze_)
+
+    def _parse_analyze(self):
+        """Parse an ANALYZE command.
+        Syntax:
+            ANALYZE [TABLE] _table_name_;
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+
+        Returns:
+            NodeAnalyze -- node with the ANALYZE command arguments.
+        """
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "analyze")
+        self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "table":
+            self._next_token()
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+        _table_name_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeAnalyze(_table_name_)
+
+    def _parse_show(self):
+        """Parse a SHOW command.
+        Syntax:
+            SHOW STATS;
+            SHOW PARTITIONS _table_name_;
+
+            {IDENTIFIER} _table_name_: [a-zA-Z_]\w*
+
+        Returns:
+            NodeShowStats -- node of the SHOW STATS command.
+            NodeShowPartitions -- node of the SHOW PARTITIONS command.
+        """
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "show")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, ["stats", "partitions"])
+        if self._val == "partitions":
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+            _table_name_ = self._val
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+            return NodeShowPartitions(_table_name_)
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
+        return NodeShowStats()
 
     def _parse_select(self):
         """Parse a SELECT command.
         Syntax:
-            SELECT [*|_expression_list_]
+            SELECT [DISTINCT] [*|_expression_list_]
             [INTO OUTFILE _outfile_name_]
             FROM _table_name_
+            [TABLESAMPLE _sample_method_ (_percentage_) [REPEATABLE (_seed_)]]
+            [JOIN _join_table_name_ ON _field_name_ = _field_name_]
             [WHERE _row_condition_]
             [GROUP BY _group_fields_]
             [HAVING _group_condition_]
-            [ORDER BY _order_fields_];
+            [ORDER BY _order_fields_]
+            [LIMIT _limit_ [OFFSET _offset_]];
 
 
             _expression_list_: [_expression_, ]* _expression_
                 _expression_: [_field_name_ | _agg_expression_ ] [AS _field_identifier_]
-                    {IDENTIFIER} _field_name_: [a-zA-Z_]\w*
-                    _agg_expression_: _agg_func_(_field_name_)
-                        {KEYWORD} _agg_func_: [MIN|MAX|AVG|SUM|COUNT]
+                    _field_name_: [_table_name_.]_field_ (see _parse_field_name documentation)
+                    _agg_expression_: [_agg_func_([DISTINCT] _field_name_) | APPROX_PERCENTILE(_field_name_, _parameter_)]
+                        {KEYWORD} _agg_func_: [MIN|MAX|AVG|SUM|COUNT|APPROX_COUNT_DISTINCT]
+                        DISTINCT only in COUNT, and COUNT(*) counts all rows
+                        {LIT_NUM} _parameter_: percentile between 0 and 1
                     {IDENTIFIER} _field_identifier_: [a-zA-Z_]\w*
 
             {LIT_STR} _outfile_name_: FILENAME
 
+            {IDENTIFIER} _sample_method_: [SYSTEM|BERNOULLI]  (see SampleClause documentation)
+                {LIT_NUM} _percentage_: Number between 0 and 100
+                {LIT_NUM} _seed_: Integer
+
+            {IDENTIFIER} _join_table_name_: [a-zA-Z_]\w*
+
             _row_condition_: _field_name_ _operator_ _constant_
                 {LIT_NUM | LIT_STR} _constant_: Number, string enclosed in double quotes, or string 'NULL' indicating null value
                 {OPERATOR | KEYWORD} _operator_: [< | <= | = | >= | > | <> | IS | IS NOT]
-            _group_fields_: [_field_identifier_,]* _field_identifier_
+            _group_fields_: [_field_name_,]* _field_name_
 
             _group_condition_: _field_identifier_ _operator_ _constant_
+                (_field_identifier_ is the identifier of an output field)
 
             _order_fields_: [_order_field_,]* _order_field_
-                _order_field_ : _field_identifier_ _order_
+                _order_field_ : _field_name_ _order_
                     {KEYWORD} _order_: [ASC|DESC]
 
+            {LIT_NUM} _limit_: Integer - maximal number of output rows
+            {LIT_NUM} _offset_: Integer - number of output rows to skip (0 by default)
+
         Returns:
             NodeSelect -- node with the SELECT command arguments.
         """
@@ -310,9 +698,17 @@ class SqlParser(object):
         _group_fields_ = []
         _group_condition_ = None
         _order_fields_ = []
+        _join_ = None
+        _sample_ = None
+        _distinct_rows_ = False
+        _limit_ = None
+        _offset_ = 0
 
         self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "select")
         self._next_token()
+        if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "distinct":  # SELECT DISTINCT
+            _distinct_rows_ = True
+            self._next_token()
         self._expect_cur_token([SqlTokenizer.SqlTokenKind.KEYWORD, SqlTokenizer.SqlTokenKind.IDENTIFIER, SqlTokenizer.SqlTokenKind.OPERATOR])
         if self._token == SqlTokenizer.SqlTokenKind.OPERATOR and self._val == "*":
             self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, '*')
@@ -321,19 +717,35 @@ class SqlParser(object):
             # Parse expression list:
             while True:
                 # Parse single expression:
-                _agg_func_ = _field_name_ = _field_identifier_ = None
+                _agg_func_ = _field_name_ = _field_identifier_ = _parameter_ = None
+                _distinct_ = False
                 self._expect_cur_token([SqlTokenizer.SqlTokenKind.KEYWORD, SqlTokenizer.SqlTokenKind.IDENTIFIER])
-                if self._val in ["min","max","avg","sum","count"]: # aggregate expression
-                    self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, ["min","max","avg","sum","count"])
+                if self._val in SqlParser.AGG_FUNCS: # aggregate expression
+                    self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, SqlParser.AGG_FUNCS)
                     _agg_func_ = self._val
                     self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, "(")
-                    self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, regex=r"[a-zA-Z_]\w*")
-                    _field_name_ = self._val
-                    self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ")") 
+                    self._next_token()
+                    if _agg_func_ == "count" and self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "distinct":
+                        self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "distinct")
+                        _distinct_ = True
+                        self._next_token()
+                    if _agg_func_ == "count" and not _distinct_ and self._token == SqlTokenizer.SqlTokenKind.OPERATOR:
+                        self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, "*")  # COUNT(*)
+                        _field_name_ = "*"
+                        self._next_token()
+                    else:
+                        _field_name_ = self._parse_field_name()
+                    if _agg_func_ == "approx_percentile":
+                        self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ",")
+                        self._expect_next_token(SqlTokenizer.SqlTokenKind.LIT_NUM)
+                        if not 0 <= self._val <= 1:
+                            self._raise_error("Percentile must be between 0 and 1: " + str(self._val))
+                        _parameter_ = self._val
+                        self._next_token()
+                    self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ")") 
+                    self._next_token()
                 else: # field name expression
-                    self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
-                    _field_name_ = self._val
-                self._next_token()
+                    _field_name_ = self._parse_field_name()
 
                 if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "as":
                     # Assign a non-default identifier for the expression: 
@@ -343,7 +755,7 @@ class SqlParser(object):
                     self._next_token()
                 
                 # Construct and log the expression into expression_list:
-                _expression_ = SelectField(_field_name_, _field_identifier_, _agg_func_)
+                _expression_ = SelectField(_field_name_, _field_identifier_, _agg_func_, _distinct_, _parameter_)
                 _expression_list_.append(_expression_)
 
                 if self._token != SqlTokenizer.SqlTokenKind.OPERATOR or self._val != ",":
@@ -366,7 +778,25 @@ class SqlParser(object):
         _table_name_ = self._val
         self._next_token()
 
-        self._expect_cur_token([SqlTokenizer.SqlTokenKind.KEYWORD, SqlTokenizer.SqlTokenKind.OPERATOR])
+        self._expect_cur_token([SqlTokenizer.SqlTokenKind.KEYWORD, SqlTokenizer.SqlTokenKind.IDENTIFIER,
+                                SqlTokenizer.SqlTokenKind.OPERATOR])
+
+        # Attempt parse optional "TABLESAMPLE" clause (TABLESAMPLE isn't reserved, so it's still a valid field name):
+        if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "tablesample":
+            _sample_ = self._parse_sample_clause()
+
+        # Attempt parse optional "JOIN" clause (JOIN and ON aren't reserved, so they're still valid field names):
+        if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "join":
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "join")
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
+            _join_table_name_ = self._val
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "on")
+            self._next_token()
+            _left_field_ = self._parse_field_name()
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, "=")
+            self._next_token()
+            _right_field_ = self._parse_field_name()
+            _join_ = JoinClause(_join_table_name_, _left_field_, _right_field_)
 
         # Attempt parse optional "WHERE" clause:
         if self._token == SqlTokenizer.SqlTokenKind.KEYWORD and self._val == "where":
@@ -378,11 +808,10 @@ class SqlParser(object):
             self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "group")
             self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "by")
             while True:
-                self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
-                _field_identifier_ = self._val
+                self._next_token()
+                _field_identifier_ = self._parse_field_name()
                 _expression_ = GroupField(_field_identifier_)
                 _group_fields_.append(_expression_)
-                self._next_token()
                 if self._token != SqlTokenizer.SqlTokenKind.OPERATOR or self._val != ",":
                     # reached end of fields list
                     break
@@ -398,9 +827,8 @@ class SqlParser(object):
             self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, "order")
             self._expect_next_token(SqlTokenizer.SqlTokenKind.KEYWORD, "by")
             while True:
-                self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
-                _field_identifier_ = self._val
                 self._next_token()
+                _field_identifier_ = self._parse_field_name()
                 _order_ = "asc"  # order is ascending by default
                 if self._token == SqlTokenizer.SqlTokenKind.KEYWORD:
                     self._expect_cur_token(SqlTokenizer.SqlTokenKind.KEYWORD, ["asc","desc"])
@@ -412,10 +840,53 @@ class SqlParser(object):
                     # reached end of fields list
                     break
 
+        # Attempt parse optional "LIMIT" clause (LIMIT and OFFSET aren't reserved, so they're still valid field names):
+        if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "limit":
+            _limit_ = self._parse_row_count()
+            if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "offset":
+                _offset_ = self._parse_row_count()
+
         # No more possible optional clauses to parse, reached end of command:
         self._expect_cur_token(SqlTokenizer.SqlTokenKind.OPERATOR, ";")
         return NodeSelect(_expression_list_, _outfile_name_, _table_name_, _row_condition_,
-                            _group_fields_, _group_condition_, _order_fields_) 
+                            _group_fields_, _group_condition_, _order_fields_, _join_, _sample_, _distinct_rows_,
+                            _limit_, _offset_)
+
+    def _parse_row_count(self):
+        """Parses the row count after the current word (LIMIT / OFFSET / ERRORS) - a non-negative integer.
+        """
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.LIT_NUM)
+        if not isinstance(self._val, int) or self._val < 0:
+            self._raise_error("Row count must be a non-negative integer: " + str(self._val))
+        row_count = self._val
+        self._next_token()
+        return row_count
+
+    def _parse_sample_clause(self):
+        """Parses a TABLESAMPLE clause (see SampleClause documentation) and returns it as a SampleClause object.
+        """
+        # The method names and REPEATABLE are only words after TABLESAMPLE, and valid field names anywhere else:
+        self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "tablesample")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, ["system", "bernoulli"])
+        _method_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, "(")
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.LIT_NUM)
+        if not 0 <= self._val <= 100:
+            self._raise_error("Sample percentage must be between 0 and 100: " + str(self._val))
+        _percentage_ = self._val
+        self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ")")
+        self._next_token()
+        _seed_ = None
+        if self._token == SqlTokenizer.SqlTokenKind.IDENTIFIER and self._val == "repeatable":
+            self._expect_cur_token(SqlTokenizer.SqlTokenKind.IDENTIFIER, "repeatable")
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, "(")
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.LIT_NUM)
+            if not isinstance(self._val, int):
+                self._raise_error("Sample seed must be an integer: " + str(self._val))
+            _seed_ = self._val
+            self._expect_next_token(SqlTokenizer.SqlTokenKind.OPERATOR, ")")
+            self._next_token()
+        return SampleClause(_method_, _percentage_, _seed_)
 
     
     def parse_condition_clause(self):
@@ -426,9 +897,8 @@ class SqlParser(object):
         """
 
         # Parse _field_name_:
-        self._expect_next_token(SqlTokenizer.SqlTokenKind.IDENTIFIER)
-        _field_name_ = self._val
         self._next_token()
+        _field_name_ = self._parse_field_name()
 
         # Parse _operator_:
         if self._token == SqlTokenizer.SqlTokenKind.KEYWORD:
@@ -472,9 +942,34 @@ class SqlParser(object):
 def _test():
     commands = ['DROP TABLE IF EXISTS movies;',
                 'LOAD DATA INFILE "data.txt"\nINTO TABLE _table\nIGNORE 2 LINES;',
+                'LOAD DATA INFILE "data.csv.gz" INTO TABLE _table MAX ERRORS 100;',
+                'CREATE TABLE loads (name VARCHAR, errors INT);',
                 'CREATE TABLE _table AS SELECT SUM(_col0_) as _sum_col1_ FROM _table0 ORDER BY _col0_;',
                 'CREATE TABLE IF NOT EXISTS _table (\n\tcol0 INT,\n\tcol1 FLOAT,\n\tcol2 VARCHAR,\n\tcol3 TIMESTAMP\n);',
-                'SELECT col0 AS _col0_, col1, SUM(col2) AS _sum_col2_\nINTO OUTFILE "result.csv"\nFROM _table\nWHERE _col0_ <> 5.5e2\nGROUP BY col1, _col0_\nHAVING _sum_col2_ < 10\nORDER BY col1 DESC, _col0_ ASC;']
+                'SELECT col0 AS _col0_, col1, SUM(col2) AS _sum_col2_\nINTO OUTFILE "result.csv"\nFROM _table\nWHERE _col0_ <> 5.5e2\nGROUP BY col1, _col0_\nHAVING _sum_col2_ < 10\nORDER BY col1 DESC, _col0_ ASC;',
+                'SELECT movies.title, ratings.rating FROM movies JOIN ratings ON movies.id = ratings.movie_id WHERE ratings.rating > 4;',
+                'SELECT on, join FROM sessions JOIN logins ON on = logins.on;',
+                'EXPLAIN ANALYZE SELECT * FROM movies WHERE year > 2000;',
+                'ANALYZE TABLE movies;',
+                'EXPLAIN SELECT explain, analyze FROM plans WHERE analyze > 0;',
+                'SELECT genre, COUNT(*), COUNT(DISTINCT director) AS directors, APPROX_PERCENTILE(rating, 0.9) FROM movies GROUP BY genre;',
+                'SELECT AVG(rating) FROM movies TABLESAMPLE SYSTEM (10) REPEATABLE (42) WHERE year > 2000;',
+                'SELECT system, AVG(tablesample) FROM hosts TABLESAMPLE BERNOULLI (5) WHERE repeatable > 0;',
+                'SELECT DISTINCT genre, director FROM movies WHERE year > 2000;',
+                'SELECT title, director FROM movies LIMIT 10 OFFSET 1000000;',
+                'SELECT limit, offset FROM quotas WHERE offset > 0 ORDER BY limit LIMIT 5;',
+                'CREATE TABLE events (ts TIMESTAMP, region VARCHAR) PARTITION BY RANGE (ts) INTERVAL 86400;',
+                'ALTER TABLE events DROP PARTITION p0;',
+                'CREATE TABLE shards (partition INT, alter FLOAT) PARTITION BY LIST (partition);',
+                'SELECT show, COUNT(*) FROM tickets GROUP BY show;',
+                'DELETE FROM movies WHERE year < 1950;',
+                'UPDATE movies SET rating = 4.5, director = NULL WHERE title = "Heat";',
+                'UPDATE sets SET set = 1, update = NULL WHERE delete = 0;',
+                'VACUUM movies;',
+                'CREATE MATERIALIZED VIEW daily AS SELECT region, COUNT(*), AVG(v) FROM events WHERE v > 0 GROUP BY region;',
+                'EXPORT TABLE movies TO "movies.csvdb" COMPRESSED;',
+                'IMPORT TABLE movies_copy FROM "movies.csvdb";',
+                'SELECT export, import FROM trades;']
 
     for command in commands:
         print(command, end="\n\n")
@@ -1,4 +1,3 @@
-import ast
 from enum import Enum
 import re
 
@@ -61,7 +60,10 @@ class SqlTokenizer(object):
         'is',
         'create',
         'if',
-        'exists'
+        'exists',
+        'distinct',
+        'approx_count_distinct',
+        'approx_percentile'
     ]
     _operators = [
         "<>",
@@ -75,6 +77,7 @@ class SqlTokenizer(object):
         "=",
         ";",
         "*",
+        ".",
     ]
 
     def __init__(self, text):
@@ -103,6 +106,7 @@ class SqlTokenizer(object):
             if not s or s[-1] != '"':
                 self._i_next = len(self._text)   # error - move to end
                 return SqlTokenKind.ERROR, "ERROR: BAD TOKEN"
+            import ast  # imported on use to keep startup fast
             return SqlTokenKind.LIT_STR, ast.literal_eval(s)
         next_operator = self._next_operator()
         if next_operator:
@@ -116,6 +120,10 @@ class SqlTokenizer(object):
         error messages. returns two caluses: line, column"""
         return self._cur_line_number + 1, self._i_next - self._cur_line_start_index + 1
 
+    def cur_index(self):
+        """returns the index into the text of the end of the current token"""
+        return self._i_next
+
     def _next_lit_numeric(self):
         m = re.match(r"^([\-\+]?\d+(\.\d*)?(e[\-\+]?\d+)?)", self._text[self._i_next:])
         if m:
@@ -0,0 +1,225 @@
+from Column import Column
+from Sketches import HyperLogLog
+
+import os
+import json
+import random
+
+
+class ColumnStatistics:
+    """Statistics of the values of a column:
+        count, nulls -- number of records and of NULL records.
+        min, max -- the smallest and largest non-NULL values (exact).
+        hll -- HyperLogLog sketch of the non-NULL values, estimating the number of distinct values.
+        sample -- a uniform reservoir sample of SAMPLE_SIZE non-NULL values (`seen` values were offered to it),
+                  kept so the statistics can be updated incrementally when rows are loaded.
+        histogram -- equi-depth histogram: NUM_BUCKETS+1 bounds such that about the same number of
+                     values falls between every two consecutive bounds (computed from the sample).
+    VARCHAR values in the sample are truncated to VARCHAR_PREFIX characters.
+    """
+
+    SAMPLE_SIZE = 1024
+    NUM_BUCKETS = 16
+    VARCHAR_PREFIX = 64
+
+    def __init__(self, _type):
+        self.type = _type
+        self.count = self.nulls = self.seen = 0
+        self.min = self.max = None
+        self.hll = HyperLogLog()
+        self.sample = []
+        self.histogram = []
+
+    def add_values(self, values):
+        """Adds the values `values` (read from the column file) to the statistics.
+        """
+        null = Column.TYPE_TO_NULL.get(self.type)
+        rand = random.Random(self.seen)  # deterministic sample for the same data
+        for value in values:
+            self.count += 1
+            if value == null:
+                self.nulls += 1
+                continue
+            if self.min is None or value < self.min: self.min = value
+            if self.max is None or value > self.max: self.max = value
+            self.hll.add(value)
+            if self.type == "varchar":
+                value = value[:ColumnStatistics.VARCHAR_PREFIX]
+            self.seen += 1
+            if len(self.sample) < ColumnStatistics.SAMPLE_SIZE:
+                self.sample.append(value)
+            else:  # replace a random sample value with probability SAMPLE_SIZE / seen
+                i = rand.randrange(self.seen)
+                if i < ColumnStatistics.SAMPLE_SIZE:
+                    self.sample[i] = value
+        self.histogram = self.equi_depth_histogram()
+
+    def equi_depth_histogram(self):
+        values = sorted(self.sample)
+        if not values:
+            return []
+        return [values[round(i * (len(values) - 1) / ColumnStatistics.NUM_BUCKETS)]
+                for i in range(ColumnStatistics.NUM_BUCKETS + 1)]
+
+    def distinct(self):
+        return min(self.hll.estimate(), self.count - self.nulls)
+
+    def fraction_below(self, constant):
+        """Returns the estimated fraction of non-NULL values smaller than `constant` (by the histogram).
+        Within a bucket, numeric values are assumed to be uniformly distributed.
+        """
+        bounds = self.histogram
+        if constant <= bounds[0]:
+            return 0.0
+        if constant > bounds[-1]:
+            return 1.0
+        buckets = len(bounds) - 1
+        for i in range(buckets):
+            low, high = bounds[i], bounds[i+1]
+            if constant <= high:
+                if self.type == "varchar" or high == low:
+                    within = 0.5
+                else:
+                    within = (constant - low) / (high - low)
+                return (i + within) / buckets
+        return 1.0
+
+    def selectivity(self, operator, constant):
+        """Returns the estimated fraction of the records that meet the condition `operator` `constant`,
+        or None if it can't be estimated (e.g. the constant is of a different type).
+        """
+        if not self.count:
+            return 0.0
+        non_null = (self.count - self.nulls) / self.count
+        if operator == "is":
+            return self.nulls / self.count
+        if operator == "is not":
+            return non_null
+        if self.min is None:  # NULL values only - no value meets a comparison
+            return 0.0
+        try:
+            distinct = max(self.distinct(), 1)
+            if operator == "=":
+                return 0.0 if constant < self.min or constant > self.max else non_null / distinct
+            if operator == "<>":
+                return non_null * (1 - 1 / distinct)
+            below = self.fraction_below(constant)
+            if operator in ("<", "<="):
+                fraction = below + (1 / distinct if operator == "<=" else 0)
+            else:  # ">", ">="
+                fraction = 1 - below - (1 / distinct if operator == ">" else 0)
+            return non_null * min(max(fraction, 0.0), 1.0)
+        except TypeError:  # constant can't be compared with the values
+            return None
+
+    def excludes(self, operator, constant):
+        """Returns True iff no record can meet the condition `operator` `constant`,
+        by the exact min, max and NULL count.
+        """
+        if operator == "is":
+            return self.nulls == 0
+        if operator == "is not":
+            return self.nulls == self.count
+        if self.min is None:  # NULL values only
+            return True
+        try:
+            return {"=": constant < self.min or constant > self.max,
+                    "<": self.min >= constant, "<=": self.min > constant,
+                    ">": self.max <= constant, ">=": self.max < constant,
+                    "<>": self.min == self.max == constant}.get(operator, False)
+        except TypeError:
+            return False
+
+    def to_json(self):
+        return {"type": self.type, "count": self.count, "nulls": self.nulls, "min": self.min, "max": self.max,
+                "distinct": self.distinct(), "hll": self.hll.to_json(), "seen": self.seen,
+                "histogram": self.histogram, "sample": self.sample}
+
+    @staticmethod
+    def from_json(data):
+        stats = ColumnStatistics(data["type"])
+        stats.count, stats.nulls, stats.seen = data["count"], data["nulls"], data["seen"]
+        stats.min, stats.max = data["min"], data["max"]
+        stats.hll = HyperLogLog.from_json(data["hll"])
+        stats.sample, stats.histogram = data["sample"], data["histogram"]
+        return stats
+
+
+class TableStatistics:
+    """Statistics of a table, collected by the ANALYZE command and stored in the file
+    'table.stats' of the table directory. `rows` is the number of rows they cover: a LOAD into
+    an analyzed table adds the loaded rows to the statistics (see `update`).
+    The statistics are used by the planner to estimate the number of rows meeting a condition
+    (e.g. to choose the build side of a hash join) and to skip scans that can't return rows.
+    """
+
+    FILENAME = "table.stats"
+
+    def __init__(self):
+        self.rows = 0
+        self.segments = {}  # maps a segment of the table (see `Table.segments`) to the number of its rows covered
+        self.rewrites = {}  # maps a segment to its rewrite count when its rows were covered (see `Table.finish_compaction`)
+        self.columns = {}  # maps a field to its ColumnStatistics
+
+    @staticmethod
+    def path(table_name):
+        return os.path.join(table_name, TableStatistics.FILENAME)
+
+    @staticmethod
+    def load(table_name):
+        """Returns the statistics of table `table_name`, or None if it wasn't analyzed.
+        """
+        try:
+            with open(TableStatistics.path(table_name)) as stats_file:
+                data = json.load(stats_file)
+        except FileNotFoundError:
+            return None
+        stats = TableStatistics()
+        stats.rows = data["rows"]
+        stats.segments = data.get("segments", {table_name: data["rows"]})
+        stats.rewrites = data.get("rewrites", {})
+        stats.columns = {field: ColumnStatistics.from_json(column) for field, column in data["columns"].items()}
+        return stats
+
+    def save(self, table_name):
+        """Writes the statistics to the table directory (atomically, like table.json).
+        """
+        path = TableStatistics.path(table_name)
+        with open(path + ".tmp", 'w') as stats_file:
+            json.dump({"rows": self.rows, "segments": self.segments, "rewrites": self.rewrites, "columns": {field: column.to_json() for field, column in self.columns.items()}},
+                      stats_file)
+        os.replace(path + ".tmp", path)
+
+    def update(self, table):
+        """Adds the rows of `table` that aren't covered by the statistics to the statistics, reading only
+        those rows: rows `segments[segment]`..num_rows-1 of each segment (the table, or each of its partitions).
+        A segment rewritten since (by a compaction - e.g. of an UPDATE, which may also append as many rows as it
+        removed) or dropped makes the statistics be collected from scratch.
+        """
+        segments = {segment.name: segment for segment in table.segments()}
+        if any(name not in segments or rows > segments[name].num_rows or self.rewrites.get(name, 0) != segments[name].rewrites
+               for name, rows in self.segments.items()):
+            # the rows were rewritten (or a partition was dropped) since - collect the statistics from scratch
+            self.rows, self.segments, self.rewrites, self.columns = 0, {}, {}, {}
+        for name, segment in segments.items():
+            start = self.segments.get(name, 0)
+            for column in segment.columns:
+                column_stats = self.columns.setdefault(column.field, ColumnStatistics(column.type))
+                column.open(rows=segment.num_rows, start=start)
+                try:
+                    column_stats.add_values(column)
+                finally:
+                    column.close()
+            self.segments[name] = segment.num_rows
+            self.rewrites[name] = segment.rewrites
+        self.rows = table.num_rows
+
+    def estimate_rows(self, condition, field, num_rows):
+        """Returns the estimated number of the `num_rows` rows of the table meeting `condition` on
+        field `field`, or None if it can't be estimated.
+        """
+        column_stats = self.columns.get(field)
+        if column_stats is None:
+            return None
+        selectivity = column_stats.selectivity(condition.operator, condition.constant)
+        return None if selectivity is None else round(selectivity * num_rows)
@@ -1,14 +1,25 @@
 from Column import Column
 from Errors import *
-from SqlParser import NodeCreate, NodeDrop, NodeLoad, NodeSelect
+from SqlParser import NodeCreate, NodeDrop, NodeLoad, NodeSelect, NodeExplain, NodeAnalyze, NodeShowStats, \
+                      NodeShowPartitions, NodeDropPartition, NodeDelete, NodeUpdate, NodeVacuum, \
+                      NodeExport, NodeImport
 from Printer import Printer
 from ArgumentClauses import CreateField
+from Catalog import Catalog
+from Lock import TableLock
+from Plan import PlanNode
+from Compiler import RowCompiler
+from Infile import Infile, Rejects
+from Partition import Partition
+from Metrics import Metrics
+from BlockCache import BlockCache
 
 import os
 import json 
-import csv
 import struct
-import random
+import itertools
+import contextlib
+import time
 
 
 class Table:
@@ -22,13 +33,21 @@ class Table:
             `table_name` is searched in table_dict in order to perform the command on it.
             If `table_name` isn't in `table_dict` then a Table instance for `table_name` is
             created and added to `table_dict`.
-            Obviously, table_dict is empty at the start of each session, but loading tables
-            into it is not expensive enough for us to save it to a file.
+            Obviously, table_dict is empty at the start of each session, but the metadata
+            of the tables is cached by the `Catalog` (optionally in a file), therefore loading
+            tables into it doesn't rescan the table directories.
     """
     # Static dictionaries:
     
     table_dict = {}
     verbose = False
+    SAMPLE_BLOCK_ROWS = 1024  # number of rows in a block of TABLESAMPLE SYSTEM (8 KiB of a numeric column)
+    BATCH_ROWS = 1024  # number of rows buffered by UPDATE and written at a time by compaction
+    LOAD_BATCH_ROWS = 4096  # number of rows LOAD converts and writes to the column files at a time
+    TOP_ROWS = 10000  # ORDER BY with a LIMIT (and offset) of at most as many rows keeps just them, in a heap
+    VACUUM_THRESHOLD = 0.25  # DELETE and UPDATE compact the segments with a larger fraction of deleted rows
+    COMPACTION_MARKER = "compaction.tmp"  # written to a segment directory to commit its compaction (see `compact_segment`)
+    VIEW_STATE_FILENAME = "view.state"  # the aggregate states of the groups of a materialized view (see `refresh_view`)
 
     TYPE_TO_FORMAT = {
         "int": 'q',
@@ -43,69 +62,150 @@ class Table:
 
     def __init__(self, table_name):
         Table.table_dict[table_name] = self
-        if Table.table_exists(table_name):
-            jsonfile = open(os.path.join(table_name, "table.json"), 'r')
-            jsondata = json.load(jsonfile)
-            jsonfile.close()
-            # The following are python variables representation of the data in 'table.json'
-            self.name = jsondata["name"]
-            self.num_cols = jsondata["cols"]
-            self.num_rows = jsondata["rows"]
-            self.columns = [Column(self, column["field"], column["type"], i)
-                         for i, column in enumerate(jsondata["schema"])]
-            self.printer = Printer(self.columns)  # for printing SELECT output to the console
-            self.column_dict = {column.field : column for column in self.columns}
-            
+        self.name = table_name
+        self.statistics = None  # TableStatistics of the table, loaded on use (see `get_statistics`)
+        self.statistics_signature = None
+        self.created = 0  # creation time of the table (ns), identifies its files in the `BlockCache`
+        self.partitioning = None  # {"method", "field", "interval"} of a partitioned table (see PartitionClause)
+        self.partitions = []  # Partition instances of a partitioned table
+        self.next_partition = 0  # number of the id of the next partition created
+        self.deleted = 0  # number of deleted rows (see `DeletionBitmap`)
+        self.bitmap = 0  # version of the deletion bitmap (0 - no deleted rows)
+        self.rewrites = 0  # number of times the column files were rewritten (see `finish_compaction`)
+        self.view = None  # {"base", "query", "segments"} of a materialized view (see `refresh_view`)
+        self.views = []  # names of the materialized views of the table
+        self.metadata = Catalog.lookup(table_name)
+        if self.metadata is not None:
+            self.load_metadata(self.metadata)
+
+    def load_metadata(self, jsondata):
+        """Sets the python variables representation of the data in 'table.json' (`jsondata`).
+        """
+        self.metadata = jsondata
+        self.name = jsondata["name"]
+        self.num_cols = jsondata["cols"]
+        self.num_rows = jsondata["rows"]
+        self.created = jsondata.get("created", 0)  # (tables created before it was recorded - 0)
+        self.partitioning = jsondata.get("partitioning")
+        self.columns = [Column(self, column["field"], column["type"], i)
+                     for i, column in enumerate(jsondata["schema"])]
+        self.column_dict = {column.field : column for column in self.columns}
+        self.partitions = [Partition(self, partition) for partition in jsondata.get("partitions", [])]
+        self.next_partition = jsondata.get("next_partition", 0)
+        self.deleted = jsondata.get("deleted", 0)
+        self.bitmap = jsondata.get("bitmap", 0)
+        self.rewrites = jsondata.get("rewrites", 0)
+        self.view = jsondata.get("view")
+        self.views = jsondata.get("views", [])
+
+    def refresh(self):
+        """Reloads the table metadata if 'table.json' was changed since it was loaded
+        (e.g. by another csvdb process).
+        """
+        jsondata = Catalog.lookup(self.name)
+        if jsondata is not None and jsondata is not self.metadata:
+            self.load_metadata(jsondata)
 
     @staticmethod
     def verbose_on():
         Table.verbose = True
 
     @staticmethod
-    def execute_command(node):
-        # Get `Table` instance:
-        table = Table.table_dict.get(node.table_name)
+    def get_table(table_name):
+        """Returns the `Table` instance of table `table_name` from `table_dict` (creates it if needed).
+        """
+        table = Table.table_dict.get(table_name)
         if table is None:
-            table = Table(node.table_name)
+            table = Table(table_name)
+        else:
+            table.refresh()
+        return table
+
+    @staticmethod
+    def execute_command(node, printer=None, raise_errors=False):
+        """Executes the command of syntax-tree-node `node`.
+        The output of a SELECT command is printed by `printer` if supplied (e.g. a `BatchPrinter`),
+        otherwise it is printed to the console by a `Printer`.
+        Errors are printed, or raised if `raise_errors` is True (e.g. by a `Connection`).
+        """
+        if isinstance(node, NodeShowStats):  # the only command that isn't executed on a table
+            Metrics.show()
+            return
+        statement = Metrics.start(node)
+        # Get `Table` instance:
+        table = Table.get_table(node.table_name)
         try:
             if isinstance(node, NodeSelect):  # Select node
-                return table.Select(node)
+                return table.Select(node, printer)
             elif isinstance(node, NodeLoad):  # Load node
                 table.Load(node)    
             elif isinstance(node, NodeCreate):  # Create node
                 table.Create(node)
             elif isinstance(node, NodeDrop):  # Drop node
                 table.Drop(node)        
+            elif isinstance(node, NodeExplain):  # Explain node
+                table.Explain(node)
+            elif isinstance(node, NodeAnalyze):  # Analyze node
+                table.Analyze(node)
+            elif isinstance(node, NodeDropPartition):  # Alter node
+                table.DropPartition(node)
+            elif isinstance(node, NodeShowPartitions):  # Show partitions node
+                table.ShowPartitions(node)
+            elif isinstance(node, NodeDelete):  # Delete node
+                table.Delete(node)
+            elif isinstance(node, NodeUpdate):  # Update node
+                table.Update(node)
+            elif isinstance(node, NodeVacuum):  # Vacuum node
+                table.Vacuum(node)
+            elif isinstance(node, NodeExport):  # Export node
+                table.Export(node)
+            elif isinstance(node, NodeImport):  # Import node
+                table.Import(node)
         except CSVDBException as e:
-            print(e)
+            if not raise_errors:
+                print(e)
+            elif not isinstance(e, SoftError):  # (IF [NOT] EXISTS with nothing to do isn't an error)
+                raise
+        finally:
+            Catalog.save()
+            Metrics.finish(statement)
 
     @staticmethod
     def table_exists(table_name):
         """Checks if 'table_name' is a table in the current working directory.
-        First checks if 'table_name' is a directory, then checks if it's contents
-        match the schema of a table directory (mandatory 'table.json', all other files are .col or .pointers)
-        """
-        if os.path.isdir(table_name):
-            json_file_exists = False
-            for f in os.listdir(table_name):
-                name, ext = os.path.splitext(f)
-                if f == "table.json": json_file_exists = True
-                elif ext != ".col" and ext != ".pointers":
-                    return False
-            if json_file_exists:
-                return True
-        return False
+        The check is done by the `Catalog`, which only rescans the table directory
+        if its contents changed since it was last scanned.
+        """
+        return Catalog.table_exists(table_name)
 
     @staticmethod
     def file_exists(filename):
         return os.path.isfile(filename)
 
 
+    def column_paths(self):
+        """Returns the paths of all the column files of the table (of all its partitions if it's partitioned).
+        """
+        return [path for segment in self.segments() for path in Table.segment_column_paths(segment)]
+
+    @staticmethod
+    def segment_column_paths(segment):
+        return [path for column in segment.columns
+                for path in ([column.col_path, column.pointers_path] if column.type == "varchar" else [column.col_path])]
+
+    def segments(self):
+        """Returns the segments of the table - the units of storage that have column files and a committed
+        row count: the partitions of a partitioned table (in order), otherwise the table itself.
+        The rows of the table are the rows of its segments, in order.
+        """
+        return self.partitions if self.partitioning else [self]
+
     def update_json(self):
         jsondata = {
             "name": self.name,
             "rows": self.num_rows,
             "cols": self.num_cols,
+            "created": self.created,
             "schema": [
                 {  # VARCHAR column data
                     'field': column.field,
@@ -120,9 +220,27 @@ class Table:
                 } for column in self.columns 
             ]
         }
-        json_file = open(os.path.join(self.name, "table.json"), 'w')
+        if self.partitioning:
+            jsondata["partitioning"] = self.partitioning
+            jsondata["partitions"] = [partition.to_json() for partition in self.partitions]
+            jsondata["next_partition"] = self.next_partition
+        elif self.bitmap:
+            jsondata["deleted"], jsondata["bitmap"] = self.deleted, self.bitmap
+        if self.rewrites:
+            jsondata["rewrites"] = self.rewrites
+        if self.view:
+            jsondata["view"] = self.view
+        if self.views:
+            jsondata["views"] = self.views
+        # Write to a temporary file and replace 'table.json' with it atomically, so concurrent
+        # readers see either the old or the new version but never a partially written one:
+        json_path = os.path.join(self.name, "table.json")
+        json_file = open(json_path + ".tmp", 'w')
         json.dump(jsondata,json_file, sort_keys=True, indent=2, separators=(',', ': '))
         json_file.close()
+        os.replace(json_path + ".tmp", json_path)
+        Catalog.update(self.name, jsondata)
+        self.metadata = jsondata
 
 
 
@@ -139,21 +257,44 @@ class Table:
             return
         if os.path.isdir(node.table_name):
             raise DirectoryAlreadyExistsError(node.table_name)
+        if node.partitioning:
+            partitioning = node.partitioning
+            types = {field.identifier: field.type for field in node.schema}
+            if partitioning.field_name not in types:
+                raise InvalidPartitioningError(partitioning.method, partitioning.field_name)
+            if partitioning.method == "range" and types[partitioning.field_name] == "varchar":
+                raise InvalidPartitioningError(partitioning.method, partitioning.field_name, "varchar")
+        if node.view_query is not None:
+            self.assert_view(node.select_command)
+
+    def assert_view(self, select_command):
+        """Raises an error if SELECT command `select_command` can't be the query of a materialized view,
+        whose rows are computed incrementally (see `refresh_view`).
+        """
+        if not Table.table_exists(select_command.table_name):
+            raise TableNotExistsError(select_command.table_name)
+        base = Table.get_table(select_command.table_name)
+        if base.view:
+            raise UnsupportedCommandError("A materialized view of a materialized view")
+        if not Table.is_aggregation(select_command):
+            raise UnsupportedCommandError("A materialized view without aggregate functions or GROUP BY")
+        for clause, feature in [(select_command.join, "JOIN"), (select_command.sample, "TABLESAMPLE"),
+                                (select_command.outfile_name, "INTO OUTFILE"), (select_command.distinct, "SELECT DISTINCT"),
+                                (select_command.order_fields, "ORDER BY"),
+                                (select_command.limit is not None or select_command.offset, "LIMIT"),
+                                (any(field.distinct for field in select_command.expression_list), "COUNT(DISTINCT)")]:
+            if clause:
+                raise UnsupportedCommandError(f"{feature} in a materialized view")
+        base.select_aggregation(select_command)  # the fields and aggregate functions are valid
 
     def create_as_select_get_schema(self, node):
         select_command = node.select_command
-        schema = []
-        table = Table(select_command.table_name)
-        
-        if not select_command.expression_list:
-            for column in table.columns:
-                schema.append(CreateField(column.field, column.type))
-        else:
-            for field in select_command.expression_list:
-                for column in table.columns:
-                    if field.name == column.field:
-                        schema.append(CreateField(field.identifier, column.type))
-        return schema
+        table = Table.get_table(select_command.table_name)
+        if not Table.table_exists(select_command.table_name):
+            raise TableNotExistsError(select_command.table_name)
+        # Qualified output fields of a join ("table.field") become "table_field":
+        return [CreateField(field.identifier.replace(".", "_"), field.type)
+                for field in table.output_fields(select_command)]
 
     def create_as_select(self, node):
         select_command = node.select_command
@@ -167,6 +308,82 @@ class Table:
         if temp:
             os.remove(select_command.outfile_name)
 
+    def create_view(self):
+        """Registers the materialized view in its base table, and computes its rows (see `refresh_view`).
+        """
+        base = Table.get_table(self.view["base"])
+        with TableLock(base.name, "write"):  # no LOAD into the base table runs meanwhile
+            base.refresh()
+            base.views.append(self.name)
+            base.update_json()
+            self.refresh_view()
+
+    def refresh_view(self, full=False):
+        """Brings the materialized view up to date with its base table (the caller holds its write lock).
+        The view keeps the states of the aggregates of its groups (in VIEW_STATE_FILENAME) and the number of rows
+        of each segment of the base table added to them ("segments"), so only the rows appended since (by LOAD)
+        are read and added to the states of their groups; then the rows of the view are written again.
+        If `full` is True, or rows of the base table were removed since (DROP PARTITION, compaction), the view
+        is computed from scratch. The files of the view are replaced like by a compaction (see `commit_rewrite`).
+        """
+        import pickle
+        from SqlParser import SqlParser
+        base = Table.get_table(self.view["base"])
+        select_command = SqlParser(self.view["query"] + ";").parse_single_command()
+        aggregation = base.select_aggregation(select_command)
+        if not aggregation.input:  # COUNT(*) only - scan a column to count the rows
+            aggregation.input_position(base, base.columns[0])
+        columns = [column for identifier, table, column in aggregation.input]
+        condition = select_command.row_condition
+        if condition:  # (the condition field is read after the input fields, unless it's one of them)
+            condition_column = Table.resolve_field(condition.field_name, [base])[1]
+            if condition_column not in columns: columns.append(condition_column)
+            null = Column.TYPE_TO_NULL.get(condition_column.type)
+        state_path = os.path.join(self.name, Table.VIEW_STATE_FILENAME)
+        with TableLock(self.name, "drop"):  # the files of the view are replaced - wait for its readers
+            self.refresh()
+            self.finish_compactions()
+            segments = {segment.name: segment.num_rows for segment in base.segments()}
+            starts = self.view["segments"]
+            groups = {}
+            if full or any(name not in segments or rows > segments[name] for name, rows in starts.items()):
+                starts = {}
+            elif os.path.exists(state_path):
+                with open(state_path, 'rb') as state_file:
+                    groups = pickle.load(state_file)
+            rows = base.scan_rows(columns, starts=starts)
+            if condition:
+                rows = RowCompiler.filter(condition, columns.index(condition_column), null)(rows)
+            groups = aggregation.accumulate(rows, groups)
+            output = list(aggregation.output(groups))
+            for column in self.columns:
+                values = (row[column.index] for row in output)
+                if column.type == "varchar":  # (MIN | MAX of no values)
+                    values = ("" if value is None else value for value in values)
+                Table.write_new_column(column, values)
+            with open(state_path + ".tmp", 'wb') as state_file:
+                pickle.dump(groups, state_file, pickle.HIGHEST_PROTOCOL)
+                state_file.flush()
+                os.fsync(state_file.fileno())
+            self.commit_rewrite(self, {"rows": len(output), "view": dict(self.view, segments=segments)})
+            if self.get_statistics() is not None:  # the rows were rewritten - collect the statistics again
+                from Statistics import TableStatistics
+                statistics = TableStatistics()
+                statistics.update(self)
+                statistics.save(self.name)
+        if Table.verbose:
+            folded = sum(rows - starts.get(name, 0) for name, rows in segments.items())
+            print(f"Verbose: Materialized view {self.name} refreshed ({folded} rows of table {base.name} read).\n")
+
+    def refresh_views(self, full=False):
+        """Refreshes the materialized views of the table (see `refresh_view`). The caller holds its write lock.
+        """
+        for name in self.views:
+            if Table.table_exists(name):
+                view = Table.get_table(name)
+                if view.view and view.view["base"] == self.name:
+                    view.refresh_view(full)
+
     def Create(self, node):
         self.assert_create(node)  # assure pre-conditions are met
 
@@ -179,13 +396,24 @@ class Table:
         self.name = node.table_name
         self.num_rows = 0
         self.num_cols = len(node.schema)
+        self.created = time.time_ns()
+        self.partitioning = None
+        self.deleted, self.bitmap, self.rewrites = 0, 0, 0
+        self.view, self.views = None, []
+        if node.partitioning:  # the rows are stored in partitions, created by LOAD
+            self.partitioning = {"method": node.partitioning.method, "field": node.partitioning.field_name,
+                                 "interval": node.partitioning.interval}
+            self.partitions, self.next_partition = [], 0
+        if node.view_query is not None:  # materialized view
+            self.view = {"base": node.select_command.table_name, "query": node.view_query, "segments": {}}
         self.columns = [Column(self, column.identifier, column.type, i) for i,column in enumerate(node.schema)]
         self.update_json()
-        self.printer = Printer(self.columns)
         self.column_dict = {column.field : column for column in self.columns}
 
         # CREATE AS SELECT - get schema
-        if node.select_command is not None:
+        if node.view_query is not None:
+            self.create_view()
+        elif node.select_command is not None:
             self.create_as_select(node)
             
 
@@ -205,95 +433,708 @@ class Table:
 
     def Drop(self, node):
         self.assert_drop(node)  # assure pre-conditions are met               
+        if self.view and Table.table_exists(self.view["base"]):  # unregister the materialized view
+            base = Table.get_table(self.view["base"])
+            with TableLock(base.name, "write"):
+                base.refresh()
+                if self.name in base.views:
+                    base.views.remove(self.name)
+                    base.update_json()
 
-        # Remove the table directory and all its contents:
-        for f in os.listdir(node.table_name):
-            os.remove(os.path.join(node.table_name, f))
-        os.rmdir(node.table_name)
+        # Remove the table directory and all its contents, including partition directories
+        # (after all readers and writers finished):
+        with TableLock(node.table_name, "drop"):
+            paths = Table.remove_directory(node.table_name)
+        BlockCache.invalidate(paths)
+        Catalog.remove(node.table_name)
+        self.metadata = None
 
 
 
-    def load_varchar(self, column, record):
-        """Loads a varchar value `record` into file `colfile` and updates file `pointerfile` accordingly.
-        Pointers are of type 64 bit unsigned int therefore packed by format 'Q'
+    @staticmethod
+    def remove_directory(directory):
+        """Removes directory `directory` with its files and sub-directories. Returns the paths of the removed files.
         """
-        column.colfile.write(record)
-        column.pointersfile.write(struct.pack("Q",column.colfile.tell()))
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(directory, topdown=False):
+            for f in filenames:
+                paths.append(os.path.join(dirpath, f))
+                os.remove(paths[-1])
+            os.rmdir(dirpath)
+        return paths
 
-    def load_numeric(self, column, record, format):
-        """Loads a numeric value `record` into file `colfile` in the format `format`.
-        Possible `format` values:
-            'q' -- INT
-            'd' -- FLOAT
-            'Q' -- TIMESTAMP
+    def assert_drop_partition(self, node):
+        """Raises an error if the pre-conditions to the ALTER TABLE ... DROP PARTITION command aren't met by the node arguments.
         """
-        if not record:  # NULL value
-            record_val = Table.TYPE_TO_NULL[column.type]
-        elif format == "d":
-            record_val = float(record)
-        else:
-            record_val = int(record)
-        column.colfile.write(struct.pack(format, record_val))
+        if not Table.table_exists(node.table_name):
+            raise TableNotExistsError(node.table_name)
+        if not self.partitioning:
+            raise UnsupportedCommandError(f"DROP PARTITION of table {node.table_name}, which isn't partitioned,")
+
+    def DropPartition(self, node):
+        """Removes a partition of the table with its rows: commits the table without it, then removes
+        the partition directory (after all readers finished, like DROP) - no other rows are rewritten.
+        """
+        self.assert_drop_partition(node)  # assure pre-conditions are met
+        with TableLock(self.name, "drop"):
+            self.refresh()
+            partition = next((partition for partition in self.partitions if partition.id == node.partition_name), None)
+            if partition is None:
+                raise PartitionNotExistsError(self.name, node.partition_name)
+            self.partitions = [other for other in self.partitions if other is not partition]
+            self.num_rows -= partition.num_rows
+            self.update_json()
+            paths = Table.remove_directory(partition.name)
+            self.refresh_views()  # (computed from scratch, without the rows of the partition)
+        BlockCache.invalidate(paths)
+        if Table.verbose:
+            print(f"Verbose: Partition {partition.id} ({partition.describe()}, {partition.num_rows} rows) "
+                  f"of table {self.name} dropped.\n")
+
+    def ShowPartitions(self, node):
+        """Prints the partitions of the table, with their values and committed row counts.
+        """
+        if not Table.table_exists(node.table_name):
+            raise TableNotExistsError(node.table_name)
+        self.refresh()
+        if not self.partitioning:
+            print(f"Table {self.name} isn't partitioned ({self.num_rows} rows)\n")
+            return
+        interval = f" INTERVAL {self.partitioning['interval']}" if self.partitioning["method"] == "range" else ""
+        print(f"Table {self.name}: PARTITION BY {self.partitioning['method'].upper()} ({self.partitioning['field']}){interval}, "
+              f"{len(self.partitions)} partitions, {self.num_rows} rows")
+        for partition in self.partitions:
+            print(f"  {partition.id}: {partition.describe()} - {partition.num_rows} rows")
+        print()
 
-    def load_record(self, column, record):
-        """Loads a record `record` into column `column`
-        """ 
+    @staticmethod
+    def encode_records(column, records):
+        """Returns the records `records` (strings, as in a CSV file - "" is NULL) of column `column` (opened for
+        loading) encoded as they are appended to its files: (the data of the column file, the data of the .pointers
+        file (None for a numeric column)). The records are converted for the type of the column a batch at a time:
+        numeric records by a single comprehension (int / float, NULL - the NULL value of the type) and a single pack,
+        VARCHAR records are encoded (with no-break spaces replaced by spaces) and their pointers computed by a running
+        sum of their lengths from the end of the column file.
+        Raises ValueError (or struct.error for an integer out of the range of the type) for an invalid record.
+        """
         if column.type == "varchar":
-            self.load_varchar(column, record)
-        else:  # numeric column (INT | FLOAT | TIMESTAMP)
-            self.load_numeric(column, record, format=Table.TYPE_TO_FORMAT[column.type])
+            data = [record.replace('\xa0', ' ').encode("utf-8") for record in records]
+            pointers = list(itertools.accumulate([len(record) for record in data], initial=column.colfile.tell()))[1:]
+            return b"".join(data), struct.pack(f"{len(pointers)}Q", *pointers)
+        convert = float if column.type == "float" else int
+        if "" in records:  # NULL records
+            null = Table.TYPE_TO_NULL[column.type]
+            values = [convert(record) if record else null for record in records]
+        else:
+            values = list(map(convert, records))
+        return struct.pack(f"{len(values)}{Table.TYPE_TO_FORMAT[column.type]}", *values), None
+
+    @staticmethod
+    def invalid_row(columns, row):
+        """Returns the reason the row `row` (a list of records, as in a CSV file) can't be loaded into
+        the columns `columns`, or None if it can (see `encode_records`). Only the records of the columns are checked
+        (see `load_batch`).
+        """
+        for column, record in zip(columns, row):
+            if column.type == "varchar" or not record:
+                continue
+            try:
+                Table.encode_records(column, [record])
+            except (ValueError, struct.error):
+                return f"invalid {column.type.upper()} value {record!r} of field {column.field}"
+        return None
+
+    @staticmethod
+    def load_batch(columns, batch, reject=None):
+        """Appends the rows `batch` (lists of records, as in a CSV file) to the column files of `columns`,
+        a column at a time (see `encode_records`). The records of a row are matched to the columns in order:
+        missing records of short rows are NULL, and extra records of long rows are ignored (as they always were).
+        The whole batch is converted before any of it is written, so a batch with an invalid row writes nothing:
+        its rows are then checked one at a time (see `invalid_row`), each invalid row is rejected by calling
+        `reject` with its index in `batch` and the reason, and the valid rows are loaded.
+        Without `reject`, an invalid record raises ValueError (or struct.error).
+        """
+        width = len(columns)
+        rows = batch
+        if min(map(len, batch)) < width:
+            rows = [row + [""] * (width - len(row)) if len(row) < width else row for row in batch]
+        try:
+            encoded = [Table.encode_records(column, records) for column, records in zip(columns, zip(*rows))]
+        except (ValueError, struct.error):
+            if reject is None:
+                raise
+            valid = []
+            for i, row in enumerate(batch):
+                reason = Table.invalid_row(columns, row)
+                if reason is None:
+                    valid.append(row)
+                else:
+                    reject(i, reason)
+            if valid:
+                Table.load_batch(columns, valid)
+            return len(valid)
+        for column, (data, pointers) in zip(columns, encoded):
+            column.colfile.write(data)
+            if pointers is not None:
+                column.pointersfile.write(pointers)
+        return len(batch)
 
     def assert_load(self, node):
         """Raises an error if the pre-conditions to the LOAD command aren't met by the node arguments. 
         """
-        if not Table.file_exists(node.infile_name):  # .csv file doesn't exist
+        if not Infile.exists(node.infile_name):  # .csv file doesn't exist (and isn't a pipe or the standard input)
             raise InfileNotExistsError(node.infile_name)
             return
         if not Table.table_exists(node.table_name):  # table to load into doesn't exist
             raise TableNotExistsError(node.table_name)
             return
+        if self.view:  # the rows of a materialized view are computed from its base table
+            raise UnsupportedCommandError("LOAD into a materialized view")
 
 
     def Load(self, node):
         self.assert_load(node)  # assure pre-conditions are met
+        with TableLock(self.name, "write"):
+            self.refresh()  # another process could have loaded rows before the lock was acquired
+            self.finish_compactions()
+            self.load_rows(node)
+            self.update_statistics()  # if the table was analyzed - add the loaded rows to its statistics
+            self.refresh_views()  # add the loaded rows to the materialized views of the table
 
+    def load_rows(self, node):
+        """Appends the rows of the infile to the column files, then commits them by updating
+        the `rows` field of the json data. Readers only read the committed rows.
+        The infile is read in a single streaming pass (see `Infile`).
+        Invalid rows are written to the reject file instead (see `Rejects`), and the valid rows are loaded,
+        unless more than MAX ERRORS rows are rejected - then no row is committed.
+        """
         # Both infile and table exist, continue:
-        # Count rows and update `rows` field of the json data:
-        infile = open(node.infile_name, 'r')
-        rows = sum(1 for line in infile)
-        self.num_rows += rows - node.ignore_lines
+        rejects = Rejects(node.infile_name, self.name, [column.field for column in self.columns], node.max_errors)
+        with Infile.open(node.infile_name) as infile, contextlib.closing(rejects):
+            batches = Infile.checked(Infile.batches(infile, node.ignore_lines, Table.LOAD_BATCH_ROWS), node.infile_name)
+            size_before = sum(os.path.getsize(path) for path in self.column_paths()) if Metrics.current is not None else 0
+            rows = self.append_batches(batches, rejects)
+        # Commit:
+        self.num_rows += rows
         self.update_json()
+        if rejects.count:
+            print(f"Load: {rejects.count} rows of csv infile {node.infile_name} were rejected (see {rejects.path}), "
+                  f"{rows} rows were loaded\n")
+        Metrics.add("rows_loaded", rows)
+        if rejects.count:
+            Metrics.add("rows_rejected", rejects.count)
+        Metrics.add("bytes_written", sum(os.path.getsize(path) for path in self.column_paths()) - size_before)
 
-        infile = open(node.infile_name, 'r')
+    def append_rows(self, rows):
+        """Appends `rows` (lists of records, as in a CSV file) to the column files, and returns their number.
+        The rows are uncommitted until the caller updates the json data (see `load_rows`).
+        """
+        batches = iter(lambda: list(itertools.islice(rows, Table.LOAD_BATCH_ROWS)), [])
+        return self.append_batches((None, batch) for batch in batches)
 
-        reader = csv.reader(infile)
-        # Skip `ignore_lines` lines from the top:
-        for _ in range(node.ignore_lines):
-            next(reader) 
-        
-        # Open all column files:
+    def append_batches(self, batches, rejects=None):
+        """Appends the rows of `batches` (pairs of (the line numbers of the rows in the infile, the list of the rows))
+        to the column files, and returns the number of rows appended (see `append_rows`).
+        Invalid rows are added to `rejects` (see `load_batch`); without it an invalid row raises an error.
+        """
+        if self.partitioning:
+            return self.load_partitioned_rows(batches, rejects)
+        # Open all column files, removing uncommitted records of a failed LOAD:
         for column in self.columns:
+            column.truncate(self.num_rows)
             column.open(mode="load")
 
-        # Start loading:
-        for row in reader:
-            for column, record in zip(self.columns, row):
-                record = record.replace('\xa0', ' ')
-                self.load_record(column, record)
+        # Start loading (a batch of rows at a time):
+        num_rows = 0
+        for line_numbers, batch in batches:
+            num_rows += Table.load_batch(self.columns, batch, rejects and rejects.rejecter(line_numbers, batch))
         # Finished loading - close all files:
-        for column in self.columns: 
+        for column in self.columns:
+            column.sync()
             column.close()
-        infile.close()
+        return num_rows
+
+    def partition_key(self, record):
+        """Returns the partition key of a row whose partition field record (in the infile) is `record`:
+        None for NULL, the lower bound of the range of the value for RANGE partitioning, the value for LIST.
+        """
+        column = self.column_dict[self.partitioning["field"]]
+        if column.type == "varchar":
+            return record
+        if not record:  # NULL value
+            return None
+        value = float(record) if column.type == "float" else int(record)
+        if self.partitioning["method"] == "list":
+            return value
+        interval = self.partitioning["interval"]
+        return value // interval * interval
+
+    def load_partitioned_rows(self, batches, rejects=None):
+        """Appends the rows of `batches` (see `append_batches`) to the column files of the partitions of their partition
+        field values, creating the partitions that don't exist yet. Returns the number of rows loaded.
+        Rows with an invalid partition field record are added to `rejects` (or raise ValueError without it).
+        The new row counts of the partitions (and the new partitions) are committed with the table's by the caller.
+        """
+        field_index = self.column_dict[self.partitioning["field"]].index
+        varchar_key = self.column_dict[self.partitioning["field"]].type == "varchar"
+        partitions = {partition.key(): partition for partition in self.partitions}
+        new_partitions = []
+        loaded = {}  # maps a partition loaded into to the number of rows loaded into it
+        for line_numbers, batch in batches:
+            partition_rows = {}  # maps a partition to the indexes of the rows of the batch routed to it
+            for i, row in enumerate(batch):
+                record = row[field_index] if field_index < len(row) else ""
+                try:
+                    key = self.partition_key(record.replace('\xa0', ' ') if varchar_key else record)
+                except ValueError:
+                    if rejects is None:
+                        raise
+                    rejects.add(line_numbers[i], Table.invalid_row(self.columns, row), row)
+                    continue
+                partition = partitions.get(key)
+                if partition is None:
+                    partition = partitions[key] = Partition.new(self, f"p{self.next_partition + len(new_partitions)}", key)
+                    new_partitions.append(partition)
+                partition_rows.setdefault(partition, []).append(i)
+            for partition, indexes in partition_rows.items():
+                if partition not in loaded:  # open its column files, removing uncommitted records of a failed LOAD
+                    for column in partition.columns:
+                        column.truncate(partition.num_rows)
+                        column.open(mode="load")
+                    loaded[partition] = 0
+                rows = [batch[i] for i in indexes]
+                reject = rejects and rejects.rejecter([line_numbers[i] for i in indexes], rows)
+                loaded[partition] += Table.load_batch(partition.columns, rows, reject)
+        # Finished loading - close all files:
+        for partition, rows in loaded.items():
+            for column in partition.columns:
+                column.sync()
+                column.close()
+            partition.num_rows += rows
+        # Partitions are kept ordered by their values (the NULL partition first):
+        self.partitions = sorted(self.partitions + new_partitions, key=lambda partition: (not partition.null, partition.key()))
+        self.next_partition += len(new_partitions)
+        return sum(loaded.values())
+
+    def assert_modify(self, node):
+        """Raises an error if the pre-conditions to the DELETE | UPDATE | VACUUM command aren't met by the node arguments.
+        """
+        if not Table.table_exists(node.table_name):  # table to modify doesn't exist
+            raise TableNotExistsError(node.table_name)
+        if self.view and not isinstance(node, NodeVacuum):
+            raise UnsupportedCommandError("DELETE | UPDATE of a materialized view")
+        condition = getattr(node, "row_condition", None)
+        if condition is not None:
+            Table.resolve_field(condition.field_name, [self])  # the condition field must exist
+        for field_name, constant in getattr(node, "assignments", []):
+            column = Table.resolve_field(field_name, [self])[1]
+            if constant is None:  # NULL
+                continue
+            if column.type == "varchar":
+                valid = isinstance(constant, str)
+            elif column.type == "float":
+                valid = isinstance(constant, (int, float))
+            else:  # INT | TIMESTAMP
+                valid = isinstance(constant, int)
+            if not valid:
+                raise InvalidValueError(field_name, column.type, constant)
+
+    def Delete(self, node):
+        """Deletes the rows meeting the WHERE condition (all the rows if there is none) by marking them in new
+        versions of the deletion bitmaps of their segments (see `DeletionBitmap`), committed with 'table.json'.
+        No column file is rewritten until the segment is compacted (see `commit_deletions`, `Vacuum`).
+        """
+        self.assert_modify(node)  # assure pre-conditions are met
+        with TableLock(self.name, "write") as lock:
+            self.refresh()
+            self.finish_compactions()
+            condition = node.row_condition
+            columns = [Table.resolve_field(condition.field_name, [self])[1]] if condition else self.columns[:1]
+            bitmaps = {}
+            deleted = sum(1 for _ in self.delete_rows(condition, columns, bitmaps))
+            if self.commit_deletions(bitmaps, lock):
+                self.update_statistics()
+            if deleted:
+                self.refresh_views(full=True)
+        Metrics.add("rows_deleted", deleted)
+        if Table.verbose:
+            print(f"Verbose: {deleted} rows deleted from table {self.name}.\n")
+
+    def Update(self, node):
+        """Updates the rows meeting the WHERE condition (all the rows if there is none): they are deleted
+        (see `Delete`) and appended again with the values of the SET assignments, in the same commit.
+        An updated row of a partitioned table moves to the partition of its new partition field value.
+        """
+        self.assert_modify(node)  # assure pre-conditions are met
+        from Spill import SpillFile
+        assignments = {}  # maps a column index to the record of its new value
+        for field_name, constant in node.assignments:
+            column = Table.resolve_field(field_name, [self])[1]
+            assignments[column.index] = Table.to_record(constant, column.type)
+        with TableLock(self.name, "write") as lock:
+            self.refresh()
+            self.finish_compactions()
+            bitmaps = {}
+            # The updated rows are buffered until the scan ends, since they are appended to the column files it reads:
+            updated = SpillFile()
+            try:
+                rows = self.delete_rows(node.row_condition, self.columns, bitmaps)
+                for batch in iter(lambda: list(itertools.islice(rows, Table.BATCH_ROWS)), []):
+                    updated.write([[assignments[column.index] if column.index in assignments else Table.to_record(value, column.type)
+                                    for value, column in zip(row, self.columns)] for row in batch])
+                self.num_rows += self.append_rows(updated.rows_iter())
+            finally:
+                updated.close()
+            self.commit_deletions(bitmaps, lock)
+            self.update_statistics()
+            if updated.rows:
+                self.refresh_views(full=True)
+        Metrics.add("rows_updated", updated.rows)
+        if Table.verbose:
+            print(f"Verbose: {updated.rows} rows updated in table {self.name}.\n")
+
+    @staticmethod
+    def to_record(value, _type):
+        """Returns the record (as in a CSV file - see `load_record`) of value `value` of a column of type `_type`.
+        `value` is None or the NULL value of the type for NULL.
+        """
+        if value is None:
+            return ""
+        if _type == "varchar":
+            return value
+        if value == Table.TYPE_TO_NULL[_type]:
+            return ""
+        return repr(float(value)) if _type == "float" else str(value)
+
+    def delete_rows(self, condition, columns, bitmaps):
+        """Marks the live rows meeting `condition` (all of them if None) deleted, and yields them (tuples of the
+        values of `columns`, which must include the condition field). `bitmaps` maps a segment to
+        [DeletionBitmap, number of rows deleted] - the bitmaps of the segments with deleted rows are added to it.
+        """
+        from Bitmap import DeletionBitmap
+        if condition:
+            condition_column = Table.resolve_field(condition.field_name, [self])[1]
+            condition_index = columns.index(condition_column)
+            null = Column.TYPE_TO_NULL.get(condition_column.type)
+        for segment in self.scan_segments(condition):
+            segment_columns = [segment.columns[column.index] for column in columns]
+            for column in segment_columns:
+                column.open(rows=segment.num_rows)
+            try:
+                rows = enumerate(zip(*segment_columns))
+                if segment.deleted:  # rows deleted before aren't deleted again
+                    rows = itertools.compress(rows, Table.live_mask(segment))
+                entry = None
+                for row_id, row in Metrics.count_rows(rows, "rows_scanned"):
+                    if condition is None or self.row_meets_condition(condition, row[condition_index], null):
+                        if entry is None:
+                            entry = bitmaps[segment] = [DeletionBitmap.load(segment), 0]
+                        entry[0].delete(row_id)
+                        entry[1] += 1
+                        yield row
+            finally:
+                for column in segment_columns: column.close()
+
+    def commit_deletions(self, bitmaps, lock):
+        """Commits the deletion bitmaps `bitmaps` (see `delete_rows`) - with the rows appended by an UPDATE -
+        by writing them to new version files and updating the json data.
+        Then the old versions are removed, and the segments with more than VACUUM_THRESHOLD of their rows deleted
+        are compacted, unless readers of older snapshots are reading the table (the write lock `lock` is held):
+        they are left for the next DELETE | UPDATE | VACUUM. Returns the list of the segments compacted.
+        """
+        for segment, (bitmap, deleted) in bitmaps.items():
+            segment.bitmap = bitmap.save(segment)
+            segment.deleted += deleted
+        self.update_json()
+        if not lock.try_exclude_readers():
+            return []
+        compacted = [segment for segment in self.segments() if segment.deleted > Table.VACUUM_THRESHOLD * segment.num_rows]
+        for segment in compacted:
+            self.compact_segment(segment)
+        for segment in self.segments():
+            Table.remove_old_bitmaps(segment)
+        return compacted
+
+    @staticmethod
+    def remove_old_bitmaps(segment):
+        """Removes the deletion bitmap files of `segment` other than the committed version.
+        """
+        from Bitmap import DeletionBitmap
+        current = os.path.basename(DeletionBitmap.path(segment, segment.bitmap))
+        for filename in os.listdir(segment.name):
+            if filename.startswith("deleted.") and filename.endswith(".bitmap") and filename != current:
+                os.remove(os.path.join(segment.name, filename))
+
+    def Vacuum(self, node):
+        """Compacts the segments of the table that have deleted rows (see `compact_segment`).
+        Unlike the compaction by DELETE | UPDATE, VACUUM waits for the readers of the table to finish.
+        """
+        self.assert_modify(node)  # assure pre-conditions are met
+        with TableLock(self.name, "drop"):
+            self.refresh()
+            self.finish_compactions()
+            compacted = [segment for segment in self.segments() if segment.deleted]
+            deleted = sum(segment.deleted for segment in compacted)
+            for segment in compacted:
+                self.compact_segment(segment)
+            for segment in self.segments():
+                Table.remove_old_bitmaps(segment)
+            if compacted:
+                self.update_statistics()
+                self.refresh_views()  # (computed from scratch, since the rows were rewritten)
+        if Table.verbose:
+            print(f"Verbose: Table {self.name} vacuumed ({deleted} deleted rows removed).\n")
+
+    def compact_segment(self, segment):
+        """Rewrites the column files of `segment` without its deleted rows. Readers must be excluded.
+        The new files are written next to the old ones (with the extension '.tmp') and synced, then the compaction
+        is committed by writing COMPACTION_MARKER with the new row count, and finished by `finish_compaction`.
+        A crash before the marker is written leaves the segment unchanged, and a crash after it is recovered
+        by the next writer (see `finish_compactions`).
+        """
+        mask = Table.live_mask(segment)
+        for column in segment.columns:
+            column.open(rows=segment.num_rows)
+            try:
+                Table.write_new_column(column, itertools.compress(column, mask))
+            finally:
+                column.close()
+        self.commit_rewrite(segment, {"rows": segment.num_rows - segment.deleted})
+
+    def commit_rewrite(self, segment, marker):
+        """Commits the rewrite of the files of `segment` (see `rewritten_paths`), whose new versions were written
+        to '.tmp' files, by writing COMPACTION_MARKER with the json data `marker`: the new row count ("rows"),
+        and the new metadata of a materialized view ("view" - see `refresh_view`). Then finishes it.
+        """
+        with open(os.path.join(segment.name, Table.COMPACTION_MARKER), 'w') as marker_file:
+            json.dump(marker, marker_file)
+            marker_file.flush()
+            os.fsync(marker_file.fileno())
+        self.finish_compaction(segment)
+
+    def rewritten_paths(self, segment):
+        """Returns the paths of the files of `segment` replaced by a compaction: its column files,
+        and the aggregate states of a materialized view (see `refresh_view`).
+        """
+        paths = Table.segment_column_paths(segment)
+        if segment is self and self.view:
+            paths.append(os.path.join(self.name, Table.VIEW_STATE_FILENAME))
+        return paths
+
+    @staticmethod
+    def write_new_column(column, values):
+        """Writes the values `values` of column `column` to new column files (the column files + '.tmp').
+        """
+        if column.type == "varchar":
+            with open(column.col_path + ".tmp", 'wb') as colfile, open(column.pointers_path + ".tmp", 'wb') as pointersfile:
+                offset = 0
+                for batch in iter(lambda: list(itertools.islice(values, Table.BATCH_ROWS)), []):
+                    data = [value.encode("utf-8") for value in batch]
+                    pointers = list(itertools.accumulate([len(record) for record in data], initial=offset))[1:]
+                    colfile.write(b"".join(data))
+                    pointersfile.write(struct.pack(f"{len(pointers)}Q", *pointers))
+                    offset = pointers[-1]
+                for file in (colfile, pointersfile):
+                    file.flush()
+                    os.fsync(file.fileno())
+            return
+        format = Table.TYPE_TO_FORMAT[column.type]
+        with open(column.col_path + ".tmp", 'wb') as colfile:
+            for batch in iter(lambda: list(itertools.islice(values, Table.BATCH_ROWS)), []):
+                colfile.write(struct.pack(f"{len(batch)}{format}", *batch))
+            colfile.flush()
+            os.fsync(colfile.fileno())
+
+    def finish_compaction(self, segment):
+        """Finishes the compaction of `segment` committed by its COMPACTION_MARKER: replaces its column files with
+        the compacted ones, commits the new row count to the json data and removes the marker and the bitmaps.
+        The rewrite count of the segment is incremented, so statistics of its old rows are collected again
+        (see `TableStatistics.update`).
+        Every step can be repeated, so it may be interrupted by a crash and run again.
+        """
+        marker_path = os.path.join(segment.name, Table.COMPACTION_MARKER)
+        with open(marker_path) as marker_file:
+            marker = json.load(marker_file)
+        rows = marker["rows"]
+        if "view" in marker:
+            self.view = marker["view"]
+        paths = self.rewritten_paths(segment)
+        for path in paths:
+            if os.path.exists(path + ".tmp"):  # (not replaced before a crash)
+                os.replace(path + ".tmp", path)
+        segment.num_rows, segment.deleted, segment.bitmap = rows, 0, 0
+        segment.rewrites += 1
+        if self.partitioning:
+            self.num_rows = sum(partition.num_rows for partition in self.partitions)
+        self.update_json()
+        os.remove(marker_path)
+        Table.remove_old_bitmaps(segment)
+        BlockCache.invalidate(paths)
 
+    def finish_compactions(self):
+        """Finishes the compactions interrupted by a crash after they were committed (see `compact_segment`),
+        and removes the files of the compactions interrupted before. Called by the writers before writing.
+        """
+        for segment in self.segments():
+            if os.path.exists(os.path.join(segment.name, Table.COMPACTION_MARKER)):
+                self.finish_compaction(segment)
+                continue
+            for path in self.rewritten_paths(segment):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path + ".tmp")
+
+    def update_statistics(self):
+        """Updates the statistics of the table with its new rows (see `TableStatistics.update`), if it was analyzed.
+        """
+        statistics = self.get_statistics()
+        if statistics is not None:
+            statistics.update(self)
+            statistics.save(self.name)
+
+    def assert_export(self, node):
+        """Raises an error if the pre-conditions to the EXPORT command aren't met by the node arguments.
+        """
+        if not Table.table_exists(node.table_name):  # table to export doesn't exist
+            raise TableNotExistsError(node.table_name)
 
-    def row_meets_condition(self, node, row):
-        """Returns true iff the row meets the condition (WHERE clause).
+    def Export(self, node):
+        """Writes the committed rows of the table with its metadata to a single file (see `TableContainer`):
+        the committed records of every column file are copied as is, with the deletion bitmaps.
+        The export reads a snapshot of the table, like a SELECT.
+        """
+        self.assert_export(node)  # assure pre-conditions are met
+        from Container import TableContainer
+        with TableLock(self.name, "read"):
+            self.refresh()
+            files = []  # (path in the container, path, size) of the files of the table
+            for segment in self.segments():
+                for column in segment.columns:
+                    if column.type == "varchar":  # the records end where record `num_rows`-1 ends
+                        col_size = 0
+                        if segment.num_rows:
+                            with open(column.pointers_path, 'rb') as pointersfile:
+                                pointersfile.seek((segment.num_rows - 1) * 8)
+                                col_size = struct.unpack('Q', pointersfile.read(8))[0]
+                        files.append((column.col_path, col_size))
+                        files.append((column.pointers_path, segment.num_rows * 8))
+                    else:  # (INT | FLOAT | TIMESTAMP) column
+                        files.append((column.col_path, segment.num_rows * 8))
+                if segment.bitmap:
+                    from Bitmap import DeletionBitmap
+                    path = DeletionBitmap.path(segment, segment.bitmap)
+                    files.append((path, os.path.getsize(path)))
+            # (a materialized view is exported as a table, and the views of a table aren't exported)
+            metadata = {key: value for key, value in self.metadata.items() if key not in ("view", "views")}
+            size = TableContainer.write(node.outfile_name, metadata,
+                                        [(os.path.relpath(path, self.name), path, size) for path, size in files],
+                                        node.compressed)
+        Metrics.add("bytes_read", sum(size for path, size in files))
+        Metrics.add("bytes_written", size)
+        if Table.verbose:
+            print(f"Verbose: Table {self.name} ({self.num_rows} rows) exported to {node.outfile_name} ({size} bytes).\n")
+
+    def assert_import(self, node):
+        """Raises an error if the pre-conditions to the IMPORT command aren't met by the node arguments.
+        """
+        if not Table.file_exists(node.infile_name):  # container file doesn't exist
+            raise InfileNotExistsError(node.infile_name)
+        if Table.table_exists(node.table_name):
+            raise TableAlreadyExistsError(node.table_name)
+        if os.path.isdir(node.table_name):
+            raise DirectoryAlreadyExistsError(node.table_name)
+
+    def Import(self, node):
+        """Creates the table from a file written by EXPORT TABLE (see `TableContainer`): its files are copied
+        into a temporary directory with its 'table.json' (renamed to the new table), which is then renamed to
+        the table directory, so the table appears complete or not at all.
+        """
+        self.assert_import(node)  # assure pre-conditions are met
+        from Container import TableContainer
+        footer = TableContainer.read_footer(node.infile_name)
+        metadata = footer["table"]
+        metadata["name"] = self.name
+        metadata["created"] = time.time_ns()  # (new files - see `BlockCache`)
+        for column in metadata["schema"]:
+            column["col_path"] = os.path.join(self.name, column["field"]) + ".col"
+            if column["type"] == "varchar":
+                column["pointers_path"] = os.path.join(self.name, column["field"]) + ".pointers"
+        temp_directory = self.name + ".import.tmp"
+        if os.path.isdir(temp_directory):  # left by an import that didn't finish
+            Table.remove_directory(temp_directory)
+        os.mkdir(temp_directory)
+        try:
+            TableContainer.extract(node.infile_name, footer, temp_directory)
+            with open(os.path.join(temp_directory, "table.json"), 'w') as json_file:
+                json.dump(metadata, json_file, sort_keys=True, indent=2, separators=(',', ': '))
+            os.rename(temp_directory, self.name)
+        except BaseException:
+            Table.remove_directory(temp_directory)
+            raise
+        self.refresh()
+        Metrics.add("rows_loaded", self.num_rows)
+        Metrics.add("bytes_written", sum(entry["raw_size"] for entry in footer["files"]))
+        if Table.verbose:
+            print(f"Verbose: Table {self.name} ({self.num_rows} rows) imported from {node.infile_name}.\n")
+
+    def assert_analyze(self, node):
+        """Raises an error if the pre-conditions to the ANALYZE command aren't met by the node arguments.
+        """
+        if not Table.table_exists(node.table_name):  # table to analyze doesn't exist
+            raise TableNotExistsError(node.table_name)
+
+    def Analyze(self, node):
+        """Collects the statistics of all the columns of the table (see `TableStatistics`),
+        replacing its previous statistics.
+        """
+        self.assert_analyze(node)  # assure pre-conditions are met
+        from Statistics import TableStatistics
+        with TableLock(self.name, "write"):  # a concurrent LOAD would update the statistics too
+            self.refresh()
+            statistics = TableStatistics()
+            statistics.update(self)
+            statistics.save(self.name)
+        if Table.verbose:
+            print(f"Verbose: Table {self.name} analyzed ({self.num_rows} rows).\n")
+
+    def get_statistics(self):
+        """Returns the statistics of the table (see `TableStatistics`), or None if it wasn't analyzed.
+        The statistics file is read again only if it changed since it was last read.
+        """
+        from Statistics import TableStatistics
+        try:
+            stat = os.stat(TableStatistics.path(self.name))
+        except FileNotFoundError:
+            self.statistics = self.statistics_signature = None
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature != self.statistics_signature:
+            self.statistics = TableStatistics.load(self.name)
+            self.statistics_signature = signature
+        return self.statistics
+
+    def estimate_rows(self, condition=None, sample=None):
+        """Returns the estimated number of rows of the table that meet `condition` (all rows if None),
+        in the sample `sample` of the table (a SampleClause) if supplied.
+        Without statistics every row is assumed to meet the condition.
+        """
+        rows = self.num_rows if not sample else round(self.num_rows * sample.percentage / 100)
+        statistics = self.get_statistics() if condition else None
+        # Only the live rows of the partitions that aren't pruned can meet the condition:
+        segment_rows = sum(segment.num_rows - segment.deleted for segment in self.scan_segments(condition))
+        if sample: segment_rows = round(segment_rows * sample.percentage / 100)
+        if statistics is None:
+            return segment_rows
+        field = Table.resolve_field(condition.field_name, [self])[1].field
+        estimate = statistics.estimate_rows(condition, field, rows)
+        return segment_rows if estimate is None else min(estimate, segment_rows)
+
+    def row_meets_condition(self, condition, value, null=None):
+        """Returns true iff the value `value` of the condition field meets the condition (WHERE clause).
+        `null` is the NULL value of the type of the condition field (None for VARCHAR).
         """
-        condition = node.row_condition
-        value = row[self.column_dict[condition.field_name].index]
         constant = condition.constant
 
-        if value in Column.TYPE_TO_NULL.values():
+        if value == null:
             if condition.operator == "is":
                 return True
             return False
@@ -314,47 +1155,606 @@ class Table:
                 return False
         elif condition.operator == "is not":
                 return True
-        
-        
 
 
-    def select_generator(self, node):
+    @staticmethod
+    def resolve_field(field_name, tables):
+        """Returns the (table, column) of field `field_name` in one of the tables `tables`.
+        `field_name` may be qualified by its table name ("table.field").
+        """
+        table_name, _, field = field_name.rpartition(".")
+        matches = [(table, table.column_dict[field]) for table in tables
+                   if table_name in ("", table.name) and field in table.column_dict]
+        if not matches:
+            raise FieldNotExistsError(field_name)
+        if len(matches) > 1:
+            raise AmbiguousFieldError(field_name)
+        return matches[0]
+
+    def select_tables(self, node):
+        """Returns the list of tables SELECT command `node` reads from.
+        """
+        if node.join:
+            return [self, Table.get_table(node.join.table_name)]
+        return [self]
+
+    def select_output(self, node):
+        """Returns the list of (identifier, table, column) of each output field of SELECT command `node`
+        (of a SELECT command without aggregation - see `select_aggregation`).
+        """
+        tables = self.select_tables(node)
+        if node.group_condition:
+            raise UnsupportedCommandError("HAVING without aggregation")
         if not node.expression_list:  # 'Select * from ...'
-            for column in self.columns: 
-                column.open()
-            yield [column.field for column in self.columns]  # yield column fields
-            if node.row_condition:
-                for row in zip(*self.columns):
-                    if self.row_meets_condition(node, row):
-                        yield row 
-            for row in zip(*self.columns): yield row  # yield all column values
-        for column in self.columns: column.close()
+            qualify = len(tables) > 1
+            return [(f"{table.name}.{column.field}" if qualify else column.field, table, column)
+                    for table in tables for column in table.columns]
+        return [(field.identifier,) + Table.resolve_field(field.field_name, tables)
+                for field in node.expression_list]
+
+    @staticmethod
+    def is_aggregation(node):
+        """Returns True iff SELECT command `node` has aggregate functions or a GROUP BY clause.
+        """
+        return bool(node.group_fields) or any(field.agg_func for field in node.expression_list)
+
+    def select_aggregation(self, node):
+        """Returns the `Aggregation` operator of SELECT command `node` with aggregate functions or a GROUP BY clause.
+        The HAVING condition refers to an output field by its identifier.
+        """
+        from Aggregates import Aggregation  # imported on use (with the sketches) to keep startup fast
+        tables = self.select_tables(node)
+        if not node.expression_list:
+            raise UnsupportedCommandError("SELECT * with aggregation")
+        group_fields = [Table.resolve_field(field.identifier, tables) for field in node.group_fields]
+        select_fields = [(field, None, None) if field.field_name == "*" else (field,) + Table.resolve_field(field.field_name, tables)
+                         for field in node.expression_list]
+        aggregation = Aggregation(group_fields, select_fields)
+        condition = node.group_condition
+        if condition:
+            if condition.field_name not in aggregation.fields:
+                raise FieldNotExistsError(condition.field_name)
+            i = aggregation.fields.index(condition.field_name)
+            null = aggregation.nulls[i]
+            aggregation.having = lambda row: self.row_meets_condition(condition, row[i], null)
+        return aggregation
+
+    def output_fields(self, node):
+        """Returns the schema of the output of SELECT command `node` as a list of CreateField.
+        """
+        if Table.is_aggregation(node):
+            aggregation = self.select_aggregation(node)
+            return [CreateField(identifier, _type) for identifier, _type in zip(aggregation.fields, aggregation.types)]
+        return [CreateField(identifier, column.type) for identifier, table, column in self.select_output(node)]
+
+    def scan(self, columns, condition=None, analyze=False, sample=None, offset=0):
+        """Plans a scan of the rows of the table (tuples of the values of `columns`) that meet `condition`.
+        Only the column files of `columns` are read, up to the committed row count.
+        If `sample` (a SampleClause) is supplied, only a sample of the rows is scanned (see `scan_sample_rows`).
+        Only the partitions of a partitioned table that may have rows meeting `condition` are read (see `scan_segments`).
+        If `offset` is supplied (without a condition or a sample), the first `offset` rows are skipped
+        by seeking over them (see `offset_starts`).
+        Returns:
+            (generator of the rows, PlanNode of the scan)
+        """
+        segments = self.scan_segments(condition)
+        if sample:
+            fraction = sample.percentage / 100
+            method = (f"block sample of {fraction:.1%} of the blocks of {Table.SAMPLE_BLOCK_ROWS} rows (read by seeking)"
+                      if sample.method == "system" else f"row sample of {fraction:.1%} of the rows (fetched by row id)")
+            scan_node = PlanNode("SampleScan", [f"table: {self.name} ({self.num_rows} rows), {method}",
+                                                "columns read: " + ", ".join(column.field for column in columns),
+                                                f"{sample} - about {round(self.num_rows * fraction)} rows"])
+            rows = scan_node.instrument(self.scan_sample_rows(columns, sample, segments), analyze)
+        elif offset:
+            range_segments, starts = self.offset_starts(segments, offset)
+            scan_node = PlanNode("RangeScan", [f"table: {self.name} ({self.num_rows} rows), scan from row offset {offset}",
+                                               "columns read: " + ", ".join(column.field for column in columns),
+                                               f"rows skipped: {offset} (by seeking - no records before the range are read)"])
+            rows = scan_node.instrument(self.scan_rows(columns, range_segments, starts), analyze)
+        else:
+            scan_node = PlanNode("Scan", [f"table: {self.name} ({self.num_rows} rows), full scan (no indexes or zone maps)",
+                                          "columns read: " + ", ".join(column.field for column in columns)])
+            rows = scan_node.instrument(self.scan_rows(columns, segments), analyze)
+        deleted = sum(segment.deleted for segment in segments)
+        if deleted:
+            scan_node.details.append(f"deleted rows skipped: {deleted} (by the deletion bitmap)")
+        if self.partitioning:
+            pruned = f" (pruned by the condition on {self.partitioning['field']})" if len(segments) < len(self.partitions) else ""
+            scan_node.details.append(f"partitions read: {len(segments)} of {len(self.partitions)}{pruned}: "
+                                     + (", ".join(segment.id for segment in segments) or "none"))
+        if not condition:
+            return rows, scan_node
+        condition_column = Table.resolve_field(condition.field_name, [self])[1]
+        condition_index = columns.index(condition_column)
+        null = Column.TYPE_TO_NULL.get(condition_column.type)
+        filter_node = PlanNode("Filter", [f"condition: {condition}"], [scan_node])
+        statistics = self.get_statistics()
+        if statistics is not None:
+            column_stats = statistics.columns.get(condition_column.field)
+            if statistics.rows == self.num_rows and column_stats \
+               and column_stats.excludes(condition.operator, condition.constant):
+                filter_node.details.append("no row can meet the condition (by min/max statistics) - scan skipped")
+                return filter_node.instrument(iter(()), analyze), filter_node
+            filter_node.details.append(f"estimated rows: {self.estimate_rows(condition, sample)} (by statistics)")
+        rows = RowCompiler.filter(condition, condition_index, null)(rows)  # (compiled for the query)
+        return filter_node.instrument(rows, analyze), filter_node
+
+    def scan_segments(self, condition=None):
+        """Returns the segments of the table to scan (see `segments`). Partitions that can't have rows
+        meeting `condition` on the partition field are pruned (see `Partition.excludes`).
+        """
+        segments = self.segments()
+        if not self.partitioning or condition is None \
+           or Table.resolve_field(condition.field_name, [self])[1].field != self.partitioning["field"]:
+            return segments
+        return [segment for segment in segments if not segment.excludes(condition.operator, condition.constant)]
+
+    def scan_rows(self, columns, segments=None, starts=None):
+        """Yields the rows (tuples of the values of `columns`) of the segments `segments` (all by default).
+        If `starts` is supplied (maps a segment name to a row id), only the rows of each segment from row
+        `starts`[segment name] (0 if it's missing) are read.
+        """
+        for segment in (self.segments() if segments is None else segments):
+            start = starts.get(segment.name, 0) if starts else 0
+            segment_columns = [segment.columns[column.index] for column in columns]
+            for column in segment_columns:
+                column.open(rows=segment.num_rows, start=start)
+            try:
+                rows = zip(*segment_columns)
+                if segment.deleted:  # skip the deleted rows (segments without any pay nothing for it)
+                    rows = itertools.compress(rows, Table.live_mask(segment)[start:])
+                yield from Metrics.count_rows(rows, "rows_scanned")
+            finally:
+                for column in segment_columns: column.close()
+
+    @staticmethod
+    def offset_starts(segments, offset):
+        """Returns (segments, starts) of a scan of `segments` that skips their first `offset` live rows
+        (see `scan_rows`): the segments the skipped rows fill are left out, and the scan of the first segment
+        left starts at its row after the skipped rows (a column seeks to it - see `Column.seek_row`).
+        """
+        for i, segment in enumerate(segments):
+            live_rows = segment.num_rows - segment.deleted
+            if offset >= live_rows:
+                offset -= live_rows
+                continue
+            start = offset
+            if segment.deleted:  # the id of the live row after the first `offset` live rows
+                live_ids = itertools.compress(range(segment.num_rows), Table.live_mask(segment))
+                start = next(itertools.islice(live_ids, offset, None))
+            return segments[i:], {segment.name: start}
+        return [], {}
+
+    @staticmethod
+    def live_mask(segment):
+        """Returns the live mask of the rows of `segment` (see `DeletionBitmap.live_mask`).
+        """
+        from Bitmap import DeletionBitmap
+        return DeletionBitmap.load(segment).live_mask(segment.num_rows)
+
+    def scan_sample_rows(self, columns, sample, segments=None):
+        """Yields a random sample of the rows of the table (tuples of the values of `columns`):
+        SYSTEM -- each block of SAMPLE_BLOCK_ROWS consecutive rows is read with probability `percentage`/100.
+                  Only the sampled blocks are read, each by a single read of each column file
+                  (see `Column.read_range`).
+        BERNOULLI -- each row is returned with probability `percentage`/100. The ids of the sampled rows
+                     are drawn first, and only the sampled rows are fetched (see `fetch_rows`).
+        The sample is the same for the same REPEATABLE seed (and table). Only the rows of the segments
+        `segments` (all by default, see `scan_segments`) are read, but the sample is drawn from all of them.
+        """
+        import random  # imported on use to keep startup fast
+        rand = random.Random(sample.seed)  # seeded by the system if no seed was supplied
+        fraction = sample.percentage / 100
+        all_segments = self.segments()
+        segments = all_segments if segments is None else segments
+        if sample.method == "bernoulli":
+            row_ids = (row_id for row_id in range(self.num_rows) if rand.random() < fraction)
+            if len(segments) < len(all_segments) or any(segment.deleted for segment in segments):
+                # only the ids of the live rows of `segments`:
+                ranges, start = [], 0
+                for segment in all_segments:
+                    if segment in segments:
+                        ranges.append((range(start, start + segment.num_rows), Table.live_mask(segment) if segment.deleted else None))
+                    start += segment.num_rows
+                row_ids = (row_id for row_id in row_ids
+                           if any(row_id in ids and (mask is None or mask[row_id - ids.start]) for ids, mask in ranges))
+            for batch in iter(lambda: list(itertools.islice(row_ids, Table.SAMPLE_BLOCK_ROWS)), []):
+                yield from Metrics.count_rows(self.fetch_rows(batch, columns), "rows_scanned")
+            return
+        for segment in all_segments:
+            blocks = [start for start in range(0, segment.num_rows, Table.SAMPLE_BLOCK_ROWS) if rand.random() < fraction]
+            if segment not in segments or not blocks:
+                continue
+            segment_columns = [segment.columns[column.index] for column in columns]
+            mask = Table.live_mask(segment) if segment.deleted else None
+            files = [column.open_cached(segment.num_rows) for column in segment_columns]
+            try:
+                for start in blocks:
+                    end = min(start + Table.SAMPLE_BLOCK_ROWS, segment.num_rows)
+                    rows = zip(*[column.read_range(start, end, column_files)
+                                 for column, column_files in zip(segment_columns, files)])
+                    rows = rows if mask is None else itertools.compress(rows, mask[start:end])
+                    yield from Metrics.count_rows(rows, "rows_scanned")
+            finally:
+                for colfile, pointersfile in files:
+                    colfile.close()
+                    if pointersfile is not None: pointersfile.close()
+
+    def fetch_rows(self, row_ids, columns=None):
+        """Returns the list of the rows (tuples of the values of `columns`, all the columns by default)
+        with ids (indexes) `row_ids`, in the same order. Only the records around the requested rows are read
+        (see `Column.fetch`). Raises IndexError if a row id isn't the id of a committed row, or was deleted.
+        """
+        columns = self.columns if columns is None else columns
+        if row_ids and (min(row_ids) < 0 or max(row_ids) >= self.num_rows):
+            raise IndexError(f"row id out of range of table {self.name} ({self.num_rows} rows)")
+        if any(segment.deleted for segment in self.segments()):
+            self.assert_live_rows(row_ids)
+        if not self.partitioning:
+            return list(zip(*[column.fetch(row_ids, self.num_rows) for column in columns]))
+        # The ids of a partitioned table number the rows of its partitions in order:
+        import bisect
+        starts = list(itertools.accumulate([0] + [segment.num_rows for segment in self.segments()]))
+        positions = {}  # maps a segment index to the positions in `row_ids` of its rows
+        for i, row_id in enumerate(row_ids):
+            positions.setdefault(bisect.bisect_right(starts, row_id) - 1, []).append(i)
+        rows = [None] * len(row_ids)
+        for index, segment_positions in positions.items():
+            segment = self.segments()[index]
+            local_ids = [row_ids[i] - starts[index] for i in segment_positions]
+            segment_rows = zip(*[segment.columns[column.index].fetch(local_ids, segment.num_rows) for column in columns])
+            for i, row in zip(segment_positions, segment_rows):
+                rows[i] = row
+        return rows
+
+    def assert_live_rows(self, row_ids):
+        """Raises IndexError if a row id in `row_ids` is the id of a deleted row.
+        """
+        from Bitmap import DeletionBitmap
+        start = 0
+        for segment in self.segments():
+            if segment.deleted:
+                bitmap = DeletionBitmap.load(segment)
+                for row_id in row_ids:
+                    if start <= row_id < start + segment.num_rows and bitmap.is_deleted(row_id - start):
+                        raise IndexError(f"row {row_id} of table {self.name} was deleted")
+            start += segment.num_rows
+
+    def select_plan(self, node, analyze=False):
+        """Plans SELECT command `node`. The command is validated before anything is executed.
+        If `analyze` is True, the operators of the plan are instrumented (see `PlanNode`).
+        Returns:
+            (list of output fields, generator of the output rows, root PlanNode of the plan)
+        """
+        output = None
+        if Table.is_aggregation(node):
+            fields, rows, plan = self.aggregate_plan(node, analyze)
+            types = plan.aggregation.types
+        else:
+            output = self.select_output(node)
+            rows, plan = (self.join_rows if node.join else self.table_rows)(node, output, analyze)
+            fields = [identifier for identifier, table, column in output]
+            types = [column.type for identifier, table, column in output]
+        if node.distinct:
+            rows, plan = self.distinct_plan(rows, plan, analyze)
+        if node.order_fields:
+            rows, plan = self.sort_plan(node, self.order_keys(node, fields, types, output), rows, plan, analyze)
+        if node.limit is not None or node.offset:
+            rows, plan = self.limit_plan(node, rows, plan, analyze)
+        return fields, rows, plan
+
+    @staticmethod
+    def scan_offset(node):
+        """Returns the number of rows the scan of SELECT command `node` skips for its OFFSET: all of them if
+        every scanned row is an output row in the order of the table (no JOIN, WHERE, TABLESAMPLE, DISTINCT,
+        aggregation or ORDER BY), else 0.
+        """
+        if node.join or node.row_condition or node.sample or node.distinct or node.order_fields \
+           or Table.is_aggregation(node):
+            return 0
+        return node.offset
+
+    def limit_plan(self, node, rows, plan, analyze=False):
+        """Plans the LIMIT / OFFSET clause of SELECT command `node` over the output rows `rows` of plan `plan`.
+        The rows stop being read once the limit is reached. The rows skipped for the offset are skipped here,
+        unless the scan skipped them already (see `scan_offset`).
+        """
+        skip = node.offset - Table.scan_offset(node)
+        stop = None if node.limit is None else skip + node.limit
+        limit_node = PlanNode("Limit", [f"limit: {'all' if node.limit is None else node.limit}, offset: {node.offset}"
+                                        + (" (skipped by the scan)" if skip < node.offset else "")], [plan])
+        return limit_node.instrument(itertools.islice(rows, skip, stop), analyze), limit_node
+
+    def order_keys(self, node, fields, types, output=None):
+        """Returns the list of (index, descending, varchar) of the ORDER BY fields of SELECT command `node`
+        in its output rows (see `RowCompiler.sort_key`), whose fields are `fields` of types `types`.
+        An ORDER BY field is an output field, referred to by its identifier, or (without aggregation - `output` is
+        the output of `select_output`) by the name of the field of the table it outputs.
+        """
+        keys = []
+        for order_field in node.order_fields:
+            if order_field.identifier in fields:
+                index = fields.index(order_field.identifier)
+            else:
+                table, column = Table.resolve_field(order_field.identifier, self.select_tables(node))
+                indexes = [i for i, (identifier, output_table, output_column) in enumerate(output or [])
+                           if output_table is table and output_column is column]
+                if not indexes:
+                    raise UnsupportedCommandError(f"ORDER BY field {order_field.identifier} that isn't selected")
+                index = indexes[0]
+            keys.append((index, order_field.order == "desc", types[index] == "varchar"))
+        return keys
+
+    def sort_plan(self, node, keys, rows, plan, analyze=False):
+        """Plans the ORDER BY clause of SELECT command `node` over the output rows `rows` of plan `plan`, sorted by the
+        sort keys `keys` (see `order_keys`). With a LIMIT of at most TOP_ROWS rows (with the offset) only the first rows
+        are kept, in a heap (`heapq.nsmallest`). Otherwise the rows are added in batches to an `ExternalSort`
+        (which spills sorted runs to disk when they don't fit in memory and merges them).
+        Either way the sorted rows are returned after all the rows were read. Returns (rows, plan) - see `select_plan`.
+        """
+        from Spill import ExternalSort  # imported on use to keep startup fast
+        key = RowCompiler.sort_key(keys)
+        order = "order by: " + ", ".join(str(order_field) for order_field in node.order_fields)
+        if node.limit is not None and node.offset + node.limit <= Table.TOP_ROWS:
+            count = node.offset + node.limit
+            sort_node = PlanNode("TopN", [order, f"the first {count} rows (limit and offset) kept in a heap"], [plan])
+            return sort_node.instrument(Table.top_rows(rows, count, key), analyze), sort_node
+        sort_node = PlanNode("Sort", [order, f"rows added in batches of {ExternalSort.BATCH_SIZE}",
+                                      f"memory budget: {ExternalSort.MEMORY_BUDGET // 2**20} MiB, then sorted runs "
+                                      "spilled to disk and merged"], [plan])
+        sort_node.spilled_runs = 0  # for reporting spilled runs
+        return sort_node.instrument(Table.sorted_rows(rows, key, sort_node), analyze), sort_node
+
+    @staticmethod
+    def top_rows(rows, count, key):
+        import heapq  # imported on use to keep startup fast
+        yield from heapq.nsmallest(count, rows, key=key)  # (stable, like a sort)
+
+    @staticmethod
+    def sorted_rows(rows, key, sort_node):
+        from Spill import ExternalSort
+        external_sort = ExternalSort(key)
+        rows = iter(rows)
+        try:
+            for batch in iter(lambda: list(itertools.islice(rows, ExternalSort.BATCH_SIZE)), []):
+                external_sort.update(batch)
+            sort_node.spilled_runs = len(external_sort.runs)
+            yield from external_sort
+        finally:
+            external_sort.close()
+
+    def distinct_plan(self, rows, plan, analyze=False):
+        """Plans the duplicate elimination of SELECT DISTINCT over the output rows `rows` of plan `plan`.
+        The rows of an aggregation that outputs all of its GROUP BY fields are already distinct, so they're
+        returned as they are. Otherwise the rows are added in batches to a `DistinctSet` (which spills to disk
+        when they don't fit in memory), and the distinct rows are returned after all the rows were read.
+        Returns (rows, plan) - see `select_plan`.
+        """
+        aggregation = getattr(plan, "aggregation", None)
+        if aggregation is not None and \
+           {i for kind, i in aggregation.outputs if kind == "group"} == set(range(len(aggregation.group_positions))):
+            plan.details.append("distinct: the output has all the GROUP BY fields - the groups are distinct")
+            return rows, plan
+        from Spill import DistinctSet  # imported on use to keep startup fast
+        distinct_node = PlanNode("HashDistinct", [f"rows added in batches of {DistinctSet.BATCH_SIZE}",
+                                                  f"memory budget: {DistinctSet.MEMORY_BUDGET // 2**20} MiB, then spilled "
+                                                  f"to disk in {DistinctSet.NUM_PARTITIONS} partitions"], [plan])
+        distinct_node.spilled_partitions = 0  # for reporting spilled partitions
+        return distinct_node.instrument(Table.distinct_rows(rows, distinct_node), analyze), distinct_node
+
+    @staticmethod
+    def distinct_rows(rows, distinct_node):
+        from Spill import DistinctSet
+        distinct_set = DistinctSet()
+        rows = iter(rows)
+        try:
+            for batch in iter(lambda: list(itertools.islice(rows, DistinctSet.BATCH_SIZE)), []):
+                distinct_set.update(batch)
+            yield from distinct_set
+        finally:
+            distinct_node.spilled_partitions = distinct_set.spilled_partitions
+            distinct_set.close()
+
+    def aggregate_plan(self, node, analyze=False):
+        """Plans SELECT command `node` with aggregate functions or a GROUP BY clause (see `Aggregation`).
+        Returns the same as `select_plan`.
+        """
+        aggregation = self.select_aggregation(node)
+        if not aggregation.input and not node.join:  # COUNT(*) only - scan a column to count the rows
+            aggregation.input_position(self, self.columns[0])
+        rows, plan = (self.join_rows if node.join else self.table_rows)(node, aggregation.input, analyze)
+        details = ["group by: " + (", ".join(field.identifier for field in node.group_fields) or "(all rows)"),
+                   "aggregates: " + ", ".join(field.agg_expression() for field in node.expression_list if field.agg_func)]
+        if node.group_condition:
+            details.append(f"having: {node.group_condition}")
+        if any(field.distinct for field in node.expression_list):
+            from Spill import DistinctSet
+            details.append(f"distinct values: in memory up to {DistinctSet.MEMORY_BUDGET // 2**20} MiB, "
+                           f"then spilled to disk in {DistinctSet.NUM_PARTITIONS} partitions")
+        aggregate_node = PlanNode("HashAggregate", details, [plan])
+        aggregate_node.aggregation = aggregation  # for reporting spilled partitions
+        return aggregation.fields, aggregate_node.instrument(aggregation.aggregate(rows), analyze), aggregate_node
+
+    def select_generator(self, node):
+        """Returns the output fields of SELECT command `node` and a generator of its output rows.
+        NULL values in the output rows are None.
+        """
+        fields, rows, plan = self.select_plan(node)
+        types = [field.type for field in self.output_fields(node)]
+        return fields, Table.null_to_none(rows, types)
+
+    @staticmethod
+    def null_to_none(rows, types):
+        """Returns a generator of `rows` (whose fields are of types `types`) with NULL values replaced by None.
+        Each type has its own NULL value (see TYPE_TO_NULL), e.g. 0 is NULL only in a TIMESTAMP field.
+        """
+        nulls = [(i, Column.TYPE_TO_NULL[_type]) for i, _type in enumerate(types) if _type in Column.TYPE_TO_NULL]
+        if not nulls:  # VARCHAR fields only
+            return rows
+        return RowCompiler.replace_nulls(nulls, len(types))(rows)
+
+    def table_rows(self, node, output, analyze=False):
+        """Plans SELECT command `node` (without a JOIN clause). Returns (rows, plan) - see `select_plan`.
+        """
+        # Read only the output columns and the condition column:
+        scan_columns = []
+        for identifier, table, column in output:
+            if column not in scan_columns: scan_columns.append(column)
+        if node.row_condition:
+            condition_column = Table.resolve_field(node.row_condition.field_name, [self])[1]
+            if condition_column not in scan_columns: scan_columns.append(condition_column)
+
+        positions = [scan_columns.index(column) for identifier, table, column in output]
+        rows, plan = self.scan(scan_columns, node.row_condition, analyze, node.sample, Table.scan_offset(node))
+        if positions == list(range(len(scan_columns))):  # no projection needed
+            return rows, plan
+        project_node = PlanNode("Project", ["fields: " + ", ".join(identifier for identifier, table, column in output)], [plan])
+        return project_node.instrument(RowCompiler.project(positions)(rows), analyze), project_node
+
+    def join_rows(self, node, output, analyze=False):
+        """Plans SELECT command `node` with a JOIN clause (see `HashJoin`). Returns (rows, plan) - see `select_plan`.
+        The WHERE condition is applied to the scan of the table it refers to, before the join.
+        """
+        from Join import HashJoin  # imported on use (with the spilling machinery) to keep startup fast
+        tables = self.select_tables(node)
+        if tables[0] is tables[1]:
+            raise UnsupportedCommandError("joining a table with itself")
+        keys = [Table.resolve_field(node.join.left_field, tables), Table.resolve_field(node.join.right_field, tables)]
+        if keys[0][0] is keys[1][0]:
+            raise UnsupportedCommandError("a JOIN condition on fields of the same table")
+        key_columns = {table: column for table, column in keys}
+        condition_table = None
+        if node.row_condition:
+            condition_table, condition_column = Table.resolve_field(node.row_condition.field_name, tables)
+
+        # Read only the key column, the output columns and the condition column of each table:
+        scan_columns = {table: [key_columns[table]] for table in tables}
+        for identifier, table, column in output:
+            if column not in scan_columns[table]: scan_columns[table].append(column)
+        if condition_table and condition_column not in scan_columns[condition_table]:
+            scan_columns[condition_table].append(condition_column)
+
+        def scan_non_null_keys(table):  # NULL keys never match
+            rows, plan = table.scan(scan_columns[table], node.row_condition if table is condition_table else None, analyze,
+                                    node.sample if table is self else None)  # TABLESAMPLE samples the FROM table
+            null = Column.TYPE_TO_NULL.get(key_columns[table].type)
+            return ((row for row in rows if row[0] != null) if null is not None else rows), plan
+
+        # Build the hash table on the smaller input and probe it with batches of the larger one
+        # (the number of rows of the filtered table is estimated by its statistics, if it was analyzed):
+        estimates = {table: table.estimate_rows(node.row_condition if table is condition_table else None,
+                                                node.sample if table is self else None)
+                     for table in tables}
+        build, probe = sorted(tables, key=lambda table: estimates[table])
+        build_rows, build_plan = scan_non_null_keys(build)
+        probe_rows, probe_plan = scan_non_null_keys(probe)
+        probe_batches = iter(lambda: list(itertools.islice(probe_rows, HashJoin.BATCH_SIZE)), [])
+        join = HashJoin(build_rows, 0, probe_batches, 0)
+        join_node = PlanNode("HashJoin", [f"condition: {node.join.left_field} = {node.join.right_field}",
+                                          f"build side: {build.name} (fewer estimated rows: {estimates[build]}), "
+                                          f"probe side: {probe.name} "
+                                          f"in batches of {HashJoin.BATCH_SIZE} rows",
+                                          f"memory budget: {join.memory_budget // 2**20} MiB, then grace hash join "
+                                          f"with {HashJoin.NUM_PARTITIONS} partitions"],
+                             [build_plan, probe_plan])
+        join_node.join = join  # for reporting spilled partitions
+
+        # Position of each output field in a (build_row, probe_row) pair:
+        positions = [(0 if table is build else 1, scan_columns[table].index(column))
+                     for identifier, table, column in output]
+        rows = RowCompiler.project(positions)(join)
+        return join_node.instrument(rows, analyze), join_node
 
     def assert_select(self, node):
         """Raises an error if the pre-conditions to the SELECT command aren't met by the node arguments. 
         """
         if not Table.table_exists(node.table_name):  # table to select from doesn't exist
             raise TableNotExistsError(node.table_name)
+        if node.join and not Table.table_exists(node.join.table_name):  # table to join doesn't exist
+            raise TableNotExistsError(node.join.table_name)
 
 
-    def Select(self, node):
+    @contextlib.contextmanager
+    def select_locks(self, node):
+        """Holds read locks on the tables SELECT command `node` reads from,
+        after taking a snapshot of their committed row counts.
+        """
+        with TableLock(self.name, "read"):
+            self.refresh()  # snapshot of the committed row count
+            if node.join:
+                joined = Table.get_table(node.join.table_name)
+                with TableLock(joined.name, "read"):
+                    joined.refresh()
+                    yield
+            else:
+                yield
+
+    def Select(self, node, printer=None):
         self.assert_select(node)  # assure pre-conditions are met
-        rows = self.select_generator(node)
+        with self.select_locks(node):
+            self.select_rows(node, printer)
+
+    def select_rows(self, node, printer=None):
+        fields, rows = self.select_generator(node)
+        rows = Metrics.count_rows(rows, "rows_returned")
 
         if node.outfile_name:  # export output to csv file
             outfile = open(node.outfile_name, "w")
+            import csv  # imported on use to keep startup fast
             writer = csv.writer(outfile)
-            for row in rows:
-                nonull_row = []
-                for field in row:
-                    if field in Column.TYPE_TO_NULL.values():
-                        nonull_row.append("")
-                    else:
-                        nonull_row.append(field)
-                writer.writerow(nonull_row)
+            writer.writerow(fields)
+            writer.writerows(rows)  # NULL values (None) are written as empty fields
             outfile.close()
-        else:  # print output to terminal
-            self.printer.print_rows(rows)
+            Metrics.add("bytes_written", os.path.getsize(node.outfile_name))
+        else:  # print output to terminal (or to the supplied printer)
+            (printer or Printer(self.output_fields(node))).print_rows(itertools.chain([fields], rows))
 
-        
-            
+
+
+    def Explain(self, node):
+        """Prints the plan of the SELECT command of `node`.
+        If `node.analyze` is set, the command is also executed (its output is discarded) and the plan
+        is printed with the number of rows and time of each operator, the bytes read from each
+        column file, the total time and the peak memory allocated while executing it.
+        """
+        select_command = node.select_command
+        self.assert_select(select_command)  # assure pre-conditions are met
+        with self.select_locks(select_command):
+            if not node.analyze:
+                fields, rows, plan = self.select_plan(select_command)  # rows are never read
+                self.print_plan(select_command, plan)
+                return
+
+            import tracemalloc
+            bytes_read_before = Column.bytes_read.copy()
+            tracemalloc.start()
+            start = time.perf_counter()
+            fields, rows, plan = self.select_plan(select_command, analyze=True)
+            for row in rows: pass
+            total_time = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.print_plan(select_command, plan, analyze=True)
+            print("Bytes read:")
+            for path, count in sorted((Column.bytes_read - bytes_read_before).items()):
+                print(f"  {path}: {count}")
+            for plan_node in plan.nodes():
+                if hasattr(plan_node, "join"):
+                    print(f"Join partitions spilled to disk: {plan_node.join.spilled_partitions}")
+                if hasattr(plan_node, "aggregation") and any(field.distinct for field in select_command.expression_list):
+                    print(f"Distinct value partitions spilled to disk: {plan_node.aggregation.spilled_partitions}")
+                if hasattr(plan_node, "spilled_partitions"):
+                    print(f"Distinct row partitions spilled to disk: {plan_node.spilled_partitions}")
+                if hasattr(plan_node, "spilled_runs"):
+                    print(f"Sorted runs spilled to disk: {plan_node.spilled_runs}")
+            print(f"Total time: {total_time * 1000:.3f} ms")
+            print(f"Peak memory: {peak_memory / 2**10:.1f} KiB\n")
+
+    def print_plan(self, node, plan, analyze=False):
+        output = f'INTO OUTFILE "{node.outfile_name}"' if node.outfile_name else "console"
+        if analyze:
+            output += " (discarded by EXPLAIN ANALYZE)"
+        print(f"Output: {output}")
+        for line in plan.format(analyze, depth=1):
+            print(line)
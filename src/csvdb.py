@@ -4,17 +4,13 @@
 
 from SqlParser import SqlParser
 from Table import Table
+from Catalog import Catalog
+from Metrics import Metrics
+from BlockCache import BlockCache
 
 import argparse
-import readline
 import os
 
-try:
-    from colorama import init, Fore, Style
-    has_colors = True
-except ModuleNotFoundError:
-    has_colors = False
-
 class Console:
     """This class is the core of the program, its purpose is to provide home for
     some methods who share a common nature of being closely related to the
@@ -22,10 +18,10 @@ class Console:
     """
 
 
-    def __init__(self, has_colors):
+    def __init__(self):
         
-        self.has_colors = has_colors
-        self.program_desc = Console.determine_desc(self.has_colors)
+        # The colored description is only printed by the interpreter, so colorama is imported by it:
+        self.program_desc = Console.determine_desc(has_colors=False)
         self.cl_parser = Console.create_commandline_parser(self.program_desc)
         self.macros = Console.set_macros()
         # Length allocated for each column type in the print of the current output:
@@ -38,6 +34,7 @@ class Console:
         """
         """
         if has_colors:
+            from colorama import init, Fore, Style
             init()  # Init colorama
             program_desc = f"""
                         {Style.BRIGHT}{Fore.YELLOW}SQL Remastered{Style.NORMAL}
@@ -50,15 +47,36 @@ class Console:
             """ 
         return program_desc
 
+    @staticmethod
+    def help_formatter(prog):
+        """Returns the formatter of the help message, sized to the terminal.
+        Passing the width spares argparse from importing shutil (and its compression modules) on every run.
+        """
+        try: width = os.get_terminal_size().columns - 2
+        except OSError: width = 78
+        return argparse.RawDescriptionHelpFormatter(prog, width=width)
+
     @staticmethod
     def create_commandline_parser(program_desc):
         """
         """
-        cl_parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter, description = program_desc)
+        cl_parser = argparse.ArgumentParser(formatter_class=Console.help_formatter, description = program_desc)
         cl_parser.add_argument("-d", "--rootdir", help="the root directory of your project. Defaults to the current working directory",
                             metavar="PATH", dest="rootdir_path", default=".")
         cl_parser.add_argument("-r", "--run", help="run a pre-written CSVDB-SQL script inside FILENAME", metavar="FILENAME", dest="script_path")
         cl_parser.add_argument("-v", "--verbose", help="turn on debugging output", action="store_true")
+        cl_parser.add_argument("-s", "--serve", help="serve CSVDB-SQL requests on ADDRESS (unix:PATH or [HOST:]PORT) instead of running the console",
+                            metavar="ADDRESS", dest="serve_address")
+        cl_parser.add_argument("--stats", help="print statistics (time, rows, bytes, cache hits) of every statement",
+                            action="store_true")
+        cl_parser.add_argument("--profile", help="dump a cProfile profile of every statement into directory DIR",
+                            metavar="DIR", dest="profile_dir")
+        cl_parser.add_argument("--cache-size", help="budget of the block cache of the column files in MiB (0 - disabled). Defaults to 64",
+                            metavar="MIB", dest="cache_size", type=int)
+        cl_parser.add_argument("--read-ahead", help="number of 64 KiB blocks of a column file read ahead of a scan by background threads (0 - disabled). Defaults to 8",
+                            metavar="BLOCKS", dest="read_ahead", type=int)
+        cl_parser.add_argument("-c", "--catalog", help=f"cache table metadata in the catalog file '{Catalog.CATALOG_FILENAME}' of the root directory",
+                            action="store_true")
         return cl_parser
 
     @staticmethod
@@ -107,6 +125,10 @@ class Console:
             self.cl_parser.error(f"argument -r/--run: No such directory: '{args.rootdir_path}'")
         if args.script_path and not os.path.isfile(args.script_path):
             self.cl_parser.error(f"argument -r/--run: No such file: '{args.script_path}'")
+        if args.profile_dir and not os.path.isdir(args.profile_dir):
+            self.cl_parser.error(f"argument --profile: No such directory: '{args.profile_dir}'")
+        if args.profile_dir:  # the working directory is changed to the root directory
+            args.profile_dir = os.path.abspath(args.profile_dir)
         return args
 
 
@@ -123,8 +145,19 @@ class Console:
 
 
 
+    @staticmethod
+    def try_import_colors():
+        """Returns True iff colorama is installed.
+        """
+        try:
+            import colorama
+            return True
+        except ModuleNotFoundError:
+            return False
+
     def handle_interpreter(self, verbose=False):
-        print(self.program_desc)
+        import readline  # line editing for `input` - imported here since only the interpreter reads input
+        print(Console.determine_desc(Console.try_import_colors()))
         while True:
             command = self.input_command()
             sqlparser = SqlParser(command)
@@ -137,9 +170,19 @@ class Console:
     def do(self):
         args = self.parse_cmdline_args()
         os.chdir(args.rootdir_path)
+        Catalog.open(persistent=args.catalog)
         if args.verbose:  # flag 'v' supplied
             Table.verbose_on()
-        if args.script_path:  # script file path supplied
+        if args.cache_size is not None:  # flag 'cache-size' supplied
+            BlockCache.set_budget(args.cache_size * 1024 * 1024)
+        if args.read_ahead is not None:  # flag 'read-ahead' supplied
+            BlockCache.set_read_ahead(args.read_ahead)
+        if args.stats or args.profile_dir:  # flag 'stats' or 'profile' supplied
+            Metrics.enable(args.stats, args.profile_dir)
+        if args.serve_address:  # server address supplied
+            from Server import Server
+            Server(args.serve_address, args.verbose).serve_forever()
+        elif args.script_path:  # script file path supplied
             self.handle_script(args.script_path,args.verbose)
         else:
             self.handle_interpreter(args.verbose)
@@ -147,8 +190,16 @@ class Console:
 
 
 
+def connect(rootdir, catalog=False):
+    """Returns a `Connection` to the database in root directory `rootdir`, for executing commands
+    in-process and reading the output of SELECT commands as column batches (see Connection.py).
+    """
+    from Connection import Connection  # imported on use to keep startup fast
+    return Connection(rootdir, catalog)
+
+
 def main():
-    console = Console(has_colors)
+    console = Console()
     console.do()
 
 if __name__ == "__main__":